@@ -1,16 +1,33 @@
 import hashlib
-import pandas as pd
-import os
 from notifications import NotificationManager
 import firebase_admin
 from firebase_admin import credentials, auth
+from utils.notification_queue import get_notification_queue
+from utils.user_directory import get_user_directory
 
 notification_manager = NotificationManager()
 
+OTP_WAIT_SECONDS = 30
+
 
 def send_password_reset_otp(phone_number):
-    """Send OTP to Phone for Password Reset"""
-    return notification_manager.send_otp(phone_number)
+    """Send OTP to Phone for Password Reset
+
+    The SMS round trip runs on the notification workers, so this returns
+    at once: a Future of the OTP, or None if the phone isn't registered.
+    """
+    if not get_user_directory().phone_exists(phone_number):
+        return None
+    return get_notification_queue().submit(notification_manager.send_otp, phone_number)
+
+
+def wait_for_otp(pending_otp, timeout=OTP_WAIT_SECONDS):
+    """The OTP from send_password_reset_otp(), or None if sending failed"""
+    try:
+        return pending_otp.result(timeout=timeout)
+    except Exception as e:
+        print(f"Error sending OTP: {str(e)}")
+        return None
 
 
 def verify_password_reset_otp(session_info, otp):
@@ -21,8 +38,14 @@ def verify_password_reset_otp(session_info, otp):
 def reset_password(phone_number, new_password):
     """Reset Password after OTP Verification"""
     try:
+        directory = get_user_directory()
+        if directory.get_by_phone(phone_number) is None:
+            return False
         user = auth.get_user_by_phone_number(phone_number)
         auth.update_user(user.uid, password=new_password)
+
+        # Keep the local hash in sync so the new password works for login
+        directory.update_password(phone_number, hash_password(new_password))
         return True
     except Exception as e:
         print(f"Error resetting password: {str(e)}")
@@ -37,10 +60,9 @@ def hash_password(password):
 def check_password(username, password):
     """Verify username and password"""
     try:
-        users_df = pd.read_csv("attached_assets/users.csv")
-        user = users_df[users_df["username"] == username]
-        if not user.empty:
-            return user.iloc[0]["password"] == hash_password(password)
+        user = get_user_directory().get(username)
+        if user is not None:
+            return user["password"] == hash_password(password)
     except Exception:
         pass
     return False
@@ -49,34 +71,19 @@ def check_password(username, password):
 def register_user(username, password, name, phone, teacher_id, role):
     """Register a new user"""
     try:
-        # Create users.csv if it doesn't exist
-        if not os.path.exists("attached_assets/users.csv"):
-            pd.DataFrame(
-                columns=["username", "password", "name", "phone", "teacher_id", "role"]
-            ).to_csv("attached_assets/users.csv", index=False)
-
-        users_df = pd.read_csv("attached_assets/users.csv")
-
-        # Check if username exists
-        if username in users_df["username"].values:
-            return False
-
-        # Add new user
-        new_user = pd.DataFrame(
+        # Appends one row under a file lock; the header is written if
+        # users.csv doesn't exist yet
+        return get_user_directory().add(
             {
-                "username": [username],
-                "password": [hash_password(password)],
-                "name": [name],
-                "phone": [phone],
-                "teacher_id": [teacher_id],
-                "role": [role],
+                "username": username,
+                "password": hash_password(password),
+                "name": name,
+                "phone": phone,
+                "teacher_id": teacher_id,
+                "role": role,
             }
         )
 
-        users_df = pd.concat([users_df, new_user], ignore_index=True)
-        users_df.to_csv("attached_assets/users.csv", index=False)
-        return True
-
     except Exception as e:
         print(f"Error registering user: {str(e)}")
         return False
@@ -118,10 +125,9 @@ def register_user(username, password, name, phone, teacher_id, role):
 def get_user_role(username):
     """Get user role"""
     try:
-        users_df = pd.read_csv("attached_assets/users.csv")
-        user = users_df[users_df["username"] == username]
-        if not user.empty:
-            return user.iloc[0]["role"]
+        user = get_user_directory().get(username)
+        if user is not None:
+            return user["role"]
     except Exception:
         pass
     return None
@@ -0,0 +1,98 @@
+"""Whole-day solver vs. per-period greedy on synthetic schools
+
+For each school size, picks random absentees for one day and compares the
+greedy "best free teacher for this period" approach with
+utils.assignment.solve_day on runtime, total cost and workload spread.
+Run from the repo root:
+
+    python benchmarks/assignment_benchmark.py
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.assignment import absent_slots, slot_cost, solve_day  # noqa: E402
+from utils.timetable import DAYS, FREE, Timetable  # noqa: E402
+
+SCHOOLS = [(100, 20), (150, 30), (200, 40)]  # (teachers, absentees)
+PERIODS = 7
+SUBJECTS = ["MATHS", "ENGLISH", "HINDI", "SCIENCE", "SST", "PHYSICS", "CHEMISTRY"]
+CATEGORIES = ["PGT", "TGT", "PRT"]
+GRADES = ["VI", "VII", "VIII", "IX", "X", "XI", "XII"]
+
+
+def synthetic_timetable(n_teachers, seed=0, load=0.7):
+    rng = random.Random(seed)
+    teachers, cells = [], {}
+    for i in range(n_teachers):
+        tid = f"T{i:03d}"
+        subject = rng.choice(SUBJECTS)
+        teachers.append({"teacher_id": tid, "name": f"Teacher {i}", "category": rng.choice(CATEGORIES), "subject": subject})
+        cells[tid] = [
+            f"{rng.choice(GRADES)} {rng.choice('ABCD')} {subject}" if rng.random() < load else "FREE"
+            for _ in range(PERIODS)
+        ]
+    day_data = {day: (teachers, cells, PERIODS) for day in DAYS}
+    return Timetable(day_data)
+
+
+def greedy(timetable, day, absent_ids):
+    """Per-period greedy: cheapest free teacher for each slot in turn"""
+    d = timetable.day_index[day]
+    taken = Counter()
+    busy = set()
+    absent = set(absent_ids)
+    total = 0.0
+    for slot in sorted(absent_slots(timetable, day, absent_ids), key=lambda s: s.period):
+        best = None
+        for t, tid in enumerate(timetable.teacher_ids):
+            if tid in absent or timetable.grid[t, d, slot.period - 1] != FREE or (tid, slot.period) in busy:
+                continue
+            load = int((timetable.grid[t, d] > FREE).sum()) + taken[tid]
+            cost = slot_cost(timetable, slot, tid, load)
+            if best is None or cost < best[0]:
+                best = (cost, tid)
+        if best:
+            total += best[0]
+            taken[best[1]] += 1
+            busy.add((best[1], slot.period))
+    return taken, total
+
+
+def spread(counts):
+    values = list(counts.values()) or [0]
+    return max(values), statistics.pstdev(values)
+
+
+def main():
+    print(f"{'teachers':>8} {'absent':>6} {'slots':>5} | {'greedy ms':>9} {'max':>3} {'std':>5} | {'solver ms':>9} {'max':>3} {'std':>5}")
+    for n_teachers, n_absent in SCHOOLS:
+        timetable = synthetic_timetable(n_teachers)
+        absent_ids = random.Random(1).sample(timetable.teacher_ids, n_absent)
+        slots = absent_slots(timetable, "monday", absent_ids)
+
+        start = time.perf_counter()
+        greedy_counts, _ = greedy(timetable, "monday", absent_ids)
+        greedy_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        rows = solve_day(timetable, "monday", absent_ids)
+        solver_ms = (time.perf_counter() - start) * 1000
+        solver_counts = Counter(r["replacement_teacher"] for r in rows if r["replacement_teacher"])
+
+        g_max, g_std = spread(greedy_counts)
+        s_max, s_std = spread(solver_counts)
+        print(
+            f"{n_teachers:>8} {n_absent:>6} {len(slots):>5} | {greedy_ms:>9.1f} {g_max:>3} {g_std:>5.2f} "
+            f"| {solver_ms:>9.1f} {s_max:>3} {s_std:>5.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Core operations vs. school size
+
+Generates a synthetic school (benchmarks/synthetic_school.py) for each
+size in a temporary directory and times the operations every page relies
+on: loading users, logging in, loading the schedules, checking them for
+clashes, free-teacher lookup, generating a day's arrangements, building the absence reports (raw
+pandas aggregation vs. the attendance rollups, warm as a running server
+holds them and cold as right after start) and ranking external
+substitutes out of a district-sized pool. Prints one row per size
+(the scaling curve), optionally writes them to CSV, and exits with code 1
+if any operation at the reference size is slower than its threshold.
+Run from the repo root:
+
+    python benchmarks/core_benchmark.py [--sizes 50 100 200 400] [--csv out.csv]
+"""
+
+import argparse
+import datetime
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_school import PASSWORD, generate_school  # noqa: E402
+from utils.assignment import solve_day  # noqa: E402
+from utils.attendance_rollup import AttendanceRollup  # noqa: E402
+from utils.attendance_store import AttendanceStore, migrate  # noqa: E402
+from utils.substitute_pool import SubstitutePool  # noqa: E402
+from utils.timetable import DAYS, SCHEDULE_FILE, TimetableCache  # noqa: E402
+from utils.timetable_check import find_conflicts, known_teacher_ids  # noqa: E402
+from utils.user_directory import UserDirectory  # noqa: E402
+
+try:
+    from auth import check_password
+except ImportError:  # auth needs the notification/firebase stack
+    check_password = None
+
+DEFAULT_SIZES = [50, 100, 200, 400]
+REFERENCE_SIZE = 200
+REPEAT = 5
+HISTORY_DAYS = 120
+SUBSTITUTES_PER_TEACHER = 20  # a district pool shared by many schools
+
+# Milliseconds at REFERENCE_SIZE (median of REPEAT runs); generous enough
+# for a slow CI box, tight enough to catch an accidental O(n^2)
+THRESHOLDS = {
+    "users_load": 50,
+    "login": 1,
+    "schedule_load": 250,
+    "schedule_check": 50,
+    "free_lookup": 20,
+    "arrangements": 1000,
+    "report_raw": 1500,
+    "report_rollup": 50,
+    "rollup_cold": 300,
+    "substitute_topk": 20,
+}
+
+
+def measure(fn, repeat=REPEAT):
+    """Median wall time of fn() in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def login(directory, username):
+    if check_password is not None:
+        return check_password(username, PASSWORD)
+    # Same lookup and hash comparison as auth.check_password
+    user = directory.get(username)
+    return user is not None and user["password"] == hashlib.sha256(PASSWORD.encode()).hexdigest()
+
+
+def raw_report(path="attached_assets/attendance.csv", users_path="attached_assets/users.csv"):
+    """What the reports page did before rollups: aggregate the raw log"""
+    attendance = pd.read_csv(path, dtype=str)
+    users = pd.read_csv(users_path, dtype=str)
+    attendance = attendance.sort_values("timestamp").drop_duplicates(["date", "teacher_id"], keep="last")
+    merged = attendance.merge(users[["teacher_id", "category"]], on="teacher_id", how="left")
+    merged["month"] = merged["date"].str[:7]
+    by_teacher = merged.groupby(["teacher_id", "status"]).size().unstack(fill_value=0)
+    by_category = merged.groupby(["month", "category", "status"]).size().unstack(fill_value=0)
+    return by_teacher, by_category
+
+
+def rollup_report(rollup, on):
+    return rollup.by_teacher("term", on), rollup.by_category("month", on), rollup.series("month", [on])
+
+
+def run_size(n_teachers, workdir):
+    os.chdir(workdir)
+    end = datetime.date.today()
+    generate_school(workdir, teachers=n_teachers, history_days=HISTORY_DAYS, end=end,
+                    substitutes=n_teachers * SUBSTITUTES_PER_TEACHER)
+    migrate()
+    rollup = AttendanceRollup()
+    rollup.rebuild(AttendanceStore(rollup=rollup))
+
+    results = {}
+    results["users_load"] = measure(lambda: UserDirectory().get("teacher1"))
+    directory = UserDirectory()
+    usernames = [f"teacher{i + 1}" for i in range(n_teachers)]
+    results["login"] = measure(lambda: login(directory, random.choice(usernames)))
+    results["schedule_load"] = measure(lambda: TimetableCache().get())
+
+    frames = {day: pd.read_csv(SCHEDULE_FILE.format(day=day), dtype=str, keep_default_na=False) for day in DAYS}
+    known = known_teacher_ids(directory)
+    results["schedule_check"] = measure(lambda: find_conflicts(frames, known=known))
+
+    timetable = TimetableCache().get()
+    results["free_lookup"] = measure(
+        lambda: [timetable.free_teachers(day, p) for day in DAYS for p in range(1, timetable.periods + 1)]
+    )
+
+    monday = end - datetime.timedelta(days=end.weekday())
+    absent_ids = random.Random(1).sample(timetable.teacher_ids, max(n_teachers // 10, 1))
+    results["arrangements"] = measure(lambda: solve_day(timetable, monday, absent_ids), repeat=3)
+
+    results["report_raw"] = measure(raw_report)
+    # Steady state: the process-wide rollup is already loaded
+    rollup_report(rollup, end)
+    results["report_rollup"] = measure(lambda: rollup_report(rollup, end))
+    # First report after a restart: the rollup files are read again
+    results["rollup_cold"] = measure(lambda: rollup_report(AttendanceRollup(), end))
+
+    # Best 5 for every subject/day/category combination, out of the loaded pool
+    pool = SubstitutePool()
+    queries = [(subject, day, category) for subject in pool.subjects() for day in DAYS for category in ("TGT", "PGT")]
+    results["substitute_topk"] = measure(
+        lambda: [pool.top(5, subject=subject, day=day, category=category) for subject, day, category in queries]
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--csv", help="write the scaling curve to this file")
+    args = parser.parse_args()
+    sizes = sorted(set(args.sizes) | {REFERENCE_SIZE})
+
+    if check_password is None:
+        print("auth could not be imported; timing the equivalent directory lookup for login\n")
+    print(f"{'teachers':>8} " + " ".join(f"{name:>13}" for name in THRESHOLDS) + "   (ms)")
+    curve = []
+    cwd = os.getcwd()
+    try:
+        for n_teachers in sizes:
+            with tempfile.TemporaryDirectory() as workdir:
+                results = run_size(n_teachers, workdir)
+                os.chdir(cwd)
+            curve.append({"teachers": n_teachers, **results})
+            print(f"{n_teachers:>8} " + " ".join(f"{results[name]:>13.2f}" for name in THRESHOLDS))
+    finally:
+        os.chdir(cwd)
+
+    if args.csv:
+        pd.DataFrame(curve).to_csv(args.csv, index=False)
+        print(f"\nWrote {args.csv}")
+
+    reference = next(row for row in curve if row["teachers"] == REFERENCE_SIZE)
+    failures = [
+        f"{name}: {reference[name]:.1f} ms > {limit} ms"
+        for name, limit in THRESHOLDS.items()
+        if reference[name] > limit
+    ]
+    if failures:
+        print(f"\nRegressions at {REFERENCE_SIZE} teachers:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print(f"\nAll operations within thresholds at {REFERENCE_SIZE} teachers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Publishing a morning's arrangements through the notification queue
+
+Starts a local SMS gateway stand-in (HTTP, with per-message latency and a
+share of 503 responses to exercise the retries), generates a synthetic
+school, solves a day with a share of the staff absent and publishes the
+arrangements with utils.notification_queue.notify_replacements. Reports
+how long publishing blocks the caller, how long delivery takes in the
+background, and checks that every replacement teacher got exactly one
+SMS listing all of their periods. Run from the repo root:
+
+    python benchmarks/notification_benchmark.py [teachers] [--absent 0.3] [--latency 0.2]
+        [--fail-rate 0.2]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_school import generate_school  # noqa: E402
+from utils.assignment import solve_day  # noqa: E402
+from utils.notification_queue import HttpTransport, get_notification_queue, notify_replacements  # noqa: E402
+from utils.timetable import TimetableCache  # noqa: E402
+from utils.user_directory import get_user_directory  # noqa: E402
+
+
+class Gateway(ThreadingHTTPServer):
+    """SMS gateway stand-in: records accepted messages, fails some on purpose"""
+
+    daemon_threads = True
+
+    def __init__(self, latency, fail_rate):
+        super().__init__(("127.0.0.1", 0), GatewayHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(0)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.rejected = 0
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            failed = self.server.rng.random() < self.server.fail_rate
+            if failed:
+                self.server.rejected += 1
+            else:
+                self.server.messages.append(body)
+        self.send_response(503 if failed else 200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("teachers", type=int, nargs="?", default=400)
+    parser.add_argument("--absent", type=float, default=0.3, help="share of teachers absent")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per gateway request")
+    parser.add_argument("--fail-rate", type=float, default=0.2, help="share of requests answered with 503")
+    args = parser.parse_args()
+
+    gateway = Gateway(args.latency, args.fail_rate)
+    threading.Thread(target=gateway.serve_forever, daemon=True).start()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            generate_school(workdir, teachers=args.teachers, history_days=1)
+            timetable = TimetableCache().get()
+            today = datetime.date.today()
+            monday = today - datetime.timedelta(days=today.weekday())
+            absent_ids = random.Random(1).sample(timetable.teacher_ids, max(int(args.teachers * args.absent), 1))
+            arrangements = pd.DataFrame(solve_day(timetable, monday, absent_ids, status="ASSIGNED"))
+
+            queue = get_notification_queue()
+            queue.backoff = 0.1
+            queue.set_transport(HttpTransport(f"http://127.0.0.1:{gateway.server_port}/sms"))
+            start = time.perf_counter()
+            queued = notify_replacements(monday, arrangements)
+            returned = time.perf_counter() - start
+            drained = queue.drain(timeout=600)
+            delivered = time.perf_counter() - start
+
+            directory = get_user_directory()
+            expected = Counter(
+                directory.get_by_teacher_id(tid)["phone"]
+                for tid in arrangements["replacement_teacher"] if tid
+            )
+        finally:
+            os.chdir(cwd)
+            gateway.shutdown()
+
+    received = Counter(message["to"] for message in gateway.messages)
+    wrong = [phone for phone, lines in expected.items()
+             if received[phone] != 1 or
+             (lines > 1 and not next(m["text"] for m in gateway.messages if m["to"] == phone).startswith(f"{lines} "))]
+    print(f"{len(arrangements)} arrangements, {queued} lines queued for {len(expected)} teachers")
+    print(f"publish returned in {returned * 1000:.1f} ms; delivered in {delivered:.2f} s "
+          f"({gateway.rejected} gateway errors retried, {len(queue.failed())} failed)")
+    print(f"{len(wrong)} teachers without exactly one SMS covering all of their periods")
+    sys.exit(1 if wrong or queue.failed() or not drained else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Term-long policy replay, inline vs. on a process pool
+
+Generates a synthetic school with a term of attendance history, replays
+every absence under all utils.policy_simulator policies once inline and
+once with the (policy, week) tasks spread over one worker process per CPU
+(at least two), checks both give the same report and prints it with the
+timings. The "balanced" policy alone is timed the same way, since a
+single policy has to parallelize over weeks. Run from the repo root:
+
+    python benchmarks/policy_simulator_benchmark.py [teachers] [history_days]
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_school import generate_school  # noqa: E402
+from utils.attendance_store import migrate  # noqa: E402
+from utils.policy_simulator import POLICIES, simulate  # noqa: E402
+
+
+def main():
+    teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    history_days = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=history_days)
+    workers = max(os.cpu_count() or 1, 2)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            generate_school(workdir, teachers=teachers, history_days=history_days, end=end)
+            migrate()
+            began = time.perf_counter()
+            inline = simulate(start, end, workers=1)
+            inline_s = time.perf_counter() - began
+            began = time.perf_counter()
+            pooled = simulate(start, end, workers=workers)
+            pooled_s = time.perf_counter() - began
+            single = {"balanced": POLICIES["balanced"]}
+            began = time.perf_counter()
+            single_inline = simulate(start, end, single, workers=1)
+            single_inline_s = time.perf_counter() - began
+            began = time.perf_counter()
+            single_pooled = simulate(start, end, single, workers=workers)
+            single_pooled_s = time.perf_counter() - began
+        finally:
+            os.chdir(cwd)
+
+    print(pooled.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print(f"\n{teachers} teachers, {pooled['days'].iloc[0]} days, {len(pooled)} policies: "
+          f"inline {inline_s:.1f} s, {workers} workers {pooled_s:.1f} s")
+    print(f"balanced alone: inline {single_inline_s:.1f} s, {workers} workers {single_pooled_s:.1f} s")
+    same = inline.equals(pooled) and single_inline.equals(single_pooled)
+    if not same:
+        print("Inline and pooled reports differ")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
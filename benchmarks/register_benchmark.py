@@ -0,0 +1,83 @@
+"""Registration cost vs. users.csv size
+
+Compares the old read/concat/rewrite registration path with the locked
+append path used by `auth.register_user`. Run from the repo root:
+
+    python benchmarks/register_benchmark.py
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.user_directory import USER_COLUMNS, UserDirectory  # noqa: E402
+
+SIZES = [100, 1_000, 10_000, 50_000]
+REGISTRATIONS = 50
+
+
+def make_users_file(path, n):
+    password = hashlib.sha256(b"password").hexdigest()
+    pd.DataFrame(
+        {
+            "username": [f"user{i}" for i in range(n)],
+            "password": password,
+            "name": [f"Teacher {i}" for i in range(n)],
+            "phone": [str(9000000000 + i) for i in range(n)],
+            "teacher_id": [f"T{i:05d}" for i in range(n)],
+            "category": "TGT",
+            "role": "teacher",
+        }
+    )[USER_COLUMNS].to_csv(path, index=False)
+
+
+def legacy_register(path, record):
+    users_df = pd.read_csv(path)
+    if record["username"] in users_df["username"].values:
+        return False
+    users_df = pd.concat([users_df, pd.DataFrame([record])], ignore_index=True)
+    users_df.to_csv(path, index=False)
+    return True
+
+
+def time_per_call(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - start) / n * 1000
+
+
+def main():
+    print(f"{'users':>8} {'legacy ms':>10} {'append ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in SIZES:
+            legacy_path = os.path.join(tmp, f"legacy_{n}.csv")
+            append_path = os.path.join(tmp, f"append_{n}.csv")
+            make_users_file(legacy_path, n)
+            make_users_file(append_path, n)
+
+            def record(i):
+                return {
+                    "username": f"new{i}",
+                    "password": "x",
+                    "name": "New Teacher",
+                    "phone": str(8000000000 + i),
+                    "teacher_id": f"N{i:05d}",
+                    "role": "teacher",
+                }
+
+            directory = UserDirectory(append_path)
+            directory.get("warmup")  # initial load is a one-off per process
+            legacy_ms = time_per_call(lambda i: legacy_register(legacy_path, record(i)), REGISTRATIONS)
+            append_ms = time_per_call(lambda i: directory.add(record(i)), REGISTRATIONS)
+            print(f"{n:>8} {legacy_ms:>10.2f} {append_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Cold-start import budget for main.py
+
+Imports, in a fresh interpreter, Streamlit plus the utils modules main.py
+imports at top level, then resolves the page navigation through
+utils.pages for every role, as the login screen does. Fails (exit code 1)
+if that takes longer than the budget, if any chart library from
+utils.pages.HEAVY_MODULES got loaded, or if routing imported a page
+module. main.py's other imports (data_manager, auth and its Firebase /
+notifications clients) aren't timed. Run from the repo root:
+
+    python benchmarks/startup_benchmark.py [budget_seconds]
+"""
+
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.pages import HEAVY_MODULES, PAGES  # noqa: E402
+
+DEFAULT_BUDGET = 3.0
+ROLES = ["admin", "teacher"]
+
+PROBE = """
+import importlib, json, sys, time
+modules, roles = json.loads(sys.argv[1]), json.loads(sys.argv[2])
+start = time.perf_counter()
+for name in modules:
+    importlib.import_module(name)
+from utils.pages import visible_pages
+for role in roles:
+    visible_pages(role)
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": sorted(sys.modules)}))
+"""
+
+
+def startup_imports(path=os.path.join(ROOT, "main.py")):
+    """Return the modules main.py imports at module level"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def routing_imports(modules):
+    """Streamlit and the utils modules among `modules`"""
+    return ["streamlit"] + [name for name in modules if name.split(".")[0] == "utils"]
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET
+    modules = routing_imports(startup_imports())
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(modules), json.dumps(ROLES)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(result.returncode)
+    report = json.loads(result.stdout)
+    loaded = set(report["loaded"])
+    heavy = sorted(set(HEAVY_MODULES) & {name.split(".")[0] for name in loaded})
+    pages = sorted({page.module for page in PAGES.values()} & loaded - set(modules))
+
+    print(f"Startup imports and routing: {report['seconds']:.2f}s (budget {budget:.2f}s)")
+    if heavy:
+        print(f"FAIL: chart libraries imported at startup: {', '.join(heavy)}")
+    if pages:
+        print(f"FAIL: page modules imported while routing: {', '.join(pages)}")
+    if report["seconds"] > budget:
+        print("FAIL: startup import time over budget")
+    if heavy or pages or report["seconds"] > budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Synthetic school generator
+
+Writes a complete data directory in the app's CSV layout:
+
+    <root>/attached_assets/users.csv
+    <root>/attached_assets/schedule_<day>.csv   (monday..saturday)
+    <root>/attached_assets/attendance.csv
+    <root>/attached_assets/arrangements.csv
+    <root>/substitutes.csv
+    <root>/configs/timing.csv, suspended_dates.csv
+
+Timetables are clash-free (no teacher or section is double-booked in a
+period), teachers only take grades their category covers, attendance has
+occasional re-marks, and arrangements cover every absent teacher's
+classes with a free colleague. The substitute pool uses the day codes
+("MWF", "TTh") of the real file and lists some people twice. Run from the repo root:
+
+    python benchmarks/synthetic_school.py OUT_DIR [--teachers 200] [--periods 8]
+        [--sections N] [--history-days 120] [--substitutes N] [--seed 0]
+"""
+
+import argparse
+import datetime
+import hashlib
+import os
+import random
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.assignment import match_quality  # noqa: E402
+from utils.sqlite_backend import SUBSTITUTE_COLUMNS  # noqa: E402
+from utils.timetable import DAYS  # noqa: E402
+from utils.user_directory import USER_COLUMNS  # noqa: E402
+
+CATEGORY_GRADES = {
+    "PRT": ["I", "II", "III", "IV", "V"],
+    "TGT": ["VI", "VII", "VIII", "IX", "X"],
+    "PGT": ["XI", "XII"],
+}
+CATEGORY_SHARE = {"PRT": 0.3, "TGT": 0.45, "PGT": 0.25}
+CATEGORY_SUBJECTS = {
+    "PRT": ["ENGLISH", "HINDI", "MATHS", "EVS"],
+    "TGT": ["ENGLISH", "HINDI", "MATHS", "SCIENCE", "SST", "SANSKRIT"],
+    "PGT": ["ENGLISH", "MATHS", "PHYSICS", "CHEMISTRY", "BIOLOGY", "ACCOUNTANCY", "PHE"],
+}
+FIRST_NAMES = ["Akash", "Anju", "Arvind", "Babita", "Deepak", "Geetesh", "Krishna", "Meeta", "Neha", "Pooja",
+               "Preeti", "Rahul", "Ritu", "Sandeep", "Seema", "Sunil", "Usha", "Vikas"]
+LAST_NAMES = ["Sharma", "Kushwah", "Rawat", "Jain", "Kumari", "Verma", "Singh", "Gupta", "Yadav", "Tiwari"]
+
+TEACHING_LOAD = 0.75  # share of teacher-periods spent teaching
+ABSENCE_RATE = 0.06
+DUPLICATE_SUBSTITUTE_RATE = 0.05
+AVAILABILITY_CODES = ["MWF", "TTh", "TThSa", "M-F", "all", "MTW", "ThFSa", "Sa"]
+REMARK_RATE = 0.02
+PASSWORD = "password"
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def make_teachers(n_teachers, rng):
+    teachers = []
+    categories = list(CATEGORY_SHARE)
+    weights = [CATEGORY_SHARE[c] for c in categories]
+    for i in range(n_teachers):
+        category = categories[i % 3] if i < 3 else rng.choices(categories, weights)[0]
+        teachers.append({
+            "teacher_id": f"T{i + 1:03d}",
+            "name": _name(rng),
+            "category": category,
+            "subject": rng.choice(CATEGORY_SUBJECTS[category]),
+        })
+    return teachers
+
+
+def make_sections(teachers, n_sections, rng):
+    """Sections per category, sized to the teaching load of that category"""
+    sections = []
+    for category, grades in CATEGORY_GRADES.items():
+        staff = sum(1 for t in teachers if t["category"] == category)
+        count = n_sections * staff // len(teachers) if n_sections else round(staff * TEACHING_LOAD)
+        # Section labels are single letters, so at most 26 per grade
+        for i in range(min(max(count, 1), 26 * len(grades))):
+            grade = grades[i % len(grades)]
+            sections.append((category, grade, chr(ord("A") + i // len(grades))))
+    return sections
+
+
+def make_day(teachers, sections, periods, rng):
+    """{teacher_id: [cell per period]} with no teacher or section clashes"""
+    cells = {t["teacher_id"]: ["FREE"] * periods for t in teachers}
+    by_category = {c: [t for t in teachers if t["category"] == c] for c in CATEGORY_GRADES}
+    for period in range(periods):
+        busy = set()
+        for category, grade, section in rng.sample(sections, len(sections)):
+            pool = [t for t in by_category[category] if t["teacher_id"] not in busy]
+            if not pool:
+                continue
+            teacher = rng.choice(pool)
+            busy.add(teacher["teacher_id"])
+            cells[teacher["teacher_id"]][period] = f"({grade} {section}) {teacher['subject']}"
+    return cells
+
+
+def school_days(end, history_days):
+    """Working days (no Sundays) in the `history_days` days ending at `end`"""
+    days = (end - datetime.timedelta(days=offset) for offset in range(history_days - 1, -1, -1))
+    return [day for day in days if day.weekday() != 6]
+
+
+def make_substitutes(n_substitutes, rng):
+    """Substitute rows; a few people are listed again under a new id"""
+    subjects = sorted({subject for names in CATEGORY_SUBJECTS.values() for subject in names})
+    substitutes = []
+    for i in range(n_substitutes):
+        if substitutes and rng.random() < DUPLICATE_SUBSTITUTE_RATE:
+            substitutes.append({**rng.choice(substitutes), "substitute_id": f"S{i + 1:03d}"})
+            continue
+        substitutes.append({
+            "substitute_id": f"S{i + 1:03d}", "name": _name(rng), "phone": str(7000000000 + i),
+            "subject_expertise": ",".join(s.lower() for s in rng.sample(subjects, rng.randint(1, 3))),
+            "qualification": rng.choice(["B.Ed", "M.Ed"]), "availability": rng.choice(AVAILABILITY_CODES),
+            "rating": round(rng.uniform(1, 5), 1), "category": rng.choice(list(CATEGORY_GRADES)), "notes": "",
+        })
+    return substitutes
+
+
+def generate_school(root, teachers=200, periods=8, sections=None, history_days=120, seed=0, end=None,
+                    substitutes=None):
+    """Write a synthetic school under `root`; returns row counts per file"""
+    rng = random.Random(seed)
+    end = end or datetime.date.today()
+    assets = os.path.join(root, "attached_assets")
+    os.makedirs(assets, exist_ok=True)
+
+    staff = make_teachers(teachers, rng)
+    section_list = make_sections(staff, sections, rng)
+    timetable = {day: make_day(staff, section_list, periods, rng) for day in DAYS}
+
+    password = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    users = [
+        {"username": f"teacher{i + 1}", "password": password, "name": t["name"].upper(),
+         "phone": str(9000000000 + i), "teacher_id": t["teacher_id"], "category": t["category"], "role": "teacher"}
+        for i, t in enumerate(staff)
+    ]
+    users.append({"username": "admin", "password": password, "name": "ADMIN", "phone": "8999999999",
+                  "teacher_id": "", "category": "", "role": "admin"})
+    pd.DataFrame(users, columns=USER_COLUMNS).to_csv(os.path.join(assets, "users.csv"), index=False)
+
+    period_cols = [f"period{p + 1}" for p in range(periods)]
+    for day, cells in timetable.items():
+        rows = [{**t, **dict(zip(period_cols, cells[t["teacher_id"]]))} for t in staff]
+        pd.DataFrame(rows, columns=["teacher_id", "name", "category", "subject"] + period_cols).to_csv(
+            os.path.join(assets, f"schedule_{day}.csv"), index=False
+        )
+
+    attendance, arrangements = [], []
+    by_id = {t["teacher_id"]: t for t in staff}
+    for date in school_days(end, history_days):
+        day = date.strftime("%A").lower()
+        absent = {t["teacher_id"] for t in staff if rng.random() < ABSENCE_RATE}
+        for t in staff:
+            status = "absent" if t["teacher_id"] in absent else "present"
+            stamp = datetime.datetime.combine(date, datetime.time(8, rng.randrange(60)))
+            if rng.random() < REMARK_RATE:
+                attendance.append({"date": date.isoformat(), "teacher_id": t["teacher_id"],
+                                   "status": "absent" if status == "present" else "present",
+                                   "timestamp": stamp.strftime("%Y-%m-%d %H:%M:%S"), "is_auto": False})
+                stamp += datetime.timedelta(minutes=20)
+            attendance.append({"date": date.isoformat(), "teacher_id": t["teacher_id"], "status": status,
+                               "timestamp": stamp.strftime("%Y-%m-%d %H:%M:%S"), "is_auto": False})
+        cells = timetable[day]
+        for period in range(periods):
+            free = [tid for tid in cells if cells[tid][period] == "FREE" and tid not in absent]
+            rng.shuffle(free)
+            for tid in sorted(absent):
+                cell = cells[tid][period]
+                if cell == "FREE":
+                    continue
+                replacement = by_id[free.pop()] if free else None
+                arrangements.append({
+                    "date": date.isoformat(),
+                    "absent_teacher": tid,
+                    "replacement_teacher": replacement["teacher_id"] if replacement else "",
+                    "class": cell,
+                    "period": period + 1,
+                    "status": "ASSIGNED" if date < end else "PENDING",
+                    "absent_category": by_id[tid]["category"],
+                    "replacement_category": replacement["category"] if replacement else "",
+                    "match_quality": match_quality(by_id[tid]["category"], replacement["category"] if replacement else ""),
+                    "absent_name": by_id[tid]["name"],
+                    "replacement_name": replacement["name"] if replacement else "",
+                })
+    pd.DataFrame(attendance).to_csv(os.path.join(assets, "attendance.csv"), index=False)
+    pd.DataFrame(arrangements).to_csv(os.path.join(assets, "arrangements.csv"), index=False)
+
+    substitutes = make_substitutes(max(teachers // 10, 1) if substitutes is None else substitutes, rng)
+    pd.DataFrame(substitutes, columns=SUBSTITUTE_COLUMNS).to_csv(os.path.join(root, "substitutes.csv"), index=False)
+
+    # Complete data root, usable as a school in configs/tenants.csv
+    configs = os.path.join(root, "configs")
+    os.makedirs(configs, exist_ok=True)
+    pd.DataFrame([{"hour": 15, "minute": 1, "enabled": False}]).to_csv(os.path.join(configs, "timing.csv"), index=False)
+    pd.DataFrame(columns=["date"]).to_csv(os.path.join(configs, "suspended_dates.csv"), index=False)
+
+    return {
+        "users": len(users),
+        "schedule_rows": len(staff),
+        "sections": len(section_list),
+        "attendance": len(attendance),
+        "arrangements": len(arrangements),
+        "substitutes": len(substitutes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root")
+    parser.add_argument("--teachers", type=int, default=200)
+    parser.add_argument("--periods", type=int, default=8)
+    parser.add_argument("--sections", type=int, default=None)
+    parser.add_argument("--history-days", type=int, default=120)
+    parser.add_argument("--substitutes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    counts = generate_school(args.root, args.teachers, args.periods, args.sections, args.history_days, args.seed,
+                             substitutes=args.substitutes)
+    print(", ".join(f"{name}={count}" for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Streaming timetable import on a large section-wise workbook
+
+Generates a synthetic school, writes its timetable as the section-wise
+master workbook schools usually keep (one sheet per day, one row per
+section, "SUBJECT T012" cells), imports it with utils.timetable_import
+and checks the compiled timetable against the generated one (teachers
+with no classes all week can't appear in a section-wise workbook).
+Reports time, peak Python memory during the import (tracemalloc slows
+the import itself down) and the workbook size. Run
+from the repo root (needs openpyxl):
+
+    python benchmarks/timetable_import_benchmark.py [teachers] [periods]
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import pandas as pd
+from openpyxl import Workbook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_school import generate_school  # noqa: E402
+from utils.timetable import DAYS, TimetableCache  # noqa: E402
+from utils.timetable_import import import_timetable  # noqa: E402
+
+_CELL = re.compile(r"^\((?P<section>[^)]+)\) (?P<subject>.+)$")
+
+
+def write_section_workbook(path, periods):
+    """Invert the generated schedule_<day>.csv files into a section-wise workbook"""
+    workbook = Workbook(write_only=True)
+    sections = 0
+    for day in DAYS:
+        schedule = pd.read_csv(f"attached_assets/schedule_{day}.csv", dtype=str, keep_default_na=False)
+        rows = defaultdict(dict)
+        for record in schedule.to_dict("records"):
+            for p in range(1, periods + 1):
+                match = _CELL.match(record[f"period{p}"])
+                if match:
+                    rows[match.group("section")][p] = f"{match.group('subject')} {record['teacher_id']}"
+        sheet = workbook.create_sheet(day.title())
+        sheet.append([f"{day.title()} timetable"])
+        sheet.append(["Class"] + [f"Period {p}" for p in range(1, periods + 1)])
+        for section in sorted(rows):
+            sheet.append([section] + [rows[section].get(p, "") for p in range(1, periods + 1)])
+        sections = max(sections, len(rows))
+    workbook.save(path)
+    return sections
+
+
+def main():
+    teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    periods = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            generate_school(workdir, teachers=teachers, periods=periods, history_days=1)
+            expected = TimetableCache().get()
+            workbook = os.path.join(workdir, "master.xlsx")
+            sections = write_section_workbook(workbook, periods)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            report = import_timetable(workbook)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            imported = TimetableCache().get()
+            mismatches = sum(
+                set(expected.free_teachers(day, p)) & set(imported.teacher_ids) != set(imported.free_teachers(day, p))
+                for day in DAYS for p in range(1, periods + 1)
+            )
+        finally:
+            os.chdir(cwd)
+        print(f"{teachers} teachers, {sections} sections, {periods} periods, "
+              f"workbook {os.path.getsize(workbook) / 1024:.0f} KB")
+    errors = [issue for issue in report.issues if issue.severity == "error"]
+    print(f"import {elapsed:.2f} s, peak {peak / 1024 / 1024:.1f} MB, {len(errors)} errors, "
+          f"{mismatches} day/periods differ from the source timetable")
+    sys.exit(1 if errors or mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
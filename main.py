@@ -6,28 +6,21 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
-import pandas as pd
-import os
-import pathlib
 from streamlit_lottie import st_lottie
 import re
-import json
-from auth import check_password, register_user, send_password_reset_otp, reset_password, get_user_role
+from auth import check_password, register_user, send_password_reset_otp, wait_for_otp, reset_password, get_user_role
 from data_manager import DataManager
 from utils.theme import initialize_theme, toggle_theme, apply_theme
-from components.dashboard import render_dashboard
-from components.admin_controls import render_admin_page
-from components.reports import render_reports_page
-from components.arrangements import render_arrangements_page
-from components.schedule_manager import render_schedule_manager_page
-from components.substitute_pool import render_substitute_pool_page
-from components.coverage_tracking import render_coverage_tracking_page
-
-# from components.contact import render_contact_page
-from components.legal_pages import render_terms_and_conditions, render_contact_page
+from utils.user_directory import get_user_directory
+from utils.assets import ensure_asset_budgets, load_json_asset, load_lottie_animation, static_text
+from utils.pages import render_page, visible_pages
+from utils.profiling import begin_rerun, end_rerun, install_io_hooks, section, set_page
+from utils.auto_attendance import start_auto_attendance
+from utils.notification_queue import start_notifications
+from utils.file_watcher import start_file_watcher
+from utils.snapshot import current_snapshot
 
 # import firebase_admin
-from streamlit.components.v1 import html
 
 
 def load_svg(file_path):
@@ -36,15 +29,25 @@ def load_svg(file_path):
 
 
 def serve_static_file(filename):
-    filepath = os.path.join("static", filename)
-    with open(filepath, "r", encoding="utf-8") as file:
-        st.markdown(
-            f'<script type="application/json" id="{filename}">{file.read()}</script>',
-            unsafe_allow_html=True,
-        )
+    st.markdown(
+        f'<script type="application/json" id="{filename}">{static_text(filename)}</script>',
+        unsafe_allow_html=True,
+    )
+
 
+# Per-rerun timings and CSV I/O counters (admin "Performance" page)
+install_io_hooks()
+begin_rerun(st.session_state.get("current_page"))
 
-serve_static_file("manifest.json")
+with section("startup"):
+    ensure_asset_budgets()
+    # Invalidates data caches when files under attached_assets/ or configs/ change
+    start_file_watcher()
+    # Background auto-attendance: one per server process, no-op on later reruns
+    start_auto_attendance()
+    # Batched SMS to replacement teachers as arrangements are assigned
+    start_notifications()
+    serve_static_file("manifest.json")
 
 
 # Helper function to wrap SVG with styles
@@ -53,213 +56,14 @@ def svg_with_style(svg_content, color="currentColor", size=24):
     return f"""<div style="display: inline-block; width: {size}px; height: {size}px;">{colored_svg}</div>"""
 
 
-# Load a lottie animation file
+# Load a lottie animation file (parsed once per process)
 def load_lottie_file(filepath):
-    try:
-        if pathlib.Path(filepath).exists():
-            with open(filepath, "r") as f:
-                return json.load(f)
-        else:
-            return None
-    except Exception as e:
-        print(f"Error loading animation: {e}")
-        return None
+    return load_json_asset(filepath)
 
 
 if "initialized" not in st.session_state:
     st.session_state["initialized"] = True
 
-st.markdown(
-    """
-<script>
-    if ('serviceWorker' in navigator) {
-        navigator.serviceWorker.register('/static/sw.js')
-        .then(() => console.log('Service Worker Registered'))
-        .catch(err => console.log('Service Worker Registration Failed:', err));
-    }
-</script>
-""",
-    unsafe_allow_html=True,
-)
-st.markdown(
-    f"""
-    <style>
-     /* Default header styling */
-    header[data-testid="stHeader"] {{
-        display: flex ;
-        background: linear-gradient(45deg, #1E3A8A, #3B82F6);
-        padding: 10px !important;
-        box-shadow: 0 0 10px rgba(0,0,0,0. 1) !important;
-        height:50px;
-        align-items: center;
-        text-align:center;
-        justy
-        }}
-    button[data-testid="stBaseButton-secondaryFormSubmit"] {{
-        background: linear-gradient(90deg, #1E3A8A, #3B82F6);
-        color: white !important; /* Optional: Change text color for better contrast */
-        border: none !important; /* Optional: Remove border if needed */
-}}    
-    header[data-testid="stHeader"] span {{
-        display: flex ;
-        color: white !important ;
-        }}       
-    svg {{
-        fill:black!important;  /* Change to any color */
-    }}  
-
-        section[data-testid="stSidebar"] img {{
-        margin-top: -40px !important;
-        margin-left: 70px;
-        filter: drop-shadow(0 5px 10px rgba(0,0,0,0.3));
-        transition: all 0.3s ease;
-    }}
-    .custom-image {{
-        filter: drop-shadow(0 5px 10px rgba(0,0,0,0.3));
-        transition: all 0.3s ease;
-    }}
-    
-    .custom-image:hover {{
-     transform: scale(1.05);
-    }}
-
-    section[data-testid="stSidebar"] img:hover {{
-        transform: scale(1.05);
-    }}
-     /* Sidebar background gradient */
-    [data-testid="stSidebar"] {{
-            position: fixed !important;
-            height: 100vh !important;
-            top: 0;
-            left: 0;
-            width: 300px !important; 
-            background: linear-gradient(135deg, #4568dc, #b06ab3)!important;
-            color: #141212 ;
-            overflow-x: auto !important; /* Scroll enable */
-    }}
-        .st-bde5z3 .st-bpb {{
-        background-color: #4CAF50 !important; /* Green */
-        color: white !important;
-        font-weight: bold !important;
-        border-radius: 5px !important;
-    }}
-
-        div[data-testid="stAppViewContainer"] {{
-            margin-left: 259px ;
-            margin-right:;
-            margin-top:-20px;
-        }}
-
-    
-
-# section[data-testid="stSidebar"] {{
-#     display: flex !important;
-#     flex-direction: column; /* Ensure vertical stacking */
-#     align-items: center !important; /* Center the content horizontally */
-# }}
-    section[data-testid="stSidebar"] img {{
-    margin-top: -40px!important;
-    margin-left:70px;
-    }}
-    [data-testid="stSidebar"] button {{
-    background-color:#FFFFFF1A !important;
-    font-weight: 700 !important;
-}}
-\
-.st-emotion-cache-fvlxsx p {{
-    font-weight: bold;
-}}
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-st.markdown(
-    """
-    <script>
-    window.onload = function() {
-        var buttons = document.querySelectorAll('button[kind="secondary"].st-emotion-cache-1r6p0uf.e1d5ycv52');
-        buttons.forEach(function(button) {
-            button.style.backgroundColor = 'green';
-            button.style.color = 'white';
-            button.style.fontWeight = 'bold';
-        });
-    };
-    </script>
-    """,
-    unsafe_allow_html=True,
-)
-st.markdown(
-    """
-            <style>
-                div[data-testid="stHorizontalBlock"] button {
-                    font-weight: bold !important;
-                }
-                button[kind="secondary"].st-emotion-cache-1r6p0uf.e1d5ycv52 p {
-                       /* Aapka desired font color */
-                font-weight: 600 !important;   /* Bold font */
-                font-size:17px
-} 
-button[data-testid="stBaseButton-headerNoPadding"] svg.st-emotion-cache-1b2ybtsex0cdmw0 {
-    fill: white !important;
-}         
-            </style>
-        """,
-    unsafe_allow_html=True,
-)
-
-
-st.markdown(
-    """
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@400;500;600;700&display=swap');
-        body { font-family: 'Poppins', sans-serif; }
-
-        * {
-            color: #2E2E2E; /* Dark Gray */
-        }
-        .stButton > button {
-            font-weight: 700 !important;
-            color: #d32f2f !important;
-            background-color:#;
-            padding: 10px 20px;
-            transition: all 0.3s ease;
-        }
-        button {
-            font-weight: 700;}
-        
-        .stButton > button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(0,0,0,0.1);
-            color:d32f2f;
-        }
-
-        .stTextInput > div > div > input {
-            background-color: #E0E0E0 ;
-            border: 2px solid #e9ecef;
-            border-radius: 10px;
-            padding: 15px;
-            font-size: 16px;
-            transition: all 0.3s ease;
-        }
-
-        .stTextInput > div > div > input:focus {
-            border-color: #2e7d32;
-            box-shadow: 0 0 0 2px rgba(46, 125, 50, 0.2);
-        }
-
-        .error-message {
-            color: #FFD700;
-            background-color: #ffebee;
-            padding: 10px;
-            border-radius: 5px;
-            margin: 10px 0;
-        }
-
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
 st.sidebar.image(
     "attached_assets/logo.png",
     width=100,
@@ -286,6 +90,10 @@ if "user" not in st.session_state:
 if "role" not in st.session_state:
     st.session_state.role = None
 if "data_manager" not in st.session_state:
+    # DataManager is mutable, so each session keeps its own; read-only data
+    # shared by all sessions comes from utils.snapshot.current_snapshot().
+    # It only reads the repo's own data; schools in configs/tenants.csv only
+    # get their background jobs (utils/tenants.py).
     st.session_state.data_manager = DataManager()
 if "current_page" not in st.session_state:
     st.session_state.current_page = "dashboard"
@@ -295,12 +103,15 @@ if "reset_otp" not in st.session_state:
     st.session_state.reset_otp = None
 if "reset_phone" not in st.session_state:
     st.session_state.reset_phone = None
+if "dark_mode" not in st.session_state:
+    st.session_state.dark_mode = False  # Default light mode
 
-# Initialize theme
-initialize_theme()
-apply_theme()
+# Initialize theme (installs the compiled stylesheet once per session, see utils/stylesheet.py)
+with section("theme"):
+    initialize_theme()
+    apply_theme()
 
-with st.sidebar:
+with section("sidebar"), st.sidebar:
     st.markdown(
         """
         <div style="display: flex; align-items: center; margin-bottom: 20px;margin-left:8px;">
@@ -314,26 +125,17 @@ with st.sidebar:
         unsafe_allow_html=True,
     )
     if st.session_state.authenticated:
-        if "dark_mode" not in st.session_state:
-            st.session_state.dark_mode = False  # Default light mode
-
         # Toggle theme function
         def toggle_theme():
             st.session_state.dark_mode = not st.session_state.dark_mode
 
-        # Theme ke hisaab se icon, text aur font style select karna
+        # Theme ke hisaab se icon aur text select karna
         if st.session_state.dark_mode:
             icon = ":material/light_mode:"  # Sun icon
             button_text = "Enable Light Mode"
-            background_color = "#121212"
-            text_color = "#E0E0E0"
-            font_family = "'Fira Code', monospace"  # Dark Mode ke liye alag font
         else:
             icon = ":material/dark_mode:"  # Moon icon
             button_text = "Enable Dark Mode"
-            background_color = "#f2f2f2"
-            text_color = "#333333"
-            font_family = "'Inter', sans-serif"  # Light Mode ke liye alag font
 
         # Toggle button
         if st.button(
@@ -344,139 +146,22 @@ with st.sidebar:
         ):
             st.rerun()  # UI update karne ke liye page reload karna
 
-        # Background, text color, aur font style apply karna
-        theme_style = f"""
-    <style>
-        body, .main, .stApp {{
-            background-color: {background_color} !important;
-            color: {text_color} !important;
-            font-family: {font_family} !important;
-        }}
-        .stButton>button {{
-            # background-color: #444 !important;
-            color: white !important;
-            font-size: 16px !important;
-            font-weight: bold !important;
-            border-radius: 5px;
-        }}
-        # .stButton>button:hover {{
-        #   background: linear-gradient(90deg, #1E3A8A, #3B82F6);
-        # }}
-    </style>
-"""
-        st.markdown(theme_style, unsafe_allow_html=True)
-
         st.divider()
         # Navigation
         st.markdown(
             "<h2 style='text-align: center;background:transparent;'>Navigation</h2>",
             unsafe_allow_html=True,
         )
-        # (Aapka pages dictionary yahaan...)
-        pages = {
-            "dashboard": (":material/dashboard:", "Dashboard"),
-            "admin": (":material/admin_panel_settings:", "Administrative Controls"),
-            "arrangements": (":material/swap_horiz:", "Arrangements"),
-            "reports": (":material/bar_chart:", "Reports"),
-            "schedule_manager": (":material/edit_calendar:", "Schedule Manager"),
-            "substitute_pool": (":material/people_alt:", "Substitute Teachers"),
-            "coverage_tracking": (":material/analytics:", "Class Coverage"),
-            "terms": (":material/gavel:", "Terms & Conditions"),
-            "contact": (":material/contact_phone:", "Contact Us"),
-        }
-
-        for page, (icon, label_text) in pages.items():
-            display_label = f"{icon} {label_text}"
+        # Pages registry utils/pages.py me hai (modules lazily import hote hain)
+        for page, entry in visible_pages(st.session_state.role).items():
+            display_label = f"{entry.icon} {entry.label}"
             if st.button(display_label, key=f"nav_{page}", use_container_width=True):
                 st.session_state.current_page = page
             # st.markdown("</div>", unsafe_allow_html=True)
         st.divider()
-        st.markdown(
-            """
-                <style>
-                .profile-card {
-                    background: rgba(255, 255, 255, 0.15);
-                    backdrop-filter: blur(10px);
-                    border-radius: 16px;
-                    padding: 25px;
-                    margin-bottom: 25px;
-                    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-                    border: 1px solid rgba(255, 255, 255, 0.2);
-                    color: white;
-                    position: relative;
-                    overflow: hidden;
-                    transition: all 0.3s ease;
-                }
-                
-                .profile-card:hover {
-                    transform: translateY(-5px);
-                    box-shadow: 0 12px 40px rgba(0, 0, 0, 0.15);
-                }
-                
-                .profile-card::before {
-                    content: '';
-                    position: absolute;
-                    top: -50%;
-                    left: -50%;
-                    width: 200%;
-                    height: 200%;
-                    background: radial-gradient(circle, rgba(255,255,255,0.1) 0%, rgba(255,255,255,0) 70%);
-                    opacity: 0;
-                    transition: opacity 0.5s ease;
-                    z-index: 0;
-                    pointer-events: none;
-                }
-                
-                .profile-card:hover::before {
-                    opacity: 1;
-                }
-                
-                .profile-header {
-                    display: flex;
-                    align-items: center;
-                    margin-bottom: 20px;
-                    position: relative;
-                    z-index: 1;
-                }
-                
-                .profile-avatar {
-                    width: 60px;
-                    height: 60px;
-                    background: linear-gradient(135deg, #4568dc, #b06ab3);
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    margin-right: 15px;
-                    font-size: 24px;
-                    font-weight: 700;
-                    color: white;
-                    box-shadow: 0 4px 10px rgba(0, 0, 0, 0.2);
-                    border: 3px solid rgba(255, 255, 255, 0.2);
-                }
-                
-                .profile-title {
-                    font-size: 1.5rem;
-                    font-weight: 700;
-                    margin: 0;
-                    color: white;
-                    text-shadow: 0 1px 2px rgba(0, 0, 0, 0.1);
-                }
-
-                .profile-subtitle {
-                    font-size: 0.9rem;
-                    opacity: 0.8;
-                    margin: 5px 0 0 0;
-                }
-               
-                 </style>
-                """,
-            unsafe_allow_html=True,
-        )
         # User profile
-        user_details = st.session_state.data_manager.get_user_details(
-            st.session_state.user
-        )
+        with section("sidebar.user_details"):
+            user_details = current_snapshot().users.get(st.session_state.user)
         first_letter = user_details["name"][0].upper() if user_details["name"] else "U"
         if user_details is not None:
 
@@ -535,19 +220,9 @@ with st.sidebar:
 
 
 # Main content
-if not st.session_state["authenticated"]:
-    st.markdown(
-        """
-        <style>
-        div[data-testid="stAppViewContainer"] {
-            margin-top: -180px !important;
-        }
-        </style>
-    """,
-        unsafe_allow_html=True,
-    )
 if not st.session_state.authenticated:
-    lottie_animation = load_lottie_file("attached_assets/lottie_animation.json")
+    set_page("login")
+    lottie_animation = load_lottie_animation()
     st_lottie(lottie_animation, height=130, key="dashboard_lottie")
     st.markdown(
         """
@@ -579,12 +254,19 @@ if not st.session_state.authenticated:
                     if otp:
                         st.session_state.reset_otp = otp
                         st.session_state.reset_phone = phone
-                        st.success("OTP sent successfully!")
+                        st.info("Sending OTP...")
                         st.rerun()
                     else:
-                        st.error("Phone number not found or SMS service error!")
+                        st.error("Phone number not found!")
         else:
             # Step 2: Verify OTP and set new password
+            pending_otp = st.session_state.reset_otp
+            if not pending_otp.done():
+                st.info("Sending OTP... it should arrive shortly.")
+            elif pending_otp.exception() is not None or pending_otp.result() is None:
+                st.error("Could not send the OTP. Go back and try again.")
+            else:
+                st.success("OTP sent successfully!")
             with st.form("reset_password_form_2"):
                 entered_otp = st.text_input("Enter OTP")
                 new_password = st.text_input("New Password", type="password")
@@ -592,7 +274,11 @@ if not st.session_state.authenticated:
                 submitted = st.form_submit_button("Reset Password")
 
                 if submitted:
-                    if entered_otp == st.session_state.reset_otp:
+                    # Sent in the background; normally done long before the form is submitted
+                    sent_otp = wait_for_otp(st.session_state.reset_otp)
+                    if sent_otp is None:
+                        st.error("Could not send the OTP. Go back and try again.")
+                    elif entered_otp == sent_otp:
                         if new_password == confirm_password:
                             if reset_password(
                                 st.session_state.reset_phone, new_password
@@ -652,28 +338,18 @@ if not st.session_state.authenticated:
                 role = st.selectbox("Role", ["teacher", "admin"])
 
                 submitted = st.form_submit_button("Register", use_container_width=True)
-                # Users.csv ka path
-                users_file = "attached_assets/users.csv"
-
-                if not os.path.exists("attached_assets/users.csv"):
-                    print("⚠️ users.csv file NOT FOUND! Creating a new one...")
-                # CSV file ko DataFrame me load karo
-                existing_users_df = pd.read_csv(users_file, dtype={"phone": str})
-
-                # Data check karne ke liye print karo
-                # print(existing_users_df.head())  # Pehle 5 rows dekho
-                # Sirf username aur phone number wale columns ko extract karo
-                user_info = existing_users_df[["username", "phone", "teacher_id"]]
+                # Shared users.csv index (no CSV parse per rerun)
+                user_directory = get_user_directory()
 
                 def is_username_taken(username):
-                    return username in existing_users_df["username"].values
+                    return user_directory.username_exists(username)
 
                 # Function to check phone number validity
                 def is_valid_phone(phone):
                     return (
                         phone.isdigit()
                         and len(phone) == 10
-                        and phone not in existing_users_df["phone"].values
+                        and not user_directory.phone_exists(phone)
                     )
 
                 # Function to check password strength
@@ -685,7 +361,7 @@ if not st.session_state.authenticated:
                     pattern = r"^T\d{3}$"  # "T" ke baad exactly 3 digits
                     return (
                         bool(re.fullmatch(pattern, teacher_id))
-                        and teacher_id not in existing_users_df["teacher_id"].values
+                        and not user_directory.teacher_id_exists(teacher_id)
                     )
 
                 if submitted:
@@ -736,22 +412,12 @@ if not st.session_state.authenticated:
                             )
 
 else:
-    # Render current page
-    if st.session_state.current_page == "dashboard":
-        render_dashboard(st.session_state.data_manager)
-    elif st.session_state.current_page == "admin":
-        render_admin_page(st.session_state.data_manager)
-    elif st.session_state.current_page == "arrangements":
-        render_arrangements_page(st.session_state.data_manager)
-    elif st.session_state.current_page == "reports":
-        render_reports_page(st.session_state.data_manager)
-    elif st.session_state.current_page == "schedule_manager":
-        render_schedule_manager_page(st.session_state.data_manager)
-    elif st.session_state.current_page == "substitute_pool":
-        render_substitute_pool_page()
-    elif st.session_state.current_page == "coverage_tracking":
-        render_coverage_tracking_page(st.session_state.data_manager)
-    elif st.session_state.current_page == "contact":
-        render_contact_page()
-    elif st.session_state.current_page == "terms":
-        render_terms_and_conditions()
+    # Render current page (module imported on first visit)
+    page = st.session_state.current_page
+    if page in visible_pages(st.session_state.role):
+        set_page(page)
+        with section(f"page:{page}"):
+            render_page(page, st.session_state.data_manager)
+
+# Not reached when st.rerun() interrupts the script; that run is dropped
+end_rerun()
@@ -1,8 +0,0 @@
-self.addEventListener('install', (event) => {
-  console.log('Service Worker Installed');
-  event.waitUntil(self.skipWaiting());
-});
-
-self.addEventListener('activate', (event) => {
-  console.log('Service Worker Activated');
-});
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""Arrangements as an append-only event log
+
+Every change to an arrangement is appended to
+attached_assets/arrangement_events.csv as a created / reassigned /
+confirmed / cancelled event with actor and timestamp. A materialized view
+keyed on (date, period, class) holds the current state and is updated in
+place as events are appended, so confirming a slot is one appended line
+instead of a full rewrite of arrangements.csv. The view is rebuilt by
+replaying the log, and compact() squashes the log to one event per live
+arrangement.
+
+    python -m utils.arrangement_log import    # seed from arrangements.csv
+    python -m utils.arrangement_log export    # view -> arrangements.csv
+    python -m utils.arrangement_log compact
+"""
+
+import datetime
+import os
+import sys
+import threading
+
+import pandas as pd
+
+from utils.csv_store import append_rows, cached_file_signature, file_lock, file_signature, write_csv_atomic
+from utils.tenants import tenant_resource
+from utils.timetable import normalize_cell
+from utils.workload import get_workload_ledger
+
+EVENTS_FILE = "attached_assets/arrangement_events.csv"
+ARRANGEMENTS_FILE = "attached_assets/arrangements.csv"
+
+EVENT_TYPES = ("created", "reassigned", "confirmed", "cancelled")
+DETAIL_COLUMNS = [
+    "absent_teacher", "replacement_teacher", "status", "absent_category",
+    "replacement_category", "match_quality", "absent_name", "replacement_name",
+]
+EVENT_COLUMNS = ["timestamp", "actor", "event", "date", "period", "class"] + DETAIL_COLUMNS
+ARRANGEMENT_COLUMNS = [
+    "date", "absent_teacher", "replacement_teacher", "class", "period", "status",
+    "absent_category", "replacement_category", "match_quality", "absent_name", "replacement_name",
+]
+
+# Legacy files mix casings ("assigned", "ASSIGNED", "manually_assigned");
+# UNASSIGNED comes from utils.assignment.solve_day for slots nobody could take
+STATUSES = ("PENDING", "ASSIGNED", "MANUALLY_ASSIGNED", "UNASSIGNED")
+
+_listeners = []
+
+
+def on_change(listener):
+    """Call listener([(old_row, new_row), ...]) after every append that changed the view"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def normalize_status(status):
+    """Upper-case a status; blank means PENDING, unknown values are kept as written"""
+    status = str(status or "").strip().upper()
+    return status or "PENDING"
+
+
+def arrangement_key(date, period, class_label):
+    """View key: (ISO date, int period, canonical class spelling)
+
+    Raises ValueError for a blank date or a period that isn't a whole number.
+    """
+    date = str(date or "").strip()[:10]
+    if not date:
+        raise ValueError("missing date")
+    try:
+        number = float(str(period).strip())
+    except ValueError:
+        raise ValueError(f"bad period {period!r}") from None
+    if not number.is_integer():
+        raise ValueError(f"bad period {period!r}")
+    return (date, int(number), normalize_cell(class_label))
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ArrangementLog:
+    """Event log plus its incrementally maintained current-state view"""
+
+    def __init__(self, path=EVENTS_FILE, ledger=None):
+        self.path = path
+        self.ledger = ledger
+        self._lock = threading.RLock()
+        self._signature = None
+        self._view = {}
+        # (log line, reason) for events the last replay had to skip
+        self.skipped = []
+
+    def _ledger(self):
+        return self.ledger if self.ledger is not None else get_workload_ledger()
+
+    @staticmethod
+    def _apply(view, event):
+        """Apply one event to `view`; returns (old_row, new_row)"""
+        key = arrangement_key(event["date"], event["period"], event["class"])
+        old = view.get(key)
+        kind = event["event"]
+        if kind == "created":
+            new = {col: event.get(col, "") for col in ARRANGEMENT_COLUMNS}
+            new.update(date=key[0], period=key[1], status=normalize_status(event.get("status")))
+        elif old is None:
+            return None, None
+        elif kind == "reassigned":
+            new = dict(old)
+            for col in ("replacement_teacher", "replacement_category", "match_quality", "replacement_name"):
+                if event.get(col) not in (None, ""):
+                    new[col] = event[col]
+            new["status"] = normalize_status(event.get("status") or "MANUALLY_ASSIGNED")
+        elif kind == "confirmed":
+            new = dict(old, status="ASSIGNED")
+        elif kind == "cancelled":
+            new = None
+        else:
+            raise ValueError(f"Unknown arrangement event: {kind}")
+        if new is None:
+            view.pop(key, None)
+        else:
+            view[key] = new
+        return old, new
+
+    def _refresh(self):
+        signature = cached_file_signature(self.path)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature != self._signature:
+                self._view = self.replay()
+                self._signature = signature
+
+    def replay(self):
+        """Rebuild the view from scratch by replaying the whole log
+
+        Events with a bad key or type are skipped, listed in `skipped` and
+        reported, so one bad line can't take down the whole view.
+        """
+        view, skipped = {}, []
+        if file_signature(self.path) is not None:
+            events = pd.read_csv(self.path, dtype=str, keep_default_na=False)
+            # Line 1 is the header
+            for line, event in enumerate(events.to_dict("records"), start=2):
+                try:
+                    self._apply(view, event)
+                except ValueError as e:
+                    skipped.append((line, str(e)))
+        if skipped:
+            print(f"Skipped {len(skipped)} bad arrangement events in {self.path}: {skipped[:5]}")
+        self.skipped = skipped
+        return view
+
+    def append(self, events, actor="system"):
+        """Append events (dicts with EVENT_COLUMNS) and update the view
+
+        All events go out in one locked append; workload counters are
+        adjusted for every state change, also when another process wrote
+        to the log since this one last read it, and on_change() listeners
+        get the same changes. A batch holding an event with an unknown type
+        or a bad (date, period) key raises ValueError and nothing is written.
+        """
+        stamp = _now()
+        events = [
+            {**event, "timestamp": event.get("timestamp") or stamp, "actor": event.get("actor") or actor}
+            for event in events
+        ]
+        for event in events:
+            if event["event"] not in EVENT_TYPES:
+                raise ValueError(f"Unknown arrangement event: {event['event']}")
+            # Reject bad keys before anything is written
+            arrangement_key(event.get("date"), event.get("period"), event.get("class"))
+        if not events:
+            return
+        with self._lock, file_lock(self.path):
+            # Under the file lock nobody else can append, so once the view
+            # matches the file the batch's changes are computed against
+            # exactly the state it is appended to
+            signature = file_signature(self.path)
+            if signature != self._signature:
+                self._view = self.replay()
+                self._signature = signature
+            changes = [self._apply(self._view, event) for event in events]
+            try:
+                _, self._signature = append_rows(self.path, events, columns=EVENT_COLUMNS)
+            except Exception:
+                # The view already holds the batch; rebuild it on the next read
+                self._signature = None
+                raise
+        changes = [(old, new) for old, new in changes if old is not None or new is not None]
+        if changes:
+            self._ledger().apply_changes(changes)
+            for listener in list(_listeners):
+                try:
+                    listener(changes)
+                except Exception as e:
+                    print(f"Error in arrangement listener: {str(e)}")
+
+    # Convenience wrappers
+
+    def create(self, rows, actor="system"):
+        """Record new arrangements (rows in the arrangements.csv layout)"""
+        self.append([{**row, "event": "created"} for row in rows], actor)
+
+    def confirm(self, keys, actor="system"):
+        """Confirm several (date, period, class) slots in one append"""
+        self.append([{"event": "confirmed", "date": d, "period": p, "class": c} for d, p, c in keys], actor)
+
+    def reassign(self, key, replacement_teacher, actor="system", **details):
+        date, period, class_label = key
+        self.append(
+            [{"event": "reassigned", "date": date, "period": period, "class": class_label,
+              "replacement_teacher": replacement_teacher, **details}],
+            actor,
+        )
+
+    def cancel(self, keys, actor="system"):
+        self.append([{"event": "cancelled", "date": d, "period": p, "class": c} for d, p, c in keys], actor)
+
+    # Queries
+
+    def get(self, date, period, class_label):
+        self._refresh()
+        return self._view.get(arrangement_key(date, period, class_label))
+
+    def current(self, date=None, status=None):
+        """Current arrangements (optionally for one date/status) as a DataFrame"""
+        self._refresh()
+        rows = [
+            row for key, row in sorted(self._view.items())
+            if (date is None or key[0] == str(date)[:10]) and (status is None or row["status"] == status)
+        ]
+        return pd.DataFrame(rows, columns=ARRANGEMENT_COLUMNS)
+
+    def compact(self):
+        """Rewrite the log as one 'created' event per live arrangement"""
+        with self._lock:
+            self._refresh()
+            stamp = _now()
+            events = pd.DataFrame(
+                [{**row, "event": "created", "timestamp": stamp, "actor": "compaction"}
+                 for _, row in sorted(self._view.items())],
+                columns=EVENT_COLUMNS,
+            )
+            write_csv_atomic(events, self.path)
+            self._signature = None
+            self._refresh()
+
+    def export_csv(self, path=ARRANGEMENTS_FILE):
+        """Write the current view in the legacy arrangements.csv layout"""
+        write_csv_atomic(self.current(), path)
+
+
+def import_arrangements(log, path=ARRANGEMENTS_FILE):
+    """Seed an empty log from arrangements.csv (the workload ledger is not touched)"""
+    rows = pd.read_csv(path, dtype=str, keep_default_na=False).to_dict("records")
+    events = [
+        {**row, "event": "created", "timestamp": row["date"], "actor": "import"}
+        for row in rows
+    ]
+    write_csv_atomic(pd.DataFrame(events, columns=EVENT_COLUMNS), log.path)
+    log._signature = None
+    return len(events)
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_arrangement_log():
+    """Return the shared ArrangementLog for this process (or the active school's)"""
+    global _log
+    log = tenant_resource("arrangement_log", lambda root: ArrangementLog(os.path.join(root, EVENTS_FILE)))
+    if log is not None:
+        return log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = ArrangementLog()
+    return _log
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    log = get_arrangement_log()
+    if command == "import":
+        count = import_arrangements(log)
+        print(f"Imported {count} arrangements into {EVENTS_FILE}")
+    elif command == "export":
+        log.export_csv()
+        print(f"Exported current arrangements to {ARRANGEMENTS_FILE}")
+    elif command == "compact":
+        log.compact()
+        print(f"Compacted {EVENTS_FILE}")
+    else:
+        print("Usage: python -m utils.arrangement_log import|export|compact")
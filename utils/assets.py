@@ -0,0 +1,117 @@
+"""Static asset loading for the login page and PWA files
+
+Assets are read, minified and memoized once per process; a file is only
+re-read when its (mtime, size) signature changes. The lottie animation is
+shipped pre-minified (st_lottie embeds the parsed JSON in the page) and
+rebuilt from the pretty-printed source with:
+
+    python -m utils.assets build
+"""
+
+import json
+import os
+import sys
+import threading
+
+from utils.csv_store import file_signature
+
+LOTTIE_SOURCE = "attached_assets/lottie_animation.json"
+LOTTIE_MINIFIED = "static/lottie_animation.min.json"
+
+# Served/embedded size limits in bytes, checked once at startup
+ASSET_BUDGETS = {
+    LOTTIE_MINIFIED: 256 * 1024,
+    "static/manifest.json": 4 * 1024,
+    "attached_assets/logo.png": 100 * 1024,
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+_budgets_checked = False
+
+
+def _memoized(path, loader):
+    signature = file_signature(path)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        value = loader(path) if signature is not None else None
+        _cache[path] = (signature, value)
+        return value
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def minify_json(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def load_json_asset(path):
+    """Return the parsed JSON at `path`, memoized per process"""
+    try:
+        return _memoized(path, _read_json)
+    except Exception as e:
+        print(f"Error loading asset {path}: {e}")
+        return None
+
+
+def load_lottie_animation():
+    """Return the login page animation, preferring the pre-minified copy"""
+    if os.path.exists(LOTTIE_MINIFIED):
+        return load_json_asset(LOTTIE_MINIFIED)
+    return load_json_asset(LOTTIE_SOURCE)
+
+
+def static_text(filename):
+    """Return a file from static/ as text, JSON files minified"""
+
+    def _load(path):
+        if path.endswith(".json"):
+            return minify_json(_read_json(path))
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    return _memoized(os.path.join("static", filename), _load)
+
+
+def build_assets():
+    """Regenerate the minified lottie animation"""
+    data = _read_json(LOTTIE_SOURCE)
+    payload = minify_json(data).encode("utf-8")
+    with open(LOTTIE_MINIFIED, "wb") as f:
+        f.write(payload)
+    return len(payload)
+
+
+def check_asset_budgets(budgets=None):
+    """Raise RuntimeError if any asset exceeds its size budget"""
+    over = []
+    for path, limit in (budgets or ASSET_BUDGETS).items():
+        signature = file_signature(path)
+        if signature is not None and signature[1] > limit:
+            over.append(f"{path}: {signature[1]} bytes > {limit} byte budget")
+    if over:
+        raise RuntimeError("Asset size budget exceeded:\n" + "\n".join(over))
+
+
+def ensure_asset_budgets():
+    """Run check_asset_budgets once per process"""
+    global _budgets_checked
+    if not _budgets_checked:
+        check_asset_budgets()
+        _budgets_checked = True
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "build":
+        print(f"Wrote {LOTTIE_MINIFIED} ({build_assets()} bytes)")
+    check_asset_budgets()
+    print("All assets within budget")
@@ -0,0 +1,257 @@
+"""Whole-day substitute assignment
+
+Instead of picking a substitute one period at a time, solve_day() takes
+every absent slot for a date and every free teacher and solves a single
+min-cost flow:
+
+    source -> absent slot -> (teacher, period) -> teacher -> sink
+
+A slot may go to any teacher FREE in its period. Each teacher has one arc
+to the sink per extra substitution, and every arc costs more than the
+last, so load spreads across staff. Costs combine category match,
+subject match and the teacher's current workload; a Policy holds the
+weights, so other trade-offs can be tried (see utils.policy_simulator).
+"""
+
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+from utils.sections import parse_cell
+from utils.timetable import FREE, day_name
+
+Slot = namedtuple("Slot", ["absent_teacher", "period", "cell"])
+
+# Cost weights (lower is better)
+CATEGORY_COST = {"Ideal": 0.0, "Acceptable": 2.0, "Suboptimal": 5.0}
+SUBJECT_MISMATCH_COST = 1.5
+WORKLOAD_COST = 0.25  # per period already taught/covered
+BALANCE_COST = 3.0  # added for each extra substitution on the same day
+MAX_SUBSTITUTIONS_PER_DAY = 4
+
+Policy = namedtuple(
+    "Policy", ["category_cost", "subject_mismatch_cost", "workload_cost", "balance_cost", "max_per_day"]
+)
+DEFAULT_POLICY = Policy(
+    CATEGORY_COST, SUBJECT_MISMATCH_COST, WORKLOAD_COST, BALANCE_COST, MAX_SUBSTITUTIONS_PER_DAY
+)
+
+CATEGORY_RANK = {"PRT": 0, "TGT": 1, "PGT": 2}
+
+
+def normalize_category(category):
+    return str(category or "").replace(".", "").strip().upper()
+
+
+def match_quality(absent_category, replacement_category):
+    """Ideal for the same category, Acceptable for adjacent ones, else Suboptimal"""
+    a = CATEGORY_RANK.get(normalize_category(absent_category))
+    r = CATEGORY_RANK.get(normalize_category(replacement_category))
+    if a is None or r is None:
+        return "Suboptimal"
+    if a == r:
+        return "Ideal"
+    return "Acceptable" if abs(a - r) == 1 else "Suboptimal"
+
+
+def absent_slots(timetable, day, absent_ids):
+    """Every (absent teacher, period, class) that needs cover on a day"""
+    slots = []
+    for teacher_id in absent_ids:
+        if teacher_id not in timetable.teacher_index:
+            continue
+        for period, cell in timetable.teaching(teacher_id, day).items():
+            slots.append(Slot(teacher_id, period, cell))
+    return slots
+
+
+def slot_cost(timetable, slot, candidate, load, policy=DEFAULT_POLICY):
+    """Cost of `candidate` covering `slot` given their current load"""
+    absent = timetable.teachers[slot.absent_teacher]
+    teacher = timetable.teachers[candidate]
+    cost = policy.category_cost[match_quality(absent.get("category"), teacher.get("category"))]
+    parsed = parse_cell(slot.cell)
+    subject = parsed.subject if parsed else ""
+    if subject and subject != str(teacher.get("subject", "")).replace(".", "").upper():
+        cost += policy.subject_mismatch_cost
+    return cost + policy.workload_cost * load
+
+
+class _MinCostFlow:
+    """Successive shortest paths with Dijkstra and potentials"""
+
+    def __init__(self, n):
+        self.n = n
+        self.graph = [[] for _ in range(n)]
+
+    def add_edge(self, u, v, capacity, cost):
+        self.graph[u].append([v, capacity, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+
+    def solve(self, source, sink):
+        """Push unit flow along shortest paths until the sink is unreachable
+
+        Each Dijkstra pass updates the potentials, then every path made of
+        zero reduced-cost edges is augmented before the next pass.
+        """
+        potential = [0.0] * self.n
+        flow = 0
+        while True:
+            dist = [float("inf")] * self.n
+            dist[source] = 0.0
+            heap = [(0.0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for v, capacity, cost, _ in self.graph[u]:
+                    if capacity <= 0:
+                        continue
+                    nd = d + cost + potential[u] - potential[v]
+                    if nd < dist[v] - 1e-9:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+            if dist[sink] == float("inf"):
+                return flow
+            for v in range(self.n):
+                if dist[v] < float("inf"):
+                    potential[v] += dist[v]
+            flow += self._augment_phase(source, sink, potential)
+
+    def _augment_phase(self, source, sink, potential):
+        """Augment along admissible (zero reduced cost) paths, Dinic style
+
+        Arc pointers and dead nodes persist for the whole phase so each
+        edge is scanned a bounded number of times; ending the phase early
+        only costs an extra Dijkstra pass.
+        """
+        pointer = [0] * self.n
+        dead = [False] * self.n
+        pushed = 0
+        while True:
+            on_path = {source}
+            stack = [source]
+            path = []
+            while stack and stack[-1] != sink:
+                u = stack[-1]
+                edges = self.graph[u]
+                while pointer[u] < len(edges):
+                    v, capacity, cost, _ = edges[pointer[u]]
+                    if (
+                        capacity > 0
+                        and not dead[v]
+                        and v not in on_path
+                        and abs(cost + potential[u] - potential[v]) < 1e-9
+                    ):
+                        break
+                    pointer[u] += 1
+                if pointer[u] == len(edges):
+                    dead[u] = True
+                    on_path.discard(stack.pop())
+                    if path:
+                        path.pop()
+                        pointer[stack[-1]] += 1
+                    continue
+                v = edges[pointer[u]][0]
+                on_path.add(v)
+                stack.append(v)
+                path.append((u, pointer[u]))
+            if not stack:
+                return pushed
+            for u, i in path:
+                edge = self.graph[u][i]
+                edge[1] -= 1
+                self.graph[edge[0]][edge[3]][1] += 1
+            pushed += 1
+
+
+def arrangement_row(timetable, date, slot, replacement, status):
+    """An arrangements.csv row for `replacement` covering `slot` ('' if uncovered)"""
+    absent_meta = timetable.teachers[slot.absent_teacher]
+    replacement_meta = timetable.teachers.get(replacement, {})
+    return {
+        "date": str(date),
+        "absent_teacher": slot.absent_teacher,
+        "replacement_teacher": replacement,
+        "class": slot.cell,
+        "period": slot.period,
+        "status": status if replacement else "UNASSIGNED",
+        "absent_category": absent_meta.get("category", ""),
+        "replacement_category": replacement_meta.get("category", ""),
+        "match_quality": match_quality(absent_meta.get("category"), replacement_meta.get("category")) if replacement else "",
+        "absent_name": absent_meta.get("name", ""),
+        "replacement_name": replacement_meta.get("name", ""),
+    }
+
+
+def solve_day(timetable, date, absent_ids, prior_load=None, status="PENDING", policy=DEFAULT_POLICY):
+    """Assign substitutes for every absent slot on `date` in one pass
+
+    `prior_load` maps teacher_id -> substitutions already taken (e.g. this
+    week) and is added to each teacher's timetable load for the day.
+    `policy` sets the cost weights and the daily cap per teacher.
+    Returns arrangement rows in the arrangements.csv layout; slots nobody
+    can cover get an empty replacement_teacher.
+    """
+    day = day_name(date)
+    d = timetable.day_index[day]
+    prior_load = prior_load or {}
+    absent = set(absent_ids)
+    slots = absent_slots(timetable, day, absent_ids)
+    if not slots:
+        return []
+
+    teaching_load = (timetable.grid[:, d, :] > FREE).sum(axis=1)
+    periods = sorted({slot.period for slot in slots})
+    free = {p: timetable.free_mask(day, p) for p in periods}
+
+    # Node layout: source, slots, (teacher, period) pairs, teachers, sink
+    source = 0
+    slot_nodes = {i: 1 + i for i in range(len(slots))}
+    pair_nodes, teacher_nodes = {}, {}
+    next_node = 1 + len(slots)
+    edges = []
+    for i, slot in enumerate(slots):
+        for t in np.flatnonzero(free[slot.period]):
+            candidate = timetable.teacher_ids[t]
+            if candidate in absent:
+                continue
+            if (t, slot.period) not in pair_nodes:
+                pair_nodes[(t, slot.period)] = next_node
+                next_node += 1
+            if t not in teacher_nodes:
+                teacher_nodes[t] = None
+            load = int(teaching_load[t]) + prior_load.get(candidate, 0)
+            edges.append(
+                (slot_nodes[i], pair_nodes[(t, slot.period)], slot_cost(timetable, slot, candidate, load, policy))
+            )
+    for t in teacher_nodes:
+        teacher_nodes[t] = next_node
+        next_node += 1
+    sink = next_node
+
+    flow = _MinCostFlow(sink + 1)
+    for i in slot_nodes.values():
+        flow.add_edge(source, i, 1, 0.0)
+    slot_edges = {}
+    for u, v, cost in edges:
+        slot_edges.setdefault(u, []).append((v, len(flow.graph[u])))
+        flow.add_edge(u, v, 1, cost)
+    for (t, _), node in pair_nodes.items():
+        flow.add_edge(node, teacher_nodes[t], 1, 0.0)
+    for node in teacher_nodes.values():
+        for k in range(policy.max_per_day):
+            flow.add_edge(node, sink, 1, policy.balance_cost * k)
+    flow.solve(source, sink)
+
+    pair_teacher = {node: t for (t, _), node in pair_nodes.items()}
+    rows = []
+    for i, slot in enumerate(slots):
+        replacement = ""
+        for v, index in slot_edges.get(slot_nodes[i], []):
+            if flow.graph[slot_nodes[i]][index][1] == 0:
+                replacement = timetable.teacher_ids[pair_teacher[v]]
+                break
+        rows.append(arrangement_row(timetable, date, slot, replacement, status))
+    return rows
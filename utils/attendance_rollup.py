@@ -0,0 +1,195 @@
+"""Incrementally maintained attendance rollups
+
+attendance_rollup.csv is an append-only ledger of (date, teacher_id,
+present, absent) deltas. AttendanceStore.mark() appends the change in
+each teacher's latest-wins status, and in-memory counters per
+day/week/month/term bucket are bumped, so the reports and dashboard read
+per-teacher, per-category and per-period totals without scanning the raw
+attendance. Rebuild from the attendance partitions with:
+
+    python -m utils.attendance_store rebuild-rollups
+"""
+
+import os
+import threading
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from utils.csv_store import append_rows, cached_file_signature, write_csv_atomic
+from utils.tenants import tenant_resource
+from utils.user_directory import get_user_directory
+from utils.workload import WINDOWS, bucket, bucket_bounds
+from utils.working_days import get_working_calendar
+
+ROLLUP_FILE = "attached_assets/attendance_rollup.csv"
+ROLLUP_COLUMNS = ["date", "teacher_id", "present", "absent"]
+STATUSES = ("present", "absent")
+
+
+def status_deltas(old_status, new_status):
+    """{'present': d, 'absent': d} for a teacher-day moving between statuses"""
+    deltas = Counter()
+    if old_status in STATUSES:
+        deltas[old_status] -= 1
+    if new_status in STATUSES:
+        deltas[new_status] += 1
+    return {status: deltas[status] for status in STATUSES}
+
+
+class AttendanceRollup:
+    """Present/absent counters per teacher over day/week/month/term buckets"""
+
+    def __init__(self, path=ROLLUP_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._signature = None
+        self._counters = defaultdict(lambda: defaultdict(Counter))
+
+    def _refresh(self):
+        signature = cached_file_signature(self.path)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            counters = defaultdict(lambda: defaultdict(Counter))
+            if signature is not None and signature[1] > 0:
+                ledger = pd.read_csv(self.path, dtype={"teacher_id": str})
+                dates = ledger["date"].unique()
+                for window in WINDOWS:
+                    # bucket() once per distinct date, not once per row
+                    keys = ledger["date"].map({date: bucket(window, date) for date in dates})
+                    totals = ledger.groupby([keys, "teacher_id"])[list(STATUSES)].sum()
+                    for (key, teacher_id), present, absent in zip(
+                        totals.index, totals["present"], totals["absent"]
+                    ):
+                        counters[(window, key)][teacher_id].update(present=int(present), absent=int(absent))
+            self._counters = counters
+            self._signature = signature
+
+    @staticmethod
+    def _bump(counters, date, teacher_id, deltas):
+        for window in WINDOWS:
+            counter = counters[(window, bucket(window, date))][teacher_id]
+            for status in STATUSES:
+                counter[status] += int(deltas.get(status, 0))
+
+    def apply_changes(self, changes):
+        """Record a batch of (date, teacher_id, old_status, new_status) changes
+
+        old_status is None for a teacher-day seen for the first time.
+        """
+        totals = defaultdict(Counter)
+        for date, teacher_id, old_status, new_status in changes:
+            totals[(str(date)[:10], teacher_id)].update(status_deltas(old_status, new_status))
+        rows = [
+            {"date": date, "teacher_id": teacher_id, **{s: deltas[s] for s in STATUSES}}
+            for (date, teacher_id), deltas in totals.items()
+            if any(deltas[s] for s in STATUSES)
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._refresh()
+            cached = self._signature
+            before, after = append_rows(self.path, rows, columns=ROLLUP_COLUMNS)
+            if before == cached:
+                for row in rows:
+                    self._bump(self._counters, row["date"], row["teacher_id"], row)
+                self._signature = after
+            else:
+                self._signature = None
+
+    def counts(self, window="month", on=None):
+        """{teacher_id: {'present': n, 'absent': n}} for the window containing `on`"""
+        self._refresh()
+        counters = self._counters.get((window, bucket(window, on or pd.Timestamp.today())))
+        if not counters:
+            return {}
+        return {
+            tid: {status: counter[status] for status in STATUSES}
+            for tid, counter in counters.items()
+            if any(counter[status] for status in STATUSES)
+        }
+
+    def by_teacher(self, window="month", on=None):
+        """DataFrame of present/absent days, absence rate and attendance rate per teacher
+
+        attendance_rate is present days over the working days of the
+        window up to `on` (from the working-day calendar).
+        """
+        on = pd.Timestamp(on or pd.Timestamp.today()).date()
+        directory = get_user_directory()
+        rows = []
+        for teacher_id, counts in sorted(self.counts(window, on).items()):
+            user = directory.get_by_teacher_id(teacher_id) or {}
+            rows.append({
+                "teacher_id": teacher_id,
+                "name": user.get("name", ""),
+                "category": user.get("category", ""),
+                **counts,
+            })
+        df = pd.DataFrame(rows, columns=["teacher_id", "name", "category", "present", "absent"])
+        marked = df["present"] + df["absent"]
+        working_days = get_working_calendar().count(bucket_bounds(window, on)[0], on)
+        return df.assign(
+            absence_rate=(df["absent"] / marked.where(marked > 0)).fillna(0.0),
+            working_days=working_days,
+            attendance_rate=(df["present"] / working_days).clip(upper=1.0) if working_days else 0.0,
+        )
+
+    def by_category(self, window="month", on=None):
+        """Present/absent totals per category (PGT/TGT/PRT)"""
+        df = self.by_teacher(window, on)
+        return df.groupby("category", as_index=False)[list(STATUSES)].sum()
+
+    def series(self, window, dates):
+        """Absent/present totals per bucket for the buckets `dates` fall in
+
+        Used for trend charts, e.g. one date per month of the term.
+        """
+        self._refresh()
+        rows = []
+        for key in dict.fromkeys(bucket(window, date) for date in dates):
+            counters = self._counters.get((window, key), {})
+            rows.append({
+                "bucket": key,
+                **{status: sum(c[status] for c in counters.values()) for status in STATUSES},
+            })
+        return pd.DataFrame(rows, columns=["bucket", "present", "absent"])
+
+    def rebuild(self, store):
+        """Recompute the ledger from an AttendanceStore (one row per teacher/day)"""
+        frames = [store.partition(month) for month in store.months()]
+        frames = [frame for frame in frames if len(frame)]
+        if frames:
+            latest = pd.concat(frames).reset_index()
+            ledger = pd.DataFrame({
+                "date": latest["date"].dt.strftime("%Y-%m-%d"),
+                "teacher_id": latest["teacher_id"].astype(str),
+                **{status: latest["status"].eq(status).astype(int) for status in STATUSES},
+            })
+        else:
+            ledger = pd.DataFrame(columns=ROLLUP_COLUMNS)
+        with self._lock:
+            write_csv_atomic(ledger[ROLLUP_COLUMNS], self.path)
+            self._signature = None
+        return len(ledger)
+
+
+_rollup = None
+_rollup_lock = threading.Lock()
+
+
+def get_attendance_rollup():
+    """Return the shared AttendanceRollup for this process (or the active school's)"""
+    global _rollup
+    rollup = tenant_resource("attendance_rollup", lambda root: AttendanceRollup(os.path.join(root, ROLLUP_FILE)))
+    if rollup is not None:
+        return rollup
+    if _rollup is None:
+        with _rollup_lock:
+            if _rollup is None:
+                _rollup = AttendanceRollup()
+    return _rollup
@@ -0,0 +1,225 @@
+"""Month-partitioned attendance store
+
+Attendance lives in attached_assets/attendance/<YYYY-MM>.csv instead of one
+unbounded attendance.csv. Partitions are append-only on disk; on load each
+one is parsed with compact dtypes (categorical status/teacher_id,
+datetime timestamp, bool is_auto), deduplicated latest-wins per
+(date, teacher_id) and indexed on that pair. Only the months a query
+touches are read, and each is re-read only when its file changes.
+Every write also updates the attendance rollups (utils.attendance_rollup).
+
+Migrate the existing log once with:
+
+    python -m utils.attendance_store migrate
+    python -m utils.attendance_store rebuild-rollups
+"""
+
+import datetime
+import glob
+import os
+import sys
+import threading
+
+import pandas as pd
+
+from utils.attendance_rollup import get_attendance_rollup
+from utils.csv_store import append_rows, cached_file_signature, write_csv_atomic
+from utils.tenants import tenant_resource
+
+ATTENDANCE_FILE = "attached_assets/attendance.csv"
+ATTENDANCE_DIR = "attached_assets/attendance"
+ATTENDANCE_COLUMNS = ["date", "teacher_id", "status", "timestamp", "is_auto"]
+STATUSES = ["present", "absent"]
+
+
+def month_key(date):
+    """Partition key ('2025-04') for a date, Timestamp or ISO string"""
+    return str(date)[:7]
+
+
+def _typed(df):
+    """Cast raw string columns to the store's compact dtypes"""
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"]).dt.normalize()
+    df["teacher_id"] = df["teacher_id"].astype("category")
+    df["status"] = pd.Categorical(df["status"].str.strip().str.lower(), categories=STATUSES)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    df["is_auto"] = df["is_auto"].astype(str).str.strip().str.lower().eq("true")
+    return df
+
+
+def dedupe_latest(df):
+    """Keep the latest row per (date, teacher_id), indexed on that pair
+
+    Rows are ordered by timestamp; on ties (or missing timestamps) the row
+    written last wins.
+    """
+    df = df.assign(_order=range(len(df)))
+    df = df.sort_values(["timestamp", "_order"], na_position="first", kind="stable")
+    df = df.drop_duplicates(["date", "teacher_id"], keep="last").drop(columns="_order")
+    return df.set_index(["date", "teacher_id"]).sort_index()
+
+
+class AttendanceStore:
+    """Latest-wins attendance partitioned by month"""
+
+    def __init__(self, directory=ATTENDANCE_DIR, rollup=None):
+        self.directory = directory
+        self.rollup = rollup
+        self._lock = threading.RLock()
+        self._partitions = {}  # month -> (signature, DataFrame)
+
+    def _rollup(self):
+        return self.rollup if self.rollup is not None else get_attendance_rollup()
+
+    def _path(self, month):
+        return os.path.join(self.directory, f"{month}.csv")
+
+    def months(self):
+        return sorted(
+            os.path.splitext(os.path.basename(path))[0]
+            for path in glob.glob(os.path.join(self.directory, "*.csv"))
+        )
+
+    def partition(self, month):
+        """Deduplicated, typed frame for one month (empty if none)"""
+        path = self._path(month)
+        signature = cached_file_signature(path)
+        cached = self._partitions.get(month)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with self._lock:
+            if signature is None:
+                frame = dedupe_latest(_typed(pd.DataFrame(columns=ATTENDANCE_COLUMNS)))
+            else:
+                raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+                frame = dedupe_latest(_typed(raw))
+            self._partitions[month] = (signature, frame)
+            return frame
+
+    def on_date(self, date):
+        """Attendance rows (one per teacher) for a single date"""
+        date = pd.Timestamp(date).normalize()
+        frame = self.partition(month_key(date.date()))
+        if date not in frame.index.get_level_values(0):
+            return frame.iloc[0:0]
+        return frame.xs(date, level="date", drop_level=False)
+
+    def latest(self, date, teacher_id):
+        """(status, timestamp) of the winning row for a teacher on a date, or None"""
+        date = pd.Timestamp(date).normalize()
+        frame = self.partition(month_key(date.date()))
+        try:
+            return frame.at[(date, teacher_id), "status"], frame.at[(date, teacher_id), "timestamp"]
+        except KeyError:
+            return None
+
+    def status(self, date, teacher_id):
+        """Latest status for a teacher on a date, or None"""
+        latest = self.latest(date, teacher_id)
+        return latest[0] if latest else None
+
+    def absent_on(self, date):
+        """teacher_ids marked absent on a date"""
+        rows = self.on_date(date)
+        return rows.index.get_level_values("teacher_id")[rows["status"] == "absent"].tolist()
+
+    def between(self, start, end):
+        """Rows for start <= date <= end, reading only the months involved"""
+        months = pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq="M")
+        frames = [self.partition(str(m)) for m in months]
+        frame = pd.concat(frames) if frames else self.partition("0000-00")
+        dates = frame.index.get_level_values("date")
+        return frame[(dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))]
+
+    def mark(self, rows):
+        """Append attendance rows (dicts with ATTENDANCE_COLUMNS) to their partitions
+
+        Rows can span months; each partition gets one locked append. The
+        rollups receive the resulting change in each teacher-day's
+        latest-wins status.
+        """
+        by_month = {}
+        winners = {}  # (date, teacher_id) -> (old_status, status, timestamp)
+        for row in rows:
+            row = dict(row)
+            row.setdefault("timestamp", datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            row.setdefault("is_auto", False)
+            by_month.setdefault(month_key(row["date"]), []).append(row)
+            key = (str(row["date"])[:10], row["teacher_id"])
+            if key in winners:
+                old_status, _, latest_at = winners[key]
+            else:
+                old_status, latest_at = self.latest(*key) or (None, None)
+            timestamp = pd.to_datetime(row["timestamp"], errors="coerce")
+            if pd.notna(latest_at) and (pd.isna(timestamp) or timestamp < latest_at):
+                continue  # an existing, newer row still wins
+            winners[key] = (old_status, str(row["status"]).strip().lower(), timestamp)
+        os.makedirs(self.directory, exist_ok=True)
+        for month, month_rows in by_month.items():
+            append_rows(self._path(month), month_rows, columns=ATTENDANCE_COLUMNS)
+        self._rollup().apply_changes(
+            (date, teacher_id, old_status, status)
+            for (date, teacher_id), (old_status, status, _) in winners.items()
+        )
+        return len(rows)
+
+    def compact(self, month):
+        """Rewrite a partition with only its latest-wins rows"""
+        frame = self.partition(month).reset_index()
+        out = frame.assign(
+            date=frame["date"].dt.strftime("%Y-%m-%d"),
+            timestamp=frame["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S"),
+        )[ATTENDANCE_COLUMNS]
+        write_csv_atomic(out, self._path(month))
+
+    def memory_usage(self):
+        """Bytes held by loaded partitions"""
+        return sum(int(frame.memory_usage(deep=True).sum()) for _, frame in self._partitions.values())
+
+
+def read_log(path=ATTENDANCE_FILE):
+    """attendance.csv in the store's layout (typed, latest-wins, indexed)"""
+    raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return dedupe_latest(_typed(raw[ATTENDANCE_COLUMNS]))
+
+
+def migrate(source=ATTENDANCE_FILE, directory=ATTENDANCE_DIR):
+    """Split attendance.csv into month partitions, deduplicated latest-wins
+
+    The source file is left in place.
+    """
+    raw = pd.read_csv(source, dtype=str, keep_default_na=False)
+    os.makedirs(directory, exist_ok=True)
+    store = AttendanceStore(directory)
+    for month, rows in raw.groupby(raw["date"].str[:7]):
+        write_csv_atomic(rows[ATTENDANCE_COLUMNS], store._path(month))
+        store.compact(month)
+    return store.months()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_attendance_store():
+    """Return the shared AttendanceStore for this process (or the active school's)"""
+    global _store
+    store = tenant_resource("attendance", lambda root: AttendanceStore(os.path.join(root, ATTENDANCE_DIR)))
+    if store is not None:
+        return store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AttendanceStore()
+    return _store
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        print(f"Wrote partitions: {', '.join(migrate())}")
+    elif sys.argv[1:] == ["rebuild-rollups"]:
+        rows = get_attendance_rollup().rebuild(get_attendance_store())
+        print(f"Rebuilt attendance rollups ({rows} teacher-days)")
+    else:
+        print("Usage: python -m utils.attendance_store migrate|rebuild-rollups")
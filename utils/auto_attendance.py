@@ -0,0 +1,223 @@
+"""Process-level automatic attendance marking
+
+One background thread per server process fires at the time configured in
+configs/timing.csv and marks every teacher without an attendance row for
+the day as absent (is_auto=True) in a single bulk write. Presence is read
+from attendance.csv, the log the app writes, and the absences are appended
+there; once the month partitions of utils.attendance_store exist (after
+its migrate), they get the same rows. A non-blocking lock file makes sure
+only one process in the deployment runs it, and it no longer depends on an
+admin session being open. Processes that lose the lock try again every
+POLL_SECONDS, so marking resumes if the owning process dies. Dates listed in
+configs/suspended_dates.csv, Sundays and weekdays without a schedule
+file are skipped. timing.csv is
+re-read whenever it changes. Each school in configs/tenants.csv gets its
+own scheduler, reading that school's config and data. A scheduler
+activates its school for the length of a tick and is stopped when the
+school is removed from tenants.csv. Working days come from
+utils.working_days.
+"""
+
+import datetime
+import os
+import threading
+import time
+
+import pandas as pd
+
+from utils.attendance_store import ATTENDANCE_COLUMNS, ATTENDANCE_FILE, get_attendance_store
+from utils.csv_store import append_rows, cached_file_signature, file_signature, try_hold_lock
+from utils.tenants import get_tenant_registry, tenant_context
+from utils.user_directory import get_user_directory
+from utils.working_days import get_working_calendar
+
+TIMING_FILE = "configs/timing.csv"
+LOCK_FILE = "configs/auto_attendance.lock"
+POLL_SECONDS = 30
+
+DEFAULT_TIMING = {"hour": 15, "minute": 1, "enabled": False}
+
+
+def _load_timing(path=TIMING_FILE):
+    try:
+        row = pd.read_csv(path, dtype=str).iloc[0]
+        return {
+            "hour": int(row["hour"]),
+            "minute": int(row["minute"]),
+            "enabled": str(row["enabled"]).strip().lower() == "true",
+        }
+    except Exception as e:
+        print(f"Error reading timing config: {str(e)}")
+        return dict(DEFAULT_TIMING)
+
+
+class AutoAttendanceScheduler:
+    """Fires the daily auto-absent marking at the configured time"""
+
+    def __init__(self, timing_path=TIMING_FILE, lock_path=LOCK_FILE, tenant_id=None,
+                 attendance_path=ATTENDANCE_FILE):
+        self.tenant_id = tenant_id
+        self.timing_path = timing_path
+        self.lock_path = lock_path
+        self.attendance_path = attendance_path
+        self._timing_signature = object()
+        self.timing = dict(DEFAULT_TIMING)
+        self.last_run_date = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_handle = None
+
+    def reload_config(self):
+        """Re-read timing.csv if it changed"""
+        signature = cached_file_signature(self.timing_path)
+        if signature != self._timing_signature:
+            self.timing = _load_timing(self.timing_path)
+            self._timing_signature = signature
+
+    def is_working_day(self, date):
+        # The calendar of the school this scheduler runs for (tenant_context in _run)
+        return get_working_calendar().is_working_day(date)
+
+    def due(self, now):
+        """True if the marking for `now`'s date should run now"""
+        if not self.timing["enabled"] or self.last_run_date == now.date():
+            return False
+        fire_at = now.replace(hour=self.timing["hour"], minute=self.timing["minute"], second=0, microsecond=0)
+        return now >= fire_at and self.is_working_day(now.date())
+
+    def _day_rows(self, date):
+        """(teacher_ids with a row on `date`, whether any of them is automatic)
+
+        Reads attendance.csv plus the month partition, if the store has one.
+        """
+        marked, auto = set(), False
+        if file_signature(self.attendance_path) is not None:
+            log = pd.read_csv(self.attendance_path, dtype=str, keep_default_na=False)
+            log = log[log["date"].str[:10] == date.isoformat()]
+            marked.update(log["teacher_id"])
+            auto = bool(log["is_auto"].str.strip().str.lower().eq("true").any())
+        store = get_attendance_store()
+        if store.months():
+            stored = store.on_date(date)
+            marked.update(stored.index.get_level_values("teacher_id"))
+            auto = auto or bool(stored["is_auto"].any())
+        return marked, auto
+
+    def mark_absentees(self, date, now=None):
+        """Mark every teacher with no attendance on `date` absent, in one write
+
+        Returns the number of rows written (0 if the day was already
+        auto-marked, e.g. by a process that restarted).
+        """
+        marked, auto = self._day_rows(date)
+        if auto:
+            return 0
+        timestamp = (now or datetime.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            {
+                "date": date.isoformat(),
+                "teacher_id": user["teacher_id"],
+                "status": "absent",
+                "timestamp": timestamp,
+                "is_auto": True,
+            }
+            for user in get_user_directory().all_users()
+            if user.get("teacher_id") and user.get("role", "teacher") != "admin"
+            and user["teacher_id"] not in marked
+        ]
+        if not rows:
+            return 0
+        append_rows(self.attendance_path, rows, columns=ATTENDANCE_COLUMNS)
+        store = get_attendance_store()
+        if store.months():
+            store.mark(rows)
+        return len(rows)
+
+    def tick(self, now=None):
+        """One scheduler step; returns rows written (None if nothing was due)"""
+        now = now or datetime.datetime.now()
+        self.reload_config()
+        if not self.due(now):
+            return None
+        try:
+            written = self.mark_absentees(now.date(), now)
+        except Exception as e:
+            print(f"Error in auto attendance: {str(e)}")
+            return None
+        self.last_run_date = now.date()
+        return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Activated per tick: the school may be removed from tenants.csv
+            try:
+                with tenant_context(self.tenant_id):
+                    self.tick()
+            except KeyError as e:
+                print(f"Error in auto attendance: {str(e)}")
+            self._stop.wait(POLL_SECONDS)
+
+    def start(self):
+        """Start the background thread if this process wins the lock"""
+        if self._thread is not None:
+            return True
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        self._lock_handle = try_hold_lock(self.lock_path)
+        if self._lock_handle is None:
+            return False
+        name = f"auto-attendance-{self.tenant_id}" if self.tenant_id else "auto-attendance"
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=POLL_SECONDS)
+        if self._lock_handle is not None:
+            self._lock_handle.close()
+            self._lock_handle = None
+
+
+_schedulers = {}  # tenant_id -> running AutoAttendanceScheduler
+_scheduler_lock = threading.Lock()
+_last_attempt = None
+
+
+def start_auto_attendance():
+    """Start one scheduler per configured school; safe to call on every rerun
+
+    Only schedulers that won their lock are kept. Schools another process
+    runs, or that were added to tenants.csv later, are tried again on a
+    call at least POLL_SECONDS after the last attempt.
+    """
+    global _last_attempt
+    tenants = get_tenant_registry().tenants()
+    for tenant_id in _schedulers.keys() - tenants.keys():
+        stop_auto_attendance(tenant_id)
+    if not tenants.keys() - _schedulers.keys():
+        return _schedulers
+    if _last_attempt is not None and time.monotonic() - _last_attempt < POLL_SECONDS:
+        return _schedulers
+    with _scheduler_lock:
+        _last_attempt = time.monotonic()
+        for tenant_id, (_, root) in tenants.items():
+            if tenant_id in _schedulers:
+                continue
+            scheduler = AutoAttendanceScheduler(
+                os.path.join(root, TIMING_FILE),
+                os.path.join(root, LOCK_FILE),
+                tenant_id=tenant_id,
+                attendance_path=os.path.join(root, ATTENDANCE_FILE),
+            )
+            if scheduler.start():
+                _schedulers[tenant_id] = scheduler
+    return _schedulers
+
+
+def stop_auto_attendance(tenant_id):
+    """Stop and forget a school's scheduler, releasing its lock"""
+    with _scheduler_lock:
+        scheduler = _schedulers.pop(tenant_id, None)
+    if scheduler is not None:
+        scheduler.stop()
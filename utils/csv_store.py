@@ -0,0 +1,262 @@
+import csv
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from utils.profiling import record_io
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# fcntl locks are per process, so threads of the same Streamlit server also
+# need an in-process lock per file.
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+# Paths whose file lock the current thread holds, so file_lock() nests
+_held_locks = threading.local()
+
+# Directories covered by a running utils.file_watcher. Signatures of files
+# under them are served from memory and only re-stat'ed after the watcher
+# reports a change (or after this process writes the file itself).
+_watched_roots = set()
+_signatures = {}
+
+# Read once at import: os.umask() can only be read by setting it, which
+# would race with threads creating files
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def _thread_lock(path):
+    key = os.path.abspath(path)
+    with _thread_locks_guard:
+        if key not in _thread_locks:
+            _thread_locks[key] = threading.RLock()
+        return _thread_locks[key]
+
+
+def file_signature(path):
+    """Return (mtime_ns, size) for a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _watched(key):
+    return any(key.startswith(root) for root in _watched_roots)
+
+
+def watch_roots(roots):
+    """Serve signatures under `roots` from memory (called by the file watcher)"""
+    _watched_roots.update(os.path.join(os.path.abspath(root), "") for root in roots)
+
+
+def unwatch_roots(roots):
+    for root in roots:
+        _watched_roots.discard(os.path.join(os.path.abspath(root), ""))
+    _signatures.clear()
+
+
+def cached_file_signature(path):
+    """file_signature(), without the stat() while a watcher covers `path`
+
+    Caches use this to decide whether to reload; appends and other writes
+    keep using the real file_signature().
+    """
+    key = os.path.abspath(path)
+    if not _watched(key):
+        return file_signature(path)
+    try:
+        return _signatures[key]
+    except KeyError:
+        signature = _signatures[key] = file_signature(path)
+        return signature
+
+
+def forget_signature(path):
+    """Drop the memoized signature of `path` so the next check stats it"""
+    _signatures.pop(os.path.abspath(path), None)
+
+
+def _remember_signature(path, signature):
+    key = os.path.abspath(path)
+    if _watched(key):
+        _signatures[key] = signature
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on `path` across threads and processes
+
+    The OS lock is taken on a sidecar `<path>.lock` file so the data file
+    itself can be replaced atomically while the lock is held. Re-entering
+    it from the thread that holds it is a no-op, so a check-then-append
+    can hold the lock around append_row().
+    """
+    key = os.path.abspath(path)
+    held = _held_locks.__dict__.setdefault("paths", set())
+    with _thread_lock(path):
+        if key in held:
+            # Already held by this thread: a second flock on a new file
+            # description would wait on ourselves
+            yield
+            return
+        held.add(key)
+        try:
+            with _os_lock(path):
+                yield
+        finally:
+            held.discard(key)
+
+
+@contextmanager
+def _os_lock(path):
+    with open(f"{path}.lock", "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def try_hold_lock(path):
+    """Try to take an exclusive lock on `path` without blocking
+
+    Returns the open lock file (keep a reference for as long as the lock
+    should be held; closing it releases the lock) or None if another
+    process holds it.
+    """
+    lock_file = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _read_header(path):
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), None)
+
+
+def _needs_newline(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) not in (b"\n", b"\r")
+
+
+def append_rows(path, rows, columns=None):
+    """Append dict rows to a CSV under the file lock
+
+    Values are written in the order of the file's existing header; missing
+    keys are left blank. If the file is missing or empty, a header is written
+    first using `columns` (or the keys of the first row).
+
+    Returns the file signature (before, after) as seen under the lock, so
+    callers holding an in-memory copy can tell whether anyone else wrote in
+    between.
+    """
+    rows = list(rows)
+    with file_lock(path):
+        before = file_signature(path)
+        header = _read_header(path) if before and before[1] > 0 else None
+        write_header = header is None
+        if write_header:
+            header = list(columns or (rows[0].keys() if rows else []))
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            if not write_header and _needs_newline(path):
+                f.write("\n")
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(header)
+            for row in rows:
+                writer.writerow(["" if row.get(col) is None else row.get(col) for col in header])
+            f.flush()
+            os.fsync(f.fileno())
+        after = file_signature(path)
+        _remember_signature(path, after)
+    record_io("write", path, after[1] - (before[1] if before else 0))
+    return before, after
+
+
+def append_row(path, row, columns=None):
+    """Append a single dict row to a CSV under the file lock"""
+    return append_rows(path, [row], columns=columns)
+
+
+def write_csv_atomic(df, path):
+    """Replace a CSV with `df` via write-to-temp and atomic rename"""
+    with file_lock(path):
+        _write_atomic(df, path)
+
+
+def _file_mode(path):
+    """Permission bits for a rewrite of `path`
+
+    mkstemp() creates owner-only files; keep the mode of the file being
+    replaced, or what open() would have given a new file.
+    """
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def _write_atomic(df, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    mode = _file_mode(path)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+            nbytes = f.tell()
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+        _remember_signature(path, file_signature(path))
+        record_io("write", path, nbytes)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def update_csv(path, update, **read_kwargs):
+    """Read-modify-write a CSV under the file lock
+
+    `update` receives the current DataFrame and returns the new one. Use
+    this only when a change can't be expressed as an append (edits,
+    deletes, status changes); the rewrite is atomic.
+    """
+    with file_lock(path):
+        df = pd.read_csv(path, **read_kwargs)
+        df = update(df)
+        _write_atomic(df, path)
+        return df
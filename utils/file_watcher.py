@@ -0,0 +1,185 @@
+"""File watcher for the data and config directories
+
+A watchdog observer on attached_assets/ and configs/ (under every school's
+data root, see utils.tenants) replaces the stat() every cache used to do
+on every access. While it runs, file signatures under those directories
+are served from memory (csv_store.cached_file_signature)
+and a change event for a file drops only that file's signature, so only
+the cache built from it reloads: users.csv -> the user directory,
+schedule_monday.csv -> Monday in the compiled timetable, timing.csv ->
+the auto-attendance config on its next tick, suspended_dates.csv -> the
+working-day calendar, and so on. Callbacks resolve the school from the
+changed path and clear that school's cache, not the active one's.
+
+Editors and copy tools emit bursts of events (create, several modifies,
+rename); they are collected until the directory has been quiet for
+DEBOUNCE_SECONDS and then applied once. If watchdog isn't installed the
+caches keep checking signatures themselves.
+"""
+
+import fnmatch
+import os
+import threading
+
+from utils.csv_store import forget_signature, unwatch_roots, watch_roots
+from utils.tenants import get_tenant_registry, tenant_data_dirs, tenant_id_for_path
+from utils.timetable import get_timetable_cache
+from utils.user_directory import get_user_directory
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # caches fall back to stat() on every access
+    FileSystemEventHandler = object
+    Observer = None
+
+WATCHED_DIRS = ("attached_assets", "configs")
+DEBOUNCE_SECONDS = 0.5
+# Lock sidecars and csv_store's temp files are never cached data
+IGNORED_PATTERNS = ("*.lock", ".*.tmp", "*.db-wal", "*.db-shm", "*.db-journal")
+# inotify reports reads too; those must not drop the caches that did them
+IGNORED_EVENTS = ("opened", "closed_no_write")
+
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type in IGNORED_EVENTS:
+            return
+        self.watcher.notify(event.src_path)
+        dest_path = getattr(event, "dest_path", None)
+        if dest_path:
+            self.watcher.notify(dest_path)
+
+
+class FileWatcher:
+    """Debounced change notifications for files under WATCHED_DIRS"""
+
+    def __init__(self, directories=WATCHED_DIRS, debounce=DEBOUNCE_SECONDS):
+        self.directories = list(dict.fromkeys(os.path.abspath(d) for d in directories))
+        self.debounce = debounce
+        self._callbacks = []  # (absolute glob pattern, callback(path))
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._observer = None
+
+    def on_change(self, pattern, callback):
+        """Call callback(path) after files matching `pattern` change"""
+        self._callbacks.append((os.path.abspath(pattern), callback))
+
+    def notify(self, path):
+        """Queue a changed path; the batch is applied once events stop"""
+        name = os.path.basename(path)
+        if any(fnmatch.fnmatch(name, pattern) for pattern in IGNORED_PATTERNS):
+            return
+        with self._lock:
+            self._pending.add(os.path.abspath(path))
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Apply every queued change now; returns the paths applied"""
+        with self._lock:
+            paths, self._pending = self._pending, set()
+            self._timer = None
+        for path in sorted(paths):
+            forget_signature(path)
+            for pattern, callback in self._callbacks:
+                if fnmatch.fnmatch(path, pattern):
+                    try:
+                        callback(path)
+                    except Exception as e:
+                        print(f"Error invalidating cache for {path}: {str(e)}")
+        return paths
+
+    @property
+    def running(self):
+        return self._observer is not None
+
+    def start(self):
+        """Start observing; returns False if watchdog is unavailable"""
+        if self._observer is not None:
+            return True
+        if Observer is None:
+            return False
+        observer = Observer()
+        handler = _Handler(self)
+        directories = [d for d in self.directories if os.path.isdir(d)]
+        for directory in directories:
+            observer.schedule(handler, directory, recursive=True)
+        observer.daemon = True
+        observer.start()
+        # Only trust memoized signatures once events are flowing
+        watch_roots(directories)
+        self._observer = observer
+        return True
+
+    def stop(self):
+        if self._observer is None:
+            return
+        unwatch_roots(self.directories)
+        self._observer.stop()
+        self._observer.join(timeout=5)
+        self._observer = None
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+def _owned_resource(path, name, accessor):
+    """The `name` cache of the school whose data root holds `path`
+
+    The repo's own data uses the process-wide instance from accessor();
+    another school's only if it is loaded (otherwise there's nothing to drop).
+    """
+    registry = get_tenant_registry()
+    tenant_id = tenant_id_for_path(path)
+    if tenant_id is None:
+        return None
+    _, root = registry.tenants()[tenant_id]
+    if os.path.abspath(root) == os.path.abspath("."):
+        return accessor()
+    tenant = registry.loaded_tenant(tenant_id)
+    return tenant.loaded_resource(name) if tenant is not None else None
+
+
+def _invalidate_users(path):
+    directory = _owned_resource(path, "users", get_user_directory)
+    if directory is not None:
+        directory.invalidate()
+
+
+def _invalidate_schedule(path):
+    day = os.path.basename(path)[len("schedule_"):-len(".csv")]
+    cache = _owned_resource(path, "timetable", get_timetable_cache)
+    if cache is not None:
+        cache.invalidate(day)
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def start_file_watcher():
+    """Start the process-wide watcher once; safe to call on every rerun"""
+    global _watcher
+    if _watcher is None:
+        with _watcher_lock:
+            if _watcher is None:
+                # The same two directories under every school's data root
+                watcher = FileWatcher(tenant_data_dirs(WATCHED_DIRS))
+                for root in dict.fromkeys(root for _, root in get_tenant_registry().tenants().values()):
+                    watcher.on_change(os.path.join(root, "attached_assets/users.csv"), _invalidate_users)
+                    watcher.on_change(os.path.join(root, "attached_assets/schedule_*.csv"), _invalidate_schedule)
+                # configs/*.csv, attendance partitions and ledgers need no
+                # callback: their caches reload once the signature is dropped
+                watcher.start()
+                _watcher = watcher
+    return _watcher
@@ -0,0 +1,308 @@
+"""Background notification dispatch
+
+Sending an SMS is a network round trip, so nothing in a request handler
+should wait on one. NotificationQueue hands deliveries to a small worker
+pool and returns at once:
+
+* notify(recipient, date, line) queues one line for a teacher; lines for
+  the same recipient and day are collected for BATCH_SECONDS and sent as
+  one message ("3 substitute periods on 2026-10-19: ...");
+* submit(fn, *args) runs any slow call (e.g. the Firebase OTP send) on a
+  worker and returns a concurrent.futures.Future.
+
+Failed deliveries are retried with exponential backoff (BACKOFF_SECONDS,
+doubled per attempt, MAX_ATTEMPTS in all) and kept in failed() after
+that. Messages go through a pluggable transport picked by
+configs/notifications.csv:
+
+    transport,target
+    http,http://127.0.0.1:8765/sms
+
+"file" (the default) appends JSON lines to logs/outbox.jsonl and "http"
+POSTs {"to", "text"} as JSON, which benchmarks/notification_benchmark.py
+serves with a local gateway stand-in. Any object with a
+send(recipient, text) method can be installed with set_transport().
+
+start_notifications() (called from main.py) texts replacement teachers as
+arrangements become assigned in utils.arrangement_log; a whole day's
+arrangements can also be published to them with:
+
+    python -m utils.notification_queue publish 2026-10-19
+"""
+
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.arrangement_log import get_arrangement_log, on_change
+from utils.csv_store import cached_file_signature
+from utils.user_directory import get_user_directory
+
+CONFIG_FILE = "configs/notifications.csv"
+OUTBOX_FILE = "logs/outbox.jsonl"
+WORKERS = 4
+BATCH_SECONDS = 2.0
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 1.0
+HTTP_TIMEOUT_SECONDS = 10
+
+Delivery = namedtuple("Delivery", ["recipient", "text", "attempts", "error"])
+
+
+class FileTransport:
+    """Appends every message to a JSON-lines outbox (local stand-in for the gateway)"""
+
+    def __init__(self, path=OUTBOX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, recipient, text):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        record = {"time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "to": recipient, "text": text}
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+class HttpTransport:
+    """POSTs {"to", "text"} as JSON to an SMS gateway; any non-2xx response is an error"""
+
+    def __init__(self, url, timeout=HTTP_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, recipient, text):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"to": recipient, "text": text}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if not 200 <= response.status < 300:
+                raise IOError(f"Gateway returned {response.status}")
+
+
+def load_transport(path=CONFIG_FILE):
+    """Transport configured in notifications.csv (the file outbox without one)"""
+    try:
+        row = pd.read_csv(path, dtype=str).iloc[0]
+        kind, target = str(row["transport"]).strip().lower(), str(row["target"]).strip()
+        if kind == "http":
+            return HttpTransport(target)
+        if kind == "file":
+            return FileTransport(target)
+        print(f"Unknown notification transport '{kind}', using the file outbox")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error reading notification config: {str(e)}")
+    return FileTransport()
+
+
+def format_batch(date, lines):
+    """One SMS for all of a teacher's lines on a day"""
+    if len(lines) == 1:
+        return f"Substitute duty on {date}: {lines[0]}"
+    return f"{len(lines)} substitute periods on {date}: " + "; ".join(lines)
+
+
+class NotificationQueue:
+    """Worker pool that batches, sends and retries notifications"""
+
+    def __init__(self, transport=None, workers=WORKERS, batch_seconds=BATCH_SECONDS,
+                 max_attempts=MAX_ATTEMPTS, backoff=BACKOFF_SECONDS, config_path=CONFIG_FILE):
+        self.config_path = config_path
+        self.batch_seconds = batch_seconds
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._transport = transport
+        self._configured = None
+        self._config_signature = object()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notify")
+        self._lock = threading.Lock()
+        self._batches = OrderedDict()  # (recipient, date) -> [lines]
+        self._sent_lines = {}  # date -> {(recipient, line)} already queued once
+        self._timer = None
+        self._in_flight = 0
+        self._idle = threading.Condition(self._lock)
+        self._failed = []
+        self.sent = 0
+
+    @property
+    def transport(self):
+        if self._transport is not None:
+            return self._transport
+        signature = cached_file_signature(self.config_path)
+        if signature != self._config_signature:
+            self._configured = load_transport(self.config_path)
+            self._config_signature = signature
+        return self._configured
+
+    def set_transport(self, transport):
+        """Send through `transport` from now on (None: back to notifications.csv)"""
+        self._transport = transport
+
+    def notify(self, recipient, date, line):
+        """Queue `line` for `recipient` on `date`; False if it was already queued"""
+        key = (str(recipient), str(date)[:10])
+        with self._lock:
+            if key[1] not in self._sent_lines:
+                self._forget_past_days()
+            sent = self._sent_lines.setdefault(key[1], set())
+            if (key[0], line) in sent:
+                return False
+            sent.add((key[0], line))
+            self._batches.setdefault(key, []).append(line)
+            self._in_flight += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.batch_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return True
+
+    def _forget_past_days(self):
+        # Duplicates only matter while a day's arrangements can still change
+        today = datetime.date.today().isoformat()
+        for day in [day for day in self._sent_lines if day < today]:
+            del self._sent_lines[day]
+
+    def flush(self):
+        """Send every pending batch now (called by the batch timer)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batches, self._batches = self._batches, OrderedDict()
+            # One delivery now stands for all its lines
+            self._in_flight -= sum(len(lines) for lines in batches.values()) - len(batches)
+        for (recipient, date), lines in batches.items():
+            self._pool.submit(self._deliver, recipient, format_batch(date, lines), 1)
+        return len(batches)
+
+    def _deliver(self, recipient, text, attempt):
+        try:
+            self.transport.send(recipient, text)
+        except Exception as e:
+            if attempt < self.max_attempts:
+                # Back off on a timer instead of holding a worker
+                timer = threading.Timer(self.backoff * 2 ** (attempt - 1), self._pool.submit,
+                                        (self._deliver, recipient, text, attempt + 1))
+                timer.daemon = True
+                timer.start()
+                return
+            print(f"Error sending notification to {recipient}: {str(e)}")
+            with self._lock:
+                self._failed.append(Delivery(recipient, text, attempt, str(e)))
+                self._in_flight -= 1
+                self._idle.notify_all()
+            return
+        with self._lock:
+            self.sent += 1
+            self._in_flight -= 1
+            self._idle.notify_all()
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a worker; returns a Future"""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def pending(self):
+        """Lines/messages queued or being delivered"""
+        with self._lock:
+            return self._in_flight
+
+    def failed(self):
+        """Deliveries that still failed after MAX_ATTEMPTS"""
+        with self._lock:
+            return list(self._failed)
+
+    def drain(self, timeout=None):
+        """Flush and wait until everything queued is delivered or failed"""
+        self.flush()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+
+ASSIGNED_STATUSES = ("ASSIGNED", "MANUALLY_ASSIGNED")
+
+
+def _assigned(row):
+    return bool(row and row.get("replacement_teacher")) and str(row.get("status", "")).upper() in ASSIGNED_STATUSES
+
+
+def _queue_rows(rows):
+    """Queue a line for the replacement teacher of each assigned row; returns lines queued"""
+    directory = get_user_directory()
+    queue = get_notification_queue()
+    queued = 0
+    for row in rows:
+        if not _assigned(row):
+            continue
+        user = directory.get_by_teacher_id(row["replacement_teacher"])
+        if not user or not user.get("phone"):
+            continue
+        line = f"P{row['period']} {row['class']} for {row.get('absent_name') or row['absent_teacher']}"
+        queued += queue.notify(user["phone"], str(row["date"])[:10], line)
+    return queued
+
+
+def notify_replacements(date, arrangements=None):
+    """Queue one SMS per replacement teacher for the assigned arrangements on `date`
+
+    `arrangements` defaults to the current arrangement log. Returns the
+    number of lines queued at once; lines this process already queued
+    are skipped, so publishing twice doesn't message anyone twice.
+    """
+    if arrangements is None:
+        arrangements = get_arrangement_log().current(date)
+    return _queue_rows(row for row in arrangements.to_dict("records") if str(row["date"])[:10] == str(date)[:10])
+
+
+def notify_changed_arrangements(changes):
+    """arrangement_log listener: text teachers who just got a slot"""
+    _queue_rows(
+        new for old, new in changes
+        if _assigned(new) and not (_assigned(old) and old["replacement_teacher"] == new["replacement_teacher"])
+    )
+
+
+def start_notifications():
+    """Text replacement teachers whenever arrangements get assigned; safe to call on every rerun"""
+    on_change(notify_changed_arrangements)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_notification_queue():
+    """Return the shared NotificationQueue for this process"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = NotificationQueue()
+    return _queue
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "publish":
+        queued = notify_replacements(sys.argv[2])
+        queue = get_notification_queue()
+        queue.drain()
+        print(f"Queued {queued} lines, sent {queue.sent} messages, {len(queue.failed())} failed")
+    else:
+        print("Usage: python -m utils.notification_queue publish YYYY-MM-DD")
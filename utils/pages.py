@@ -0,0 +1,58 @@
+"""Lazy page registry for the main.py router
+
+Page modules (and the chart libraries they pull in) are imported the first
+time someone navigates to the page, not at server start.
+"""
+
+import importlib
+import threading
+from collections import namedtuple
+
+Page = namedtuple("Page", ["icon", "label", "module", "function", "uses_data_manager", "admin_only"], defaults=(False,))
+
+PAGES = {
+    "dashboard": Page(":material/dashboard:", "Dashboard", "components.dashboard", "render_dashboard", True),
+    "admin": Page(":material/admin_panel_settings:", "Administrative Controls", "components.admin_controls", "render_admin_page", True),
+    "arrangements": Page(":material/swap_horiz:", "Arrangements", "components.arrangements", "render_arrangements_page", True),
+    "reports": Page(":material/bar_chart:", "Reports", "components.reports", "render_reports_page", True),
+    "schedule_manager": Page(":material/edit_calendar:", "Schedule Manager", "components.schedule_manager", "render_schedule_manager_page", True),
+    "substitute_pool": Page(":material/people_alt:", "Substitute Teachers", "components.substitute_pool", "render_substitute_pool_page", False),
+    "coverage_tracking": Page(":material/analytics:", "Class Coverage", "components.coverage_tracking", "render_coverage_tracking_page", True),
+    "terms": Page(":material/gavel:", "Terms & Conditions", "components.legal_pages", "render_terms_and_conditions", False),
+    "contact": Page(":material/contact_phone:", "Contact Us", "components.legal_pages", "render_contact_page", False),
+    "performance": Page(":material/speed:", "Performance", "utils.profiling", "render_profiler_panel", False, admin_only=True),
+}
+
+# Modules the login screen must never import (checked by
+# benchmarks/startup_benchmark.py)
+HEAVY_MODULES = ["plotly", "matplotlib", "seaborn"]
+
+_renderers = {}
+_import_lock = threading.Lock()
+
+
+def get_renderer(page_key):
+    """Return the render function for a page, importing its module on first use"""
+    renderer = _renderers.get(page_key)
+    if renderer is None:
+        page = PAGES[page_key]
+        with _import_lock:
+            renderer = _renderers.get(page_key)
+            if renderer is None:
+                module = importlib.import_module(page.module)
+                renderer = getattr(module, page.function)
+                _renderers[page_key] = renderer
+    return renderer
+
+
+def visible_pages(role):
+    """PAGES entries shown in the navigation for a role"""
+    return {key: page for key, page in PAGES.items() if not page.admin_only or role == "admin"}
+
+
+def render_page(page_key, data_manager):
+    """Render a registered page"""
+    renderer = get_renderer(page_key)
+    if PAGES[page_key].uses_data_manager:
+        return renderer(data_manager)
+    return renderer()
@@ -0,0 +1,249 @@
+"""What-if replay of substitution policies
+
+Replays the recorded absences of a date range against the compiled
+schedules under one or more assignment policies and compares them on
+coverage (share of absent periods that got a substitute), match quality
+(Ideal / Acceptable / Suboptimal shares) and fairness (spread of
+substitutions per teacher over the range: standard deviation, maximum
+and Gini coefficient).
+
+A policy is either a utils.assignment.Policy of cost weights for the
+whole-day solver or a function (timetable, date, absent_ids, prior_load)
+-> rows in the arrangements.csv layout. greedy_policy() fills slots one
+period at a time with the same costs as the solver; "greedy" uses the
+"balanced" weights, so the two differ only in how they search.
+
+Days are replayed in order within blocks (ISO weeks by default, the
+window the workload ledger reports): the substitutions taken so far in the
+block are passed as prior_load to the next day, as the app does with this
+week's counts. Blocks start from zero load, so every (policy, block) pair
+is an independent task. They run in parallel on a process pool, whose
+workers each receive the compiled timetable once, and the per-block
+results are summed per policy. A single policy over a term still spreads
+over many workers. block=None replays the whole range as one sequence
+(one task per policy). Absences come from the partitioned attendance
+store, or from attendance.csv before it has been migrated. Run from the
+repo root:
+
+    python -m utils.policy_simulator START END [POLICY ...] [--block=week|month|term|range]
+"""
+
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.assignment import DEFAULT_POLICY, Policy, absent_slots, arrangement_row, slot_cost, solve_day
+from utils.attendance_store import get_attendance_store, read_log
+from utils.timetable import FREE, day_name, get_timetable
+from utils.working_days import get_working_calendar
+from utils.workload import bucket
+
+POLICIES = {
+    "balanced": DEFAULT_POLICY,
+    # Same-category cover above all, load only breaks ties
+    "category_first": DEFAULT_POLICY._replace(
+        category_cost={"Ideal": 0.0, "Acceptable": 8.0, "Suboptimal": 20.0}, workload_cost=0.1, balance_cost=1.0
+    ),
+    # Even out each teacher's load (periods taught + cover taken so far); category matters little
+    "workload_first": DEFAULT_POLICY._replace(
+        category_cost={"Ideal": 0.0, "Acceptable": 0.5, "Suboptimal": 1.0}, subject_mismatch_cost=0.5,
+        workload_cost=1.0, balance_cost=6.0,
+    ),
+}
+QUALITIES = ("Ideal", "Acceptable", "Suboptimal")
+REPORT_COLUMNS = [
+    "policy", "days", "slots", "covered", "coverage", *(q.lower() for q in QUALITIES),
+    "load_mean", "load_std", "load_max", "gini",
+]
+
+
+def greedy_policy(timetable, date, absent_ids, prior_load=None, policy=DEFAULT_POLICY):
+    """Period by period, the cheapest free teacher for each slot (no look-ahead)
+
+    Costs are solve_day's under the same `policy`: slot_cost() on the
+    teacher's load, plus balance_cost for each substitution already taken
+    that day, and at most max_per_day of them.
+    """
+    d = timetable.day_index[day_name(date)]
+    absent = set(absent_ids)
+    prior_load = prior_load or {}
+    today = Counter()
+    busy = set()
+    rows = []
+    for slot in sorted(absent_slots(timetable, date, absent_ids), key=lambda s: s.period):
+        best = None
+        for t in np.flatnonzero(timetable.free_mask(date, slot.period)):
+            candidate = timetable.teacher_ids[t]
+            if candidate in absent or (candidate, slot.period) in busy or today[candidate] >= policy.max_per_day:
+                continue
+            load = int((timetable.grid[t, d] > FREE).sum()) + prior_load.get(candidate, 0)
+            cost = slot_cost(timetable, slot, candidate, load, policy) + policy.balance_cost * today[candidate]
+            if best is None or cost < best[0]:
+                best = (cost, candidate)
+        replacement = best[1] if best else ""
+        if replacement:
+            today[replacement] += 1
+            busy.add((replacement, slot.period))
+        rows.append(arrangement_row(timetable, date, slot, replacement, "ASSIGNED"))
+    return rows
+
+
+POLICIES["greedy"] = greedy_policy
+
+
+def run_policy(policy, timetable, date, absent_ids, prior_load=None):
+    if isinstance(policy, Policy):
+        return solve_day(timetable, date, absent_ids, prior_load=prior_load, status="ASSIGNED", policy=policy)
+    return policy(timetable, date, absent_ids, prior_load)
+
+
+def replay(policy, timetable, days):
+    """Run `policy` over `days` ({date: absent_ids}) in date order
+
+    Each day sees the substitutions taken on the earlier days as
+    prior_load. Returns (slots, covered, match quality counts,
+    substitutions per teacher) for all of `days`.
+    """
+    slots = covered = 0
+    quality, load = Counter(), Counter()
+    for date in sorted(days):
+        for row in run_policy(policy, timetable, date, days[date], prior_load=load):
+            slots += 1
+            if row["replacement_teacher"]:
+                covered += 1
+                quality[row["match_quality"]] += 1
+                load[row["replacement_teacher"]] += 1
+    return slots, covered, quality, load
+
+
+_worker_timetable = None
+
+
+def _init_worker(timetable):
+    global _worker_timetable
+    _worker_timetable = timetable
+
+
+def _replay_task(task):
+    policy, days = task
+    return replay(policy, _worker_timetable, days)
+
+
+def blocks(days, window="week"):
+    """Split {date: absent_ids} into per-`window` dicts (utils.workload buckets)
+
+    window=None keeps the whole range as one block.
+    """
+    if window is None:
+        return [days]
+    grouped = {}
+    for date in sorted(days):
+        grouped.setdefault(bucket(window, date), {})[date] = days[date]
+    return list(grouped.values())
+
+
+def absences(start, end, store=None):
+    """{date: [absent teacher_ids]} for the working days from `start` to `end`"""
+    store = store or get_attendance_store()
+    if store.months():
+        rows = store.between(start, end)
+    else:
+        # Not migrated yet: the log the app writes
+        rows = read_log()
+        dates = rows.index.get_level_values("date")
+        rows = rows[(dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))]
+    rows = rows[rows["status"] == "absent"]
+    by_date = {}
+    for date, teacher_id in rows.index:
+        by_date.setdefault(date.date(), []).append(teacher_id)
+    working = get_working_calendar().working_days(start, end)
+    return {date: sorted(by_date[date]) for date in working if date in by_date}
+
+
+def gini(values):
+    """0 when everyone has the same load, towards 1 when one teacher has it all"""
+    values = np.sort(np.asarray(values, dtype=float))
+    if not len(values) or not values.sum():
+        return 0.0
+    ranks = np.arange(1, len(values) + 1)
+    return float((2 * ranks - len(values) - 1).dot(values) / (len(values) * values.sum()))
+
+
+def simulate(start, end, policies=None, workers=None, timetable=None, store=None, block="week"):
+    """Replay absences between `start` and `end` under each policy
+
+    `policies` maps name -> Policy or function (default: POLICIES).
+    `block` is the window load is carried over (see blocks()). `workers`
+    is the process count (default: one per CPU, capped at the number of
+    (policy, block) tasks; 1 runs inline, with the same result). Returns a
+    DataFrame with one row per policy, empty if there are no absences in
+    the range.
+    """
+    policies = policies or POLICIES
+    timetable = timetable or get_timetable()
+    days = absences(start, end, store)
+    if not days:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    tasks = [(name, (policy, part)) for name, policy in policies.items() for part in blocks(days, block)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers == 1:
+        _init_worker(timetable)
+        results = list(map(_replay_task, (task for _, task in tasks)))
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(timetable,)) as pool:
+            results = list(pool.map(_replay_task, (task for _, task in tasks)))
+
+    totals = {name: [0, 0, Counter(), Counter()] for name in policies}
+    for (name, _), (slots, covered, quality, load) in zip(tasks, results):
+        total = totals[name]
+        total[0] += slots
+        total[1] += covered
+        total[2].update(quality)
+        total[3].update(load)
+
+    rows = []
+    for name, (slots, covered, quality, load) in totals.items():
+        # Every teacher on the timetable counts, including those who never covered
+        loads = np.array([load[teacher_id] for teacher_id in timetable.teacher_ids] or [0])
+        rows.append({
+            "policy": name,
+            "days": len(days),
+            "slots": slots,
+            "covered": covered,
+            "coverage": covered / slots if slots else 0.0,
+            **{q.lower(): quality[q] / covered if covered else 0.0 for q in QUALITIES},
+            "load_mean": loads.mean(),
+            "load_std": loads.std(),
+            "load_max": int(loads.max()),
+            "gini": gini(loads),
+        })
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+BLOCKS = {"week": "week", "month": "month", "term": "term", "range": None}
+
+
+if __name__ == "__main__":
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--block=")]
+    args = [arg for arg in sys.argv[1:] if arg not in options]
+    block = options[-1].split("=", 1)[1] if options else "week"
+    if len(args) < 2 or block not in BLOCKS:
+        print(
+            "Usage: python -m utils.policy_simulator START END [POLICY ...] [--block=week|month|term|range]"
+            f"  (policies: {', '.join(POLICIES)})"
+        )
+        sys.exit(2)
+    names = args[2:] or list(POLICIES)
+    unknown = [name for name in names if name not in POLICIES]
+    if unknown:
+        print(f"Unknown policies: {', '.join(unknown)} (choose from {', '.join(POLICIES)})")
+        sys.exit(2)
+    report = simulate(args[0], args[1], {name: POLICIES[name] for name in names}, block=BLOCKS[block])
+    if report.empty:
+        print(f"No recorded absences on working days from {args[0]} to {args[1]}; nothing to replay")
+        sys.exit(1)
+    print(report.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
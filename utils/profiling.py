@@ -0,0 +1,326 @@
+"""Per-rerun profiling and I/O counters
+
+main.py opens a RerunProfile at the top of every script run and closes it
+at the end. In between, `section(name)` records wall time per named block,
+the pandas CSV hooks (install_io_hooks) and utils.csv_store count file
+reads/writes with their bytes, and every frame read from CSV is recorded
+with its rows and memory. Finished profiles go to an in-memory ring for
+the admin panel and to a rotating JSON-lines log:
+
+    logs/reruns.jsonl (+ .1, .2, ... when rotated)
+
+page_stats() turns the log into p50/p95 per page. Profiling state is
+thread-local (Streamlit runs each session's script in its own thread) and
+a profile only counts I/O on the thread that began it, so the process-wide
+pandas hooks never charge reads by background threads (file watcher,
+auto-attendance, notification pool) to a rerun. Records carry a salted
+hash of the Streamlit session id, not who is logged in; the salt is drawn
+per process, so the hashes can't be matched up across restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+import pandas as pd
+
+PROFILE_LOG = "logs/reruns.jsonl"
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+RECENT_RERUNS = 200
+
+_local = threading.local()
+_recent = deque(maxlen=RECENT_RERUNS)
+_logger = None
+_logger_lock = threading.Lock()
+_hooks_installed = False
+_session_salt = os.urandom(16)
+
+
+class RerunProfile:
+    """Timings and I/O counters for one script run"""
+
+    def __init__(self, page=None, session=None):
+        self.page = page
+        self.session = session
+        self.thread_id = threading.get_ident()
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.sections = Counter()
+        self.io = Counter()
+        self.files = Counter()
+        self.frames = {}
+
+    def add_io(self, kind, path, nbytes):
+        self.io[f"{kind}s"] += 1
+        self.io[f"{kind}_bytes"] += int(nbytes or 0)
+        self.files[f"{kind}:{os.path.basename(str(path))}"] += 1
+
+    def add_frame(self, name, df):
+        self.frames[name] = {"rows": len(df), "bytes": int(df.memory_usage(index=True).sum())}
+
+    def to_record(self):
+        return {
+            "ts": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            "page": self.page or "unknown",
+            "session": self.session,
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 2),
+            "sections": {name: round(ms, 2) for name, ms in self.sections.items()},
+            "io": dict(self.io),
+            "files": dict(self.files),
+            "frames": self.frames,
+        }
+
+
+def current_profile():
+    """The RerunProfile of this thread's script run, or None"""
+    profile = getattr(_local, "profile", None)
+    if profile is None or profile.thread_id != threading.get_ident():
+        return None
+    return profile
+
+
+def session_tag(session_id):
+    """Salted hash of a session id: groups one session's reruns, names nobody"""
+    if session_id is None:
+        return None
+    return hashlib.sha256(_session_salt + str(session_id).encode("utf-8")).hexdigest()[:12]
+
+
+def _script_session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def begin_rerun(page=None):
+    """Start profiling a script run (an unfinished previous one is dropped)"""
+    _local.profile = RerunProfile(page, session_tag(_script_session_id()))
+    return _local.profile
+
+
+def set_page(page):
+    profile = current_profile()
+    if profile is not None:
+        profile.page = page
+
+
+@contextmanager
+def section(name):
+    """Add the wall time of the block to `name` (repeated blocks accumulate)"""
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.sections[name] += (time.perf_counter() - start) * 1000
+
+
+def record_io(kind, path, nbytes):
+    """Count one 'read' or 'write' of `path` against the current rerun"""
+    profile = current_profile()
+    if profile is not None:
+        profile.add_io(kind, path, nbytes)
+
+
+def record_frame(name, df):
+    """Record a DataFrame's size against the current rerun"""
+    profile = current_profile()
+    if profile is not None and isinstance(df, pd.DataFrame):
+        profile.add_frame(name, df)
+
+
+def _get_logger(path=PROFILE_LOG):
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                logger = logging.getLogger("teacher_arrangement.reruns")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(path, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+
+def end_rerun():
+    """Finish this thread's profile, log it and return its record"""
+    profile = current_profile()
+    if profile is None:
+        return None
+    _local.profile = None
+    record = profile.to_record()
+    _recent.append(record)
+    try:
+        _get_logger().info(json.dumps(record, default=str))
+    except OSError as e:
+        print(f"Error writing rerun profile: {str(e)}")
+    return record
+
+
+def recent_reruns():
+    """Records of the last RECENT_RERUNS reruns in this process (oldest first)"""
+    return list(_recent)
+
+
+def _is_path(target):
+    return isinstance(target, (str, os.PathLike))
+
+
+def install_io_hooks():
+    """Count pandas CSV reads/writes of file paths against the current rerun
+
+    Wraps pd.read_csv and DataFrame.to_csv once per process; outside a
+    profiled rerun the wrappers only add a thread-local lookup.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    read_csv = pd.read_csv
+    to_csv = pd.DataFrame.to_csv
+
+    def profiled_read_csv(filepath_or_buffer, *args, **kwargs):
+        df = read_csv(filepath_or_buffer, *args, **kwargs)
+        if current_profile() is not None and _is_path(filepath_or_buffer):
+            try:
+                nbytes = os.path.getsize(filepath_or_buffer)
+            except OSError:
+                nbytes = 0
+            record_io("read", filepath_or_buffer, nbytes)
+            record_frame(f"read:{os.path.basename(str(filepath_or_buffer))}", df)
+        return df
+
+    def profiled_to_csv(self, path_or_buf=None, *args, **kwargs):
+        result = to_csv(self, path_or_buf, *args, **kwargs)
+        if current_profile() is not None and _is_path(path_or_buf):
+            try:
+                nbytes = os.path.getsize(path_or_buf)
+            except OSError:
+                nbytes = 0
+            record_io("write", path_or_buf, nbytes)
+        return result
+
+    pd.read_csv = profiled_read_csv
+    pd.DataFrame.to_csv = profiled_to_csv
+    _hooks_installed = True
+
+
+def load_records(path=PROFILE_LOG):
+    """All rerun records from the log and its rotated backups"""
+    records = []
+    for candidate in [f"{path}.{i}" for i in range(LOG_BACKUPS, 0, -1)] + [path]:
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def page_stats(records):
+    """One row per page: reruns, p50/p95 total ms, p95 section ms, mean reads"""
+    columns = ["page", "reruns", "p50_ms", "p95_ms", "reads", "read_kb", "writes"]
+    if not records:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame({
+        "page": [r["page"] for r in records],
+        "total_ms": [r["total_ms"] for r in records],
+        "reads": [r["io"].get("reads", 0) for r in records],
+        "read_kb": [r["io"].get("read_bytes", 0) / 1024 for r in records],
+        "writes": [r["io"].get("writes", 0) for r in records],
+    })
+    stats = df.groupby("page").agg(
+        reruns=("total_ms", "size"),
+        p50_ms=("total_ms", lambda s: np.percentile(s, 50)),
+        p95_ms=("total_ms", lambda s: np.percentile(s, 95)),
+        reads=("reads", "mean"),
+        read_kb=("read_kb", "mean"),
+        writes=("writes", "mean"),
+    )
+    return stats.reset_index().sort_values("p95_ms", ascending=False)[columns].round(2)
+
+
+def section_stats(records, page):
+    """p50/p95 ms per named section for one page"""
+    rows = [
+        {"section": name, "ms": ms}
+        for record in records if record["page"] == page
+        for name, ms in record["sections"].items()
+    ]
+    if not rows:
+        return pd.DataFrame(columns=["section", "p50_ms", "p95_ms"])
+    df = pd.DataFrame(rows)
+    stats = df.groupby("section")["ms"].agg(
+        p50_ms=lambda s: np.percentile(s, 50),
+        p95_ms=lambda s: np.percentile(s, 95),
+    )
+    return stats.reset_index().sort_values("p95_ms", ascending=False).round(2)
+
+
+def render_memory_report():
+    """Bytes shared by every session (utils.snapshot) vs held by this one"""
+    import streamlit as st
+
+    # Imported here: the snapshot loads the data files on first use
+    from utils.snapshot import memory_report
+
+    report = memory_report(st.session_state)
+    st.subheader("Memory")
+    shared, session, version = st.columns(3)
+    shared.metric("Shared by all sessions", f"{report['shared_bytes'] / 1024:,.0f} KB")
+    session.metric("Held by this session", f"{report['session_bytes'] / 1024:,.0f} KB")
+    version.metric("Snapshot version", report["version"])
+    st.dataframe(
+        pd.DataFrame(
+            [{"field": name, "KB": round(size / 1024, 1)} for name, size in report["per_field"].items()]
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+def render_profiler_panel():
+    """Admin-only performance panel (registered in utils.pages)"""
+    import streamlit as st
+
+    if st.session_state.get("role") != "admin":
+        st.error("Only administrators can view performance data.")
+        return
+    st.title("Performance")
+    render_memory_report()
+    source = st.radio("Data", ["This server process", "Rerun log"], horizontal=True)
+    records = recent_reruns() if source == "This server process" else load_records()
+    if not records:
+        st.info("No reruns recorded yet.")
+        return
+
+    st.subheader("Per page")
+    stats = page_stats(records)
+    st.dataframe(stats, use_container_width=True, hide_index=True)
+
+    page = st.selectbox("Sections for page", stats["page"].tolist())
+    st.dataframe(section_stats(records, page), use_container_width=True, hide_index=True)
+
+    st.subheader("Latest rerun")
+    latest = records[-1]
+    st.caption(f"{latest['ts']} · {latest['page']} · {latest['total_ms']} ms")
+    st.json({key: latest[key] for key in ("sections", "io", "files", "frames")}, expanded=False)
@@ -0,0 +1,98 @@
+"""Canonical class/section parsing
+
+Schedule and arrangement cells spell the same class several ways:
+"(X-B) MATHS", "X B MATHS", "IX - D MATHS", "XI B/C/D PHE". parse_cell()
+splits any of them into grade, sections and subject (memoized, since the
+set of distinct cells is small), and SectionIndex maps each canonical
+section ("X-B") to the teacher taking it in every (day, period).
+"""
+
+import re
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+ClassSlot = namedtuple("ClassSlot", ["grade", "sections", "subject"])
+
+GRADES = ["XII", "XI", "X", "IX", "VIII", "VII", "VI", "V", "IV", "III", "II", "I"]
+
+_CELL = re.compile(
+    r"^(?P<grade>" + "|".join(GRADES) + r")(?![A-Z])"
+    r"\s*-?\s*"
+    r"(?P<sections>[A-Z](?![A-Z.])(?:\s*[/,]\s*[A-Z](?![A-Z.]))*)?"
+    r"\s*(?P<subject>.*)$"
+)
+
+
+@lru_cache(maxsize=None)
+def parse_cell(text):
+    """Parse a schedule/arrangement cell into a ClassSlot
+
+    Returns None for FREE/empty cells. Cells without a recognizable grade
+    come back with grade None and the whole text as subject.
+    """
+    if text is None:
+        return None
+    cleaned = " ".join(str(text).upper().replace("(", " ").replace(")", " ").split())
+    if cleaned in ("", "FREE", "NAN"):
+        return None
+    match = _CELL.match(cleaned)
+    if match is None:
+        return ClassSlot(None, (), _subject(cleaned))
+    sections = tuple(re.findall(r"[A-Z]", match.group("sections") or ""))
+    return ClassSlot(match.group("grade"), sections, _subject(match.group("subject")))
+
+
+def _subject(text):
+    # "S.ST." and "SST" are the same subject
+    return text.replace(".", "").strip()
+
+
+def section_keys(slot):
+    """Canonical section keys ("X-B") for a parsed ClassSlot"""
+    if slot is None or slot.grade is None:
+        return ()
+    if not slot.sections:
+        return (slot.grade,)
+    return tuple(f"{slot.grade}-{section}" for section in slot.sections)
+
+
+@lru_cache(maxsize=None)
+def canonical_section(text):
+    """Canonical key for a section label such as 'X B', '(X-B)' or 'x-b'"""
+    keys = section_keys(parse_cell(text))
+    return keys[0] if len(keys) == 1 else None
+
+
+def sections_column(values):
+    """Map a column of class labels (e.g. arrangements.csv 'class') to
+    tuples of canonical section keys; parsing happens once per distinct label"""
+    return values.map(lambda value: section_keys(parse_cell(value)))
+
+
+class SectionIndex:
+    """section -> (day, period) -> [teacher_ids] over a compiled Timetable"""
+
+    def __init__(self, timetable):
+        self.timetable = timetable
+        keys_by_code = [section_keys(parse_cell(label)) for label in timetable.vocabulary]
+        self.index = defaultdict(lambda: defaultdict(list))
+        teachers, days, periods = np.nonzero(timetable.grid > 0)
+        codes = timetable.grid[teachers, days, periods]
+        for t, d, p, code in zip(teachers.tolist(), days.tolist(), periods.tolist(), codes.tolist()):
+            for key in keys_by_code[code]:
+                self.index[key][(timetable.days[d], p + 1)].append(timetable.teacher_ids[t])
+
+    def sections(self):
+        return sorted(self.index)
+
+    def slots(self, section):
+        """{(day, period): [teacher_ids]} for a section label"""
+        key = canonical_section(section) or section
+        return self.index.get(key, {})
+
+    def teachers_for(self, section, day, period):
+        """teacher_ids taking `section` on `day` in `period`"""
+        day = self.timetable.days[self.timetable._d(day)]
+        return list(self.slots(section).get((day, int(period)), []))
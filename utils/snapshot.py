@@ -0,0 +1,224 @@
+"""Process-wide, versioned, read-only data snapshot
+
+Every browser session used to build its own copy of users, schedules,
+attendance and arrangements. Code that reads them can instead take the
+one shared Snapshot from current_snapshot() on each rerun (main.py's
+sidebar profile does). Writers never mutate it; they publish() a new
+version that replaces only the changed parts (the rest is shared by
+reference). The session's DataManager is still per session: it is mutable
+and not safe to share.
+
+The DataFrames inside are shared by every session and must be treated as
+read-only. Their numpy blocks are marked non-writeable, which catches
+in-place writes to the arrays, but pandas still allows .loc assignment,
+adding columns and the like on the frame object itself: take a .copy()
+before changing anything.
+
+memory_report() splits memory into bytes shared by all sessions and bytes
+held by one session's own state; the admin Performance page shows it.
+"""
+
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from utils.csv_store import cached_file_signature, file_signature
+from utils.tenants import tenant_resource
+from utils.timetable import get_timetable
+from utils.user_directory import USERS_FILE, get_user_directory
+
+ATTENDANCE_FILE = "attached_assets/attendance.csv"
+ARRANGEMENTS_FILE = "attached_assets/arrangements.csv"
+
+FIELDS = ("users", "timetable", "attendance", "arrangements")
+
+
+def _freeze_frame(df):
+    """Make a DataFrame's numpy blocks read-only so writes to the arrays raise
+
+    This doesn't stop pandas from changing the frame itself (column
+    assignment, .loc setting); callers must copy before mutating.
+    """
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False
+    return df
+
+
+def _load_csv(path):
+    if file_signature(path) is None:
+        return pd.DataFrame()
+    return _freeze_frame(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+
+def _load_users(path):
+    directory = get_user_directory()
+    return MappingProxyType({user["username"]: MappingProxyType(user) for user in directory.all_users()})
+
+
+# field -> (file relative to the data root, loader(path))
+LOADERS = {
+    "users": (USERS_FILE, _load_users),
+    "timetable": (None, lambda path: get_timetable()),
+    "attendance": (ATTENDANCE_FILE, _load_csv),
+    "arrangements": (ARRANGEMENTS_FILE, _load_csv),
+}
+
+
+class Snapshot:
+    """Read-only bundle of shared data at one version (fields are not copied)"""
+
+    __slots__ = ("version", "created_at") + FIELDS
+
+    def __init__(self, version, **fields):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "created_at", time.time())
+        for name in FIELDS:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Snapshot is read-only; use SnapshotStore.publish()")
+
+    def replace(self, **changes):
+        """New Snapshot (next version) sharing every field not in `changes`"""
+        fields = {name: changes.get(name, getattr(self, name)) for name in FIELDS}
+        return Snapshot(self.version + 1, **fields)
+
+
+class SnapshotStore:
+    """Holds the current Snapshot and swaps in new versions copy-on-write"""
+
+    def __init__(self, root="."):
+        self.root = root
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._signatures = {}
+
+    def _source_signatures(self):
+        signatures = {}
+        for name in LOADERS:
+            if name == "timetable":
+                # TimetableCache tracks the day files itself
+                signatures[name] = id(get_timetable())
+            else:
+                signatures[name] = cached_file_signature(self._path(name))
+        return signatures
+
+    def _path(self, name):
+        path = LOADERS[name][0]
+        return os.path.join(self.root, path) if path else None
+
+    def _load(self, name):
+        return LOADERS[name][1](self._path(name))
+
+    def current(self):
+        """The latest Snapshot, reloading only fields whose files changed"""
+        signatures = self._source_signatures()
+        snapshot = self._snapshot
+        if snapshot is not None and signatures == self._signatures:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                fields = {name: self._load(name) for name in LOADERS}
+                self._snapshot = Snapshot(1, **fields)
+            else:
+                changed = {
+                    name: self._load(name)
+                    for name, signature in signatures.items()
+                    if signature != self._signatures.get(name)
+                }
+                if changed:
+                    self._snapshot = self._snapshot.replace(**changed)
+            self._signatures = signatures
+            return self._snapshot
+
+    def publish(self, **changes):
+        """Install a new version with `changes`; readers see it next rerun
+
+        Writers should publish after persisting, passing the new frames
+        (frozen here), so sessions don't have to re-read the files.
+        """
+        for name, value in changes.items():
+            if name not in FIELDS:
+                raise KeyError(f"Unknown snapshot field: {name}")
+            if isinstance(value, pd.DataFrame):
+                _freeze_frame(value)
+        with self._lock:
+            base = self._snapshot or Snapshot(0)
+            self._snapshot = base.replace(**changes)
+            # The files were written by the publisher; don't reload them
+            self._signatures = self._source_signatures()
+            return self._snapshot
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by obj (DataFrames/arrays counted exactly)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(obj, pd.DataFrame) else usage)
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (dict, MappingProxyType)):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, Snapshot):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in FIELDS)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def memory_report(session_state=None):
+    """{'shared_bytes', 'session_bytes', 'per_field'} for the current snapshot
+
+    session_bytes counts only what the given session holds itself: shared
+    objects (the snapshot and anything inside it) are excluded.
+    """
+    snapshot = get_snapshot_store().current()
+    shared_seen = set()
+    per_field = {name: deep_sizeof(getattr(snapshot, name), shared_seen) for name in FIELDS}
+    session_bytes = 0
+    if session_state is not None:
+        session_seen = set(shared_seen) | {id(snapshot)}
+        for key in list(session_state.keys()):
+            session_bytes += deep_sizeof(session_state[key], session_seen)
+    return {
+        "version": snapshot.version,
+        "shared_bytes": sum(per_field.values()),
+        "session_bytes": session_bytes,
+        "per_field": per_field,
+    }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Return the shared SnapshotStore for this process (or the active school's)"""
+    global _store
+    store = tenant_resource("snapshot", lambda root: SnapshotStore(root))
+    if store is not None:
+        return store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SnapshotStore()
+    return _store
+
+
+def current_snapshot():
+    """Shortcut for get_snapshot_store().current()"""
+    return get_snapshot_store().current()
@@ -0,0 +1,484 @@
+"""SQLite storage backend for DataManager operations
+
+Same data as the CSVs under attached_assets/, kept in one SQLite database
+in WAL mode so readers never block the writer and a crash can't leave a
+half-written file. Connections come from a small pool, hot columns
+(date, teacher_id, status) are indexed, and multi-row writes run in a
+single transaction.
+
+Schedule cells keep the text the admins typed and are matched on their
+canonical spelling (utils.timetable.normalize_cell); attendance keeps
+every marking and queries take the latest per teacher and day, so an
+export gives back the files that were migrated.
+
+    python -m utils.sqlite_backend migrate           # CSVs -> attached_assets/school.db
+    python -m utils.sqlite_backend export [<dir>]    # school.db -> CSVs in attached_assets/export/
+"""
+
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from utils.csv_store import write_csv_atomic
+from utils.tenants import tenant_resource
+from utils.timetable import DAYS, SCHEDULE_FILE, normalize_cell
+
+DB_FILE = "attached_assets/school.db"
+EXPORT_DIR = "attached_assets/export"
+POOL_SIZE = 4
+# Bumped when a table layout changes; see _upgrade()
+SCHEMA_VERSION = 1
+
+USER_COLUMNS = ["username", "password", "name", "phone", "teacher_id", "category", "role"]
+ATTENDANCE_COLUMNS = ["date", "teacher_id", "status", "timestamp", "is_auto"]
+ARRANGEMENT_COLUMNS = [
+    "date", "absent_teacher", "replacement_teacher", "class", "period", "status",
+    "absent_category", "replacement_category", "match_quality", "absent_name", "replacement_name",
+]
+SUBSTITUTE_COLUMNS = [
+    "substitute_id", "name", "phone", "subject_expertise", "qualification",
+    "availability", "rating", "category", "notes",
+]
+TABLES = ["users", "teachers", "schedule_cells", "attendance", "arrangements", "substitutes"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT, password TEXT, name TEXT, phone TEXT,
+    teacher_id TEXT, category TEXT, role TEXT
+);
+CREATE INDEX IF NOT EXISTS users_username ON users (username);
+CREATE INDEX IF NOT EXISTS users_phone ON users (phone);
+CREATE INDEX IF NOT EXISTS users_teacher_id ON users (teacher_id);
+
+-- position is the row in schedule_<day>.csv. A teacher listed twice keeps
+-- both rows and the later one is the live one
+CREATE TABLE IF NOT EXISTS teachers (
+    day TEXT, position INTEGER, teacher_id TEXT, name TEXT, category TEXT, subject TEXT,
+    PRIMARY KEY (day, position)
+);
+CREATE INDEX IF NOT EXISTS teachers_teacher ON teachers (day, teacher_id, position);
+CREATE TABLE IF NOT EXISTS schedule_cells (
+    day TEXT, position INTEGER, teacher_id TEXT, period INTEGER,
+    cell TEXT, cell_key TEXT,
+    PRIMARY KEY (day, position, period)
+);
+CREATE INDEX IF NOT EXISTS schedule_cells_slot ON schedule_cells (day, period, cell_key);
+
+-- Every marking is kept in file order, and queries take the latest per teacher/day
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT, teacher_id TEXT, status TEXT, timestamp TEXT, is_auto INTEGER
+);
+CREATE INDEX IF NOT EXISTS attendance_status ON attendance (date, status);
+CREATE INDEX IF NOT EXISTS attendance_teacher ON attendance (teacher_id, date);
+
+CREATE TABLE IF NOT EXISTS arrangements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT, absent_teacher TEXT, replacement_teacher TEXT, class TEXT,
+    period INTEGER, status TEXT, absent_category TEXT, replacement_category TEXT,
+    match_quality TEXT, absent_name TEXT, replacement_name TEXT
+);
+CREATE INDEX IF NOT EXISTS arrangements_date ON arrangements (date, period);
+CREATE INDEX IF NOT EXISTS arrangements_replacement ON arrangements (replacement_teacher, date);
+CREATE INDEX IF NOT EXISTS arrangements_status ON arrangements (status);
+
+CREATE TABLE IF NOT EXISTS substitutes (
+    substitute_id TEXT PRIMARY KEY, name TEXT, phone TEXT, subject_expertise TEXT,
+    qualification TEXT, availability TEXT, rating REAL, category TEXT, notes TEXT
+);
+"""
+
+
+class ConnectionPool:
+    """Fixed-size pool of WAL-mode SQLite connections shared across threads"""
+
+    def __init__(self, path=DB_FILE, size=POOL_SIZE):
+        self.path = path
+        self._pool = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Connection whose statements commit together (or roll back on error)"""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get().close()
+
+
+class SQLiteDataManager:
+    """DataManager operations backed by SQLite instead of CSV files"""
+
+    def __init__(self, path=DB_FILE, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn:
+            _upgrade(conn)
+
+    @contextmanager
+    def _writer(self, conn=None):
+        """`conn` if the caller already holds a transaction, else a new one"""
+        if conn is not None:
+            yield conn
+        else:
+            with self.pool.transaction() as conn:
+                yield conn
+
+    def _query(self, sql, params=(), columns=None):
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        if columns is None and rows:
+            columns = rows[0].keys()
+        return pd.DataFrame([tuple(row) for row in rows], columns=columns)
+
+    # Users
+
+    def get_user_details(self, username):
+        """User record for a username as a dict, or None"""
+        with self.pool.connection() as conn:
+            # users.csv has duplicate usernames; the first row wins, as in auth
+            row = conn.execute(
+                "SELECT * FROM users WHERE username = ? ORDER BY rowid LIMIT 1", (username,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def load_users(self):
+        return self._query(f"SELECT {', '.join(USER_COLUMNS)} FROM users ORDER BY rowid", columns=USER_COLUMNS)
+
+    def save_users(self, users_df, conn=None):
+        """Replace all users with `users_df` in one transaction"""
+        rows = users_df.reindex(columns=USER_COLUMNS).astype(object)
+        rows = rows.where(rows.notna(), None)
+        with self._writer(conn) as conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                f"INSERT INTO users VALUES ({', '.join('?' * len(USER_COLUMNS))})",
+                rows.itertuples(index=False, name=None),
+            )
+
+    # Schedules
+
+    def load_schedule(self, day):
+        """One day's timetable in the schedule_<day>.csv layout, as stored"""
+        teachers = self._query(
+            "SELECT position, teacher_id, name, category, subject FROM teachers WHERE day = ? ORDER BY position",
+            (day,),
+            columns=["position", "teacher_id", "name", "category", "subject"],
+        )
+        cells = self._query(
+            "SELECT position, period, cell FROM schedule_cells WHERE day = ?",
+            (day,),
+            columns=["position", "period", "cell"],
+        )
+        if not cells.empty:
+            grid = cells.pivot(index="position", columns="period", values="cell").sort_index(axis=1)
+            grid.columns = [f"period{p}" for p in grid.columns]
+            teachers = teachers.merge(grid, left_on="position", right_index=True, how="left")
+        return teachers.drop(columns="position")
+
+    def save_schedule(self, day, schedule_df, conn=None):
+        """Replace one day's timetable (schedule_<day>.csv layout) in one transaction
+
+        Cells keep their original text; cell_key holds the canonical
+        spelling the queries match on, so free periods written as "free",
+        blank or NaN are all 'FREE' there.
+        """
+        schedule_df = schedule_df.reset_index(drop=True)
+        period_cols = [c for c in schedule_df.columns if c.startswith("period")]
+        meta = schedule_df.reindex(columns=["teacher_id", "name", "category", "subject"])
+        cells = schedule_df.reset_index(names="position").melt(
+            id_vars=["position", "teacher_id"], value_vars=period_cols, var_name="period", value_name="cell"
+        )
+        cells["period"] = cells["period"].str.replace("period", "").astype(int)
+        cells["cell_key"] = cells["cell"].map(normalize_cell)
+        cells = cells.astype(object).where(cells.notna(), None)
+        with self._writer(conn) as conn:
+            conn.execute("DELETE FROM teachers WHERE day = ?", (day,))
+            conn.execute("DELETE FROM schedule_cells WHERE day = ?", (day,))
+            conn.executemany(
+                "INSERT INTO teachers VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (day, position, *row)
+                    for position, row in enumerate(
+                        meta.astype(object).where(meta.notna(), None).itertuples(index=False, name=None)
+                    )
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO schedule_cells VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (day, int(position), tid, int(period), cell, key)
+                    for position, tid, period, cell, key in cells.itertuples(index=False, name=None)
+                ),
+            )
+
+    def get_free_teachers(self, day, period):
+        """Teachers free in a period, judged on their last row if listed twice"""
+        rows = self._query(
+            """SELECT c.teacher_id FROM schedule_cells c
+               WHERE c.day = ? AND c.period = ? AND c.cell_key = 'FREE'
+               AND c.position = (SELECT MAX(t.position) FROM teachers t
+                                 WHERE t.day = c.day AND t.teacher_id = c.teacher_id)
+               ORDER BY c.position""",
+            (day, int(period)),
+            columns=["teacher_id"],
+        )
+        return rows["teacher_id"].tolist()
+
+    # Attendance
+
+    def mark_attendance(self, rows, conn=None):
+        """Record attendance rows; the latest write per (date, teacher_id) wins in queries"""
+        with self._writer(conn) as conn:
+            conn.executemany(
+                f"INSERT INTO attendance ({', '.join(ATTENDANCE_COLUMNS)}) "
+                f"VALUES ({', '.join(':' + c for c in ATTENDANCE_COLUMNS)})",
+                (
+                    {
+                        "date": str(r["date"]),
+                        "teacher_id": r["teacher_id"],
+                        "status": r["status"],
+                        "timestamp": r.get("timestamp"),
+                        "is_auto": _is_auto(r.get("is_auto")),
+                    }
+                    for r in rows
+                ),
+            )
+
+    def get_attendance(self, date=None, latest=True):
+        """Attendance rows in the attendance.csv layout (is_auto as True/False)
+
+        With `latest`, only the last marking per teacher and day; otherwise
+        every marking in the order it was recorded.
+        """
+        where, params = [], ()
+        if latest:
+            where.append("id IN (SELECT MAX(id) FROM attendance GROUP BY date, teacher_id)")
+        if date is not None:
+            where.append("date = ?")
+            params = (str(date),)
+        rows = self._query(
+            f"SELECT {', '.join(ATTENDANCE_COLUMNS)} FROM attendance "
+            f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY id",
+            params,
+            columns=ATTENDANCE_COLUMNS,
+        )
+        # The CSV readers match is_auto on the text "true"; blank stays blank
+        rows["is_auto"] = rows["is_auto"].map({1: "True", 0: "False"})
+        return rows
+
+    def get_absent_teachers(self, date):
+        rows = self._query(
+            """SELECT teacher_id FROM attendance
+               WHERE id IN (SELECT MAX(id) FROM attendance WHERE date = ? GROUP BY teacher_id)
+               AND status = 'absent' ORDER BY id""",
+            (str(date),),
+            columns=["teacher_id"],
+        )
+        return rows["teacher_id"].tolist()
+
+    # Arrangements
+
+    def load_arrangements(self, date=None):
+        columns = ["id"] + ARRANGEMENT_COLUMNS
+        if date is None:
+            return self._query(f"SELECT {', '.join(columns)} FROM arrangements ORDER BY id", columns=columns)
+        return self._query(
+            f"SELECT {', '.join(columns)} FROM arrangements WHERE date = ? ORDER BY period",
+            (str(date),),
+            columns=columns,
+        )
+
+    def save_arrangements(self, rows, conn=None):
+        """Insert arrangement rows (dicts in the arrangements.csv layout) in one transaction"""
+        with self._writer(conn) as conn:
+            conn.executemany(
+                f"INSERT INTO arrangements ({', '.join(ARRANGEMENT_COLUMNS)}) "
+                f"VALUES ({', '.join(':' + c for c in ARRANGEMENT_COLUMNS)})",
+                ({col: row.get(col) for col in ARRANGEMENT_COLUMNS} for row in rows),
+            )
+
+    def update_arrangement_status(self, ids, status):
+        """Set the status of several arrangements at once"""
+        with self.pool.transaction() as conn:
+            conn.executemany("UPDATE arrangements SET status = ? WHERE id = ?", ((status, int(i)) for i in ids))
+
+    # Substitutes
+
+    def load_substitutes(self):
+        return self._query(f"SELECT {', '.join(SUBSTITUTE_COLUMNS)} FROM substitutes", columns=SUBSTITUTE_COLUMNS)
+
+    def save_substitutes(self, substitutes_df, conn=None):
+        rows = substitutes_df.reindex(columns=SUBSTITUTE_COLUMNS).astype(object)
+        with self._writer(conn) as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO substitutes VALUES ({', '.join('?' * len(SUBSTITUTE_COLUMNS))})",
+                rows.where(rows.notna(), None).itertuples(index=False, name=None),
+            )
+
+    def close(self):
+        self.pool.close()
+
+
+def _is_auto(value):
+    """1/0 for a True/False is_auto cell, None if it was left blank"""
+    text = "" if value is None else str(value).strip().lower()
+    if text in ("", "nan", "none"):
+        return None
+    return int(text in ("true", "1"))
+
+
+def _upgrade(conn):
+    """Create the tables, moving a database from an older layout over first
+
+    Layout 0 kept one schedule row per teacher with normalized cells and
+    one attendance row per teacher and day; its rows are copied as they
+    are.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have upgraded while we waited for the lock
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            legacy = "teachers" in existing
+            if legacy:
+                for table in ("teachers", "schedule_cells", "attendance"):
+                    conn.execute(f"ALTER TABLE {table} RENAME TO {table}_v0")
+                for index in ("schedule_cells_slot", "attendance_status", "attendance_teacher"):
+                    conn.execute(f"DROP INDEX IF EXISTS {index}")
+            # (no ";" in SCHEMA comments: statements are split on it)
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            if legacy:
+                conn.execute(
+                    "INSERT INTO teachers SELECT day, rowid, teacher_id, name, category, subject FROM teachers_v0"
+                )
+                conn.execute(
+                    """INSERT INTO schedule_cells
+                       SELECT c.day, t.rowid, c.teacher_id, c.period, c.cell, c.cell
+                       FROM schedule_cells_v0 c JOIN teachers_v0 t ON t.day = c.day AND t.teacher_id = c.teacher_id"""
+                )
+                conn.execute(
+                    f"INSERT INTO attendance ({', '.join(ATTENDANCE_COLUMNS)}) "
+                    f"SELECT {', '.join(ATTENDANCE_COLUMNS)} FROM attendance_v0 ORDER BY rowid"
+                )
+                for table in ("teachers", "schedule_cells", "attendance"):
+                    conn.execute(f"DROP TABLE {table}_v0")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _read(path):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def migrate(db_path=DB_FILE, root="attached_assets", substitutes_path="substitutes.csv"):
+    """Import the CSV files into SQLite, replacing whatever the database held
+
+    Runs as one transaction that first empties every table, so re-running
+    it gives the same database instead of duplicate rows.
+    """
+    manager = SQLiteDataManager(db_path)
+    with manager.pool.transaction() as conn:
+        for table in TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('arrangements', 'attendance')")
+        users = _read(os.path.join(root, "users.csv"))
+        if users is not None:
+            manager.save_users(users, conn)
+        for day in DAYS:
+            schedule = _read(SCHEDULE_FILE.replace("attached_assets", root).format(day=day))
+            if schedule is not None:
+                manager.save_schedule(day, schedule, conn)
+        attendance = _read(os.path.join(root, "attendance.csv"))
+        if attendance is not None:
+            # Rows are stored in file order, so the last row per teacher/day wins
+            manager.mark_attendance(attendance.to_dict("records"), conn)
+        arrangements = _read(os.path.join(root, "arrangements.csv"))
+        if arrangements is not None:
+            manager.save_arrangements(arrangements.to_dict("records"), conn)
+        substitutes = _read(substitutes_path)
+        if substitutes is not None:
+            manager.save_substitutes(substitutes, conn)
+    return manager
+
+
+def export_csv(db_path=DB_FILE, out_dir=EXPORT_DIR):
+    """Write the database out in the CSV layout the admins use
+
+    Files go to `out_dir`, not over the live CSVs under attached_assets/.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manager = SQLiteDataManager(db_path)
+    write_csv_atomic(manager.load_users(), os.path.join(out_dir, "users.csv"))
+    for day in DAYS:
+        schedule = manager.load_schedule(day)
+        if not schedule.empty:
+            write_csv_atomic(schedule, os.path.join(out_dir, os.path.basename(SCHEDULE_FILE.format(day=day))))
+    write_csv_atomic(manager.get_attendance(latest=False), os.path.join(out_dir, "attendance.csv"))
+    write_csv_atomic(manager.load_arrangements().drop(columns="id"), os.path.join(out_dir, "arrangements.csv"))
+    write_csv_atomic(manager.load_substitutes(), os.path.join(out_dir, "substitutes.csv"))
+    manager.close()
+    return out_dir
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_sqlite_manager():
+    """Return the shared SQLiteDataManager for this process (or the active school's)"""
+    global _manager
+    manager = tenant_resource("sqlite", lambda root: SQLiteDataManager(os.path.join(root, DB_FILE)))
+    if manager is not None:
+        return manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = SQLiteDataManager()
+    return _manager
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "migrate":
+        migrate().close()
+        print(f"Migrated CSV files into {DB_FILE}")
+    elif command == "export":
+        out_dir = export_csv(out_dir=sys.argv[2] if len(sys.argv) > 2 else EXPORT_DIR)
+        print(f"Exported {DB_FILE} to CSV files in {out_dir}")
+    else:
+        print("Usage: python -m utils.sqlite_backend migrate|export [<dir>]")
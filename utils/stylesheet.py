@@ -0,0 +1,97 @@
+"""Compiled app stylesheet, installed once per browser session
+
+All static CSS lives in styles/*.css and is concatenated and minified once
+per process. Each session gets it once, as a <style> element placed in the
+app document's <head> by a small components.html script; later reruns only
+send the theme marker from utils.theme, so they stop re-sending kilobytes
+of identical CSS.
+
+The stylesheet is not served from static/: Streamlit's static file server
+(the 1.36 pin included) sends .css as text/plain with nosniff, which
+browsers refuse to apply, and it sets no long-lived Cache-Control either.
+"""
+
+import hashlib
+import json
+import re
+import threading
+
+STYLE_SOURCES = [
+    "styles/header.css",
+    "styles/sidebar.css",
+    "styles/buttons.css",
+    "styles/inputs.css",
+    "styles/theme.css",
+    "styles/profile_card.css",
+]
+STYLE_ELEMENT_ID = "ta-app-stylesheet"
+
+_compiled = None
+# url(...) may itself contain ';' (Google Fonts weight lists)
+_IMPORT = re.compile(r"@import\s+(?:url\([^)]*\)|[^;])[^;]*;")
+_build_lock = threading.Lock()
+
+
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def compile_stylesheet(sources=None):
+    """Return the minified stylesheet for `sources`
+
+    @import rules are hoisted to the top, where CSS requires them.
+    """
+    imports, rules = [], []
+    for path in sources or STYLE_SOURCES:
+        with open(path, "r", encoding="utf-8") as f:
+            css = f.read()
+        imports.extend(_IMPORT.findall(css))
+        rules.append(_IMPORT.sub("", css))
+    return minify_css("\n".join(imports + rules))
+
+
+def compiled_stylesheet():
+    """Return (digest, css) for the app stylesheet, compiled once per process"""
+    global _compiled
+    if _compiled is None:
+        with _build_lock:
+            if _compiled is None:
+                css = compile_stylesheet()
+                digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+                _compiled = (digest, css)
+    return _compiled
+
+
+def stylesheet_injector():
+    """Return a components.html snippet that installs the stylesheet
+
+    The script runs in a same-origin iframe and writes one <style> into the
+    app document's <head>. That element outlives the iframe and every later
+    rerun, so a session only needs the snippet once (and again only if the
+    digest changes).
+    """
+    digest, css = compiled_stylesheet()
+    # "</" would end the <script> early
+    css_literal = json.dumps(css).replace("</", "<\\/")
+    return f"""<script>
+const doc = window.parent.document;
+let style = doc.getElementById("{STYLE_ELEMENT_ID}");
+if (!style) {{
+  style = doc.createElement("style");
+  style.id = "{STYLE_ELEMENT_ID}";
+  doc.head.appendChild(style);
+}}
+if (style.dataset.digest !== "{digest}") {{
+  style.textContent = {css_literal};
+  style.dataset.digest = "{digest}";
+}}
+</script>"""
+
+
+if __name__ == "__main__":
+    digest, css = compiled_stylesheet()
+    print(f"{digest}: {len(css)} bytes")
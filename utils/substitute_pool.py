@@ -0,0 +1,292 @@
+"""Indexed pool of external substitute teachers
+
+substitutes.csv keeps subject_expertise as a comma-joined string
+("hindi,english"), availability as day codes ("MWF", "TTh"), a rating and
+a category, and the same person can appear under several ids. The pool
+parses each row once per file change, merges rows that share a phone
+number, and keeps inverted indexes subject -> ids, weekday -> ids and
+category -> ids with every posting list sorted best-rated first. A
+"best k for English on Tuesday, PGT" query walks the shortest posting
+list and stops after k hits instead of scanning the pool.
+
+Rewrite the file without duplicates with:
+
+    python -m utils.substitute_pool dedupe
+"""
+
+import os
+import re
+import sys
+import threading
+from collections import defaultdict, namedtuple
+
+import pandas as pd
+
+from utils.assignment import normalize_category
+from utils.csv_store import append_row, cached_file_signature, write_csv_atomic
+from utils.sqlite_backend import SUBSTITUTE_COLUMNS
+from utils.tenants import tenant_resource
+from utils.timetable import DAYS, day_name
+
+SUBSTITUTES_FILE = "substitutes.csv"
+
+Substitute = namedtuple(
+    "Substitute",
+    ["substitute_id", "name", "phone", "subjects", "days", "rating", "category", "qualification", "notes", "aliases"],
+)
+
+# Day codes used in the availability column ("MWF", "TTh"); two-letter codes first
+_DAY_CODES = [("TH", "thursday"), ("SA", "saturday"), ("SU", None), ("M", "monday"), ("T", "tuesday"),
+              ("W", "wednesday"), ("F", "friday"), ("S", "saturday")]
+_CODE_FOR_DAY = {"monday": "M", "tuesday": "T", "wednesday": "W", "thursday": "Th", "friday": "F", "saturday": "Sa"}
+_ALL_DAYS = {"ALL", "DAILY", "FULL", "ANY"}
+# Same subject, different spellings
+SUBJECT_ALIASES = {"SST": "SOCIAL SCIENCE", "SOCIAL STUDIES": "SOCIAL SCIENCE", "BST": "BUSINESS STUDIES",
+                   "MATH": "MATHS", "MATHEMATICS": "MATHS", "ENG": "ENGLISH", "PE": "PHE"}
+
+
+def normalize_phone(phone):
+    """Last 10 digits of a phone number ('+91 95204-96351' -> '9520496351')"""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return digits[-10:]
+
+
+def parse_subjects(text):
+    """'hindi, english/S.St.' -> ('HINDI', 'ENGLISH', 'SOCIAL SCIENCE')"""
+    subjects = []
+    for part in re.split(r"[,/;|&]", str(text or "")):
+        subject = " ".join(part.replace(".", "").upper().split())
+        if subject and subject != "NAN":
+            subjects.append(SUBJECT_ALIASES.get(subject, subject))
+    return tuple(dict.fromkeys(subjects))
+
+
+def parse_days(text):
+    """Weekdays from 'MWF', 'TTh', 'Mon,Thu', 'M-F', 'all' ... (Sunday is ignored)"""
+    text = str(text or "").strip().upper()
+    if not text or text == "NAN":
+        return ()
+    if text in _ALL_DAYS:
+        return tuple(DAYS)
+    days = []
+    for part in re.split(r"[,/;\s]+", text):
+        if part.count("-") == 1:  # "M-F", "Mon-Sat"
+            first, last = (parse_days(end) for end in part.split("-"))
+            if len(first) == 1 and len(last) == 1:
+                days.extend(DAYS[DAYS.index(first[0]):DAYS.index(last[0]) + 1])
+                continue
+        named = [day for day in DAYS if len(part) >= 3 and day.startswith(part[:3].lower())]
+        if named:  # "Mon", "Tuesday"
+            days.extend(named)
+            continue
+        while part:
+            for code, day in _DAY_CODES:
+                if part.startswith(code):
+                    if day:
+                        days.append(day)
+                    part = part[len(code):]
+                    break
+            else:
+                part = part[1:]
+    return tuple(day for day in DAYS if day in days)
+
+
+def day_codes(days):
+    """('monday', 'wednesday', 'friday') -> 'MWF' (the inverse of parse_days)"""
+    return "".join(_CODE_FOR_DAY[day] for day in DAYS if day in days)
+
+
+def _rating(value):
+    try:
+        rating = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if rating != rating else rating
+
+
+class SubstitutePool:
+    """Deduplicated substitutes with subject/day/category indexes"""
+
+    def __init__(self, path=SUBSTITUTES_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._signature = None
+        self._records = {}
+        self._by_phone = {}
+        self._aliases = {}
+        self._by_subject = {}
+        self._by_day = {}
+        self._by_category = {}
+        self._ranked = []
+
+    def _refresh(self):
+        signature = cached_file_signature(self.path)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            rows = []
+            if signature is not None:
+                rows = pd.read_csv(self.path, dtype=str, keep_default_na=False).to_dict("records")
+            self._build(rows)
+            self._signature = signature
+
+    def _build(self, rows):
+        merged = {}  # phone (or id when there's no phone) -> Substitute
+        for row in rows:
+            record = Substitute(
+                substitute_id=row.get("substitute_id", ""),
+                name=row.get("name", "").strip(),
+                phone=normalize_phone(row.get("phone")),
+                subjects=parse_subjects(row.get("subject_expertise")),
+                days=parse_days(row.get("availability")),
+                rating=_rating(row.get("rating")),
+                category=normalize_category(row.get("category")),
+                qualification=row.get("qualification", ""),
+                notes="" if row.get("notes") in (None, "nan") else row["notes"],
+                aliases=(),
+            )
+            key = record.phone or record.substitute_id
+            first = merged.get(key)
+            if first is None:
+                merged[key] = record
+            else:
+                # Same person listed again: keep the first id, union what they offer
+                merged[key] = first._replace(
+                    subjects=tuple(dict.fromkeys(first.subjects + record.subjects)),
+                    days=tuple(day for day in DAYS if day in first.days or day in record.days),
+                    rating=max(first.rating, record.rating),
+                    aliases=first.aliases + (record.substitute_id,),
+                )
+        records = {record.substitute_id: record for record in merged.values()}
+        ranked = sorted(records.values(), key=lambda r: (-r.rating, r.substitute_id))
+        by_subject, by_day, by_category = defaultdict(list), defaultdict(list), defaultdict(list)
+        for record in ranked:
+            for subject in record.subjects:
+                by_subject[subject].append(record.substitute_id)
+            for day in record.days:
+                by_day[day].append(record.substitute_id)
+            by_category[record.category].append(record.substitute_id)
+        self._records = records
+        self._ranked = [record.substitute_id for record in ranked]
+        self._by_phone = {record.phone: record.substitute_id for record in ranked if record.phone}
+        self._aliases = {alias: record.substitute_id for record in ranked for alias in record.aliases}
+        # posting list (best rated first) plus its set for membership probes
+        self._by_subject = {key: (ids, set(ids)) for key, ids in by_subject.items()}
+        self._by_day = {key: (ids, set(ids)) for key, ids in by_day.items()}
+        self._by_category = {key: (ids, set(ids)) for key, ids in by_category.items()}
+
+    def get(self, substitute_id):
+        """Record for an id (duplicate ids resolve to the merged record)"""
+        self._refresh()
+        return self._records.get(self._aliases.get(substitute_id, substitute_id))
+
+    def get_by_phone(self, phone):
+        self._refresh()
+        substitute_id = self._by_phone.get(normalize_phone(phone))
+        return self._records.get(substitute_id) if substitute_id else None
+
+    def phone_exists(self, phone):
+        return self.get_by_phone(phone) is not None
+
+    def top(self, k=5, subject=None, day=None, category=None, exclude=()):
+        """Best `k` substitutes (highest rating first) matching every filter
+
+        Posting lists are kept in rating order, so the shortest one is
+        walked and the others are only probed for membership.
+        """
+        self._refresh()
+        empty = ([], set())
+        postings = []
+        if subject:
+            postings.append(self._by_subject.get((parse_subjects(subject) or ("",))[0], empty))
+        if day is not None:
+            postings.append(self._by_day.get(day_name(day), empty))
+        if category:
+            postings.append(self._by_category.get(normalize_category(category), empty))
+        if not postings:
+            postings.append((self._ranked, None))
+        postings.sort(key=lambda posting: len(posting[0]))
+        others = [members for _, members in postings[1:]]
+        excluded = set(exclude)
+        results = []
+        for substitute_id in postings[0][0]:
+            if substitute_id in excluded or not all(substitute_id in other for other in others):
+                continue
+            results.append(self._records[substitute_id])
+            if len(results) == k:
+                break
+        return results
+
+    def subjects(self):
+        self._refresh()
+        return sorted(self._by_subject)
+
+    def duplicates(self):
+        """{kept substitute_id: (merged duplicate ids)}"""
+        self._refresh()
+        return {record.substitute_id: record.aliases for record in self._records.values() if record.aliases}
+
+    def to_frame(self):
+        """The deduplicated pool in the substitutes.csv layout, best rated first"""
+        self._refresh()
+        rows = [
+            {
+                "substitute_id": record.substitute_id,
+                "name": record.name,
+                "phone": record.phone,
+                "subject_expertise": ",".join(subject.lower() for subject in record.subjects),
+                "qualification": record.qualification,
+                "availability": day_codes(record.days),
+                "rating": record.rating,
+                "category": record.category,
+                "notes": record.notes,
+            }
+            for record in (self._records[substitute_id] for substitute_id in self._ranked)
+        ]
+        return pd.DataFrame(rows, columns=SUBSTITUTE_COLUMNS)
+
+    def add(self, record):
+        """Append a substitute; returns False if the phone is already in the pool"""
+        if self.phone_exists(record.get("phone")):
+            return False
+        append_row(self.path, record, columns=SUBSTITUTE_COLUMNS)
+        return True
+
+    def dedupe_file(self):
+        """Rewrite substitutes.csv with one row per person; returns rows removed"""
+        self._refresh()
+        removed = sum(len(record.aliases) for record in self._records.values())
+        if removed:
+            write_csv_atomic(self.to_frame(), self.path)
+        return removed
+
+    def __len__(self):
+        self._refresh()
+        return len(self._records)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_substitute_pool():
+    """Return the shared SubstitutePool for this process (or the active school's)"""
+    global _pool
+    pool = tenant_resource("substitutes", lambda root: SubstitutePool(os.path.join(root, SUBSTITUTES_FILE)))
+    if pool is not None:
+        return pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SubstitutePool()
+    return _pool
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["dedupe"]:
+        removed = get_substitute_pool().dedupe_file()
+        print(f"Removed {removed} duplicate rows from {SUBSTITUTES_FILE}")
+    else:
+        print("Usage: python -m utils.substitute_pool dedupe")
@@ -0,0 +1,178 @@
+"""Per-school data roots for background jobs
+
+configs/tenants.csv lists extra schools whose data lives on this server:
+
+    tenant_id,name,data_root
+    dps,Delhi Public School,/srv/schools/dps
+
+Each data_root has the usual attached_assets/ and configs/ layout. While a
+school is activated for a thread (tenant_context), the get_*() accessors
+in utils (users, timetable, attendance, rollups, workload, arrangements,
+substitutes, snapshot) return that school's own instances instead of the
+process-wide ones, so code written for one school needs no path changes.
+
+Only the background jobs use this: auto-attendance runs one scheduler per
+school and the file watcher covers every school's directories. Browser
+sessions always serve the repo's own data, because the pages read through
+DataManager, which has no data root to point at another school. Without
+tenants.csv there is just the "default" school, exactly as before.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from utils.csv_store import file_signature
+
+TENANTS_FILE = "configs/tenants.csv"
+DEFAULT_TENANT = "default"
+
+_local = threading.local()
+
+
+class Tenant:
+    """One school's data root and the caches built from it"""
+
+    def __init__(self, tenant_id, name, root):
+        self.tenant_id = tenant_id
+        self.name = name
+        self.root = root
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    @property
+    def legacy(self):
+        """True for the repo's own data, which keeps the process-wide singletons"""
+        return os.path.abspath(self.root) == os.path.abspath(".")
+
+    def path(self, relative):
+        return os.path.join(self.root, relative)
+
+    def resource(self, name, factory):
+        """This tenant's instance of `name`, built with factory(root) on first use"""
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(name)
+                if resource is None:
+                    resource = self._resources[name] = factory(self.root)
+        return resource
+
+    def loaded_resource(self, name):
+        """This tenant's `name` instance if it was built, else None"""
+        return self._resources.get(name)
+
+
+def load_tenants(path=TENANTS_FILE):
+    """{tenant_id: (name, data_root)}; just the default school without a config"""
+    if file_signature(path) is None:
+        return {DEFAULT_TENANT: ("Default", ".")}
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return {row["tenant_id"]: (row["name"] or row["tenant_id"], row["data_root"]) for row in df.to_dict("records")}
+
+
+class TenantRegistry:
+    """Configured schools plus the ones whose caches have been built"""
+
+    def __init__(self, path=TENANTS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._signature = object()
+        self._config = {}
+        self._loaded = {}  # tenant_id -> Tenant
+
+    def tenants(self):
+        """{tenant_id: (name, data_root)} from tenants.csv (re-read when it changes)
+
+        Schools that were removed, or whose row changed, drop their caches.
+        """
+        signature = file_signature(self.path)
+        if signature != self._signature:
+            with self._lock:
+                self._config = load_tenants(self.path)
+                self._signature = signature
+                for tenant_id, tenant in list(self._loaded.items()):
+                    if self._config.get(tenant_id) != (tenant.name, tenant.root):
+                        del self._loaded[tenant_id]
+        return self._config
+
+    def get(self, tenant_id):
+        """The Tenant for `tenant_id`, loading it if needed
+
+        Raises KeyError for a school that isn't in tenants.csv.
+        """
+        config = self.tenants()
+        with self._lock:
+            tenant = self._loaded.get(tenant_id)
+            if tenant is None:
+                if tenant_id not in config:
+                    raise KeyError(f"Unknown tenant: {tenant_id}")
+                name, root = config[tenant_id]
+                tenant = self._loaded[tenant_id] = Tenant(tenant_id, name, root)
+        return tenant
+
+    def loaded_tenant(self, tenant_id):
+        """The Tenant for `tenant_id` if it is loaded; doesn't load it"""
+        return self._loaded.get(tenant_id)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tenant_registry():
+    """Return the shared TenantRegistry for this process"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TenantRegistry()
+    return _registry
+
+
+def activate_tenant(tenant_id):
+    """Make `tenant_id` the active school for this thread (None: default data)"""
+    _local.tenant = get_tenant_registry().get(tenant_id) if tenant_id else None
+    return _local.tenant
+
+
+def current_tenant():
+    return getattr(_local, "tenant", None)
+
+
+@contextmanager
+def tenant_context(tenant_id):
+    """Run a block with `tenant_id` active, restoring the previous tenant after"""
+    previous = current_tenant()
+    activate_tenant(tenant_id)
+    try:
+        yield current_tenant()
+    finally:
+        _local.tenant = previous
+
+
+def tenant_resource(name, factory):
+    """The active tenant's `name` instance, or None to use the process-wide one"""
+    tenant = current_tenant()
+    if tenant is None or tenant.legacy:
+        return None
+    return tenant.resource(name, factory)
+
+
+def tenant_id_for_path(path):
+    """tenant_id whose data root holds `path` (the deepest root wins), or None"""
+    path = os.path.abspath(path)
+    best, best_root = None, ""
+    for tenant_id, (_, root) in get_tenant_registry().tenants().items():
+        root = os.path.join(os.path.abspath(root), "")
+        if path.startswith(root) and len(root) > len(best_root):
+            best, best_root = tenant_id, root
+    return best
+
+
+def tenant_data_dirs(directories):
+    """`directories` under every configured data root (for the file watcher)"""
+    roots = dict.fromkeys(root for _, root in get_tenant_registry().tenants().values())
+    return [os.path.join(root, directory) for root in roots for directory in directories]
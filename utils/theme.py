@@ -1,4 +1,7 @@
 import streamlit as st
+import streamlit.components.v1 as components
+
+from utils.stylesheet import compiled_stylesheet, stylesheet_injector
 
 
 def initialize_theme():
@@ -15,45 +18,28 @@ def toggle_theme():
         st.session_state.theme = "light"
 
 
-def apply_theme():
-    """Apply current theme using Streamlit's native theme"""
-    theme = st.session_state.theme
+def theme_classes():
+    """Return the marker classes describing the current theme state"""
+    classes = [f"ta-theme-{st.session_state.theme}"]
+    if st.session_state.get("authenticated"):
+        classes.append("ta-mode-dark" if st.session_state.get("dark_mode") else "ta-mode-light")
+    else:
+        classes.append("ta-login")
+    return classes
 
-    # Configure theme using Streamlit's config
-    st.markdown(
-        """
-        <style>
-        /* Base styles */
-        .stApp {
-            transition: all 0.3s ease-in-out;
-
-            
-        }
-
-        /* Dark theme overrides */
-        [data-theme="dark"] {
-            --secondary-background-color: #262730;
-            --text-color: #ffffft;
-            --font: "Source Sans Pro", sans-serif;
-        }
-
-        /* Light theme overrides */
-        [data-theme="light"] {
-            --secondary-background-color: #ffffff;
-            --text-color: #000000;
-            --font: "Source Sans Pro", sans-serif;
-        }
-        </style>
-    """,
-        unsafe_allow_html=True,
-    )
 
-    # Set theme
+def apply_theme():
+    """Apply current theme using the compiled stylesheet
+
+    The CSS is installed once per session (see utils.stylesheet); each
+    rerun only sends a hidden marker whose classes the stylesheet matches
+    with :has().
+    """
+    digest, _ = compiled_stylesheet()
+    if st.session_state.get("stylesheet_digest") != digest:
+        components.html(stylesheet_injector(), height=0)
+        st.session_state.stylesheet_digest = digest
     st.markdown(
-        f"""
-        <script>
-            document.body.setAttribute('data-theme', '{theme}');
-        </script>
-    """,
+        f'<div class="ta-theme-marker {" ".join(theme_classes())}"></div>',
         unsafe_allow_html=True,
     )
@@ -0,0 +1,214 @@
+"""Compiled in-memory timetable
+
+All schedule_<day>.csv files are compiled into one dense
+teacher x day x period array of interned cell codes, so "who is free",
+"what does T035 teach" and "who has X-B in period 5" are numpy masks or
+hash lookups instead of row-by-row pandas scans. Each day file is
+recompiled only when its (mtime, size) signature changes.
+"""
+
+import datetime
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.csv_store import cached_file_signature
+from utils.sections import SectionIndex
+from utils.tenants import tenant_resource
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+SCHEDULE_FILE = "attached_assets/schedule_{day}.csv"
+
+FREE = 0  # code of "FREE" cells
+NO_PERIOD = -1  # period doesn't exist in that day's file
+
+_PERIOD_COLUMN = re.compile(r"^period(\d+)$")
+
+
+def day_name(day):
+    """Normalize a weekday name, index, date or ISO date string to e.g. 'monday'"""
+    if isinstance(day, (datetime.date, pd.Timestamp)):
+        return day.strftime("%A").lower()
+    if isinstance(day, (int, np.integer)):
+        return DAYS[day]
+    name = str(day).strip().lower()
+    if name not in DAYS and name[:1].isdigit():
+        return pd.Timestamp(name).strftime("%A").lower()
+    return name
+
+
+def normalize_cell(value):
+    """Canonical spelling of a schedule cell: upper case, no parens/dashes"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "FREE"
+    text = str(value).upper().replace("(", " ").replace(")", " ").replace("-", " ")
+    text = " ".join(text.split())
+    return text or "FREE"
+
+
+def _compile_day(path):
+    """Parse one day file into (teacher rows, {teacher_id: [cells]}, period count)"""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    periods = sorted(
+        (int(m.group(1)), col) for col in df.columns if (m := _PERIOD_COLUMN.match(col))
+    )
+    period_cols = [col for _, col in periods]
+    meta_cols = [col for col in ("name", "category", "subject") if col in df.columns]
+    teachers = df[["teacher_id"] + meta_cols].to_dict("records")
+    cells = dict(zip(df["teacher_id"], df[period_cols].to_numpy().tolist()))
+    return teachers, cells, len(period_cols)
+
+
+class Timetable:
+    """Dense teacher x day x period grid of interned cell codes"""
+
+    def __init__(self, day_data, days=DAYS):
+        self.days = list(days)
+        self.day_index = {day: i for i, day in enumerate(self.days)}
+
+        self.teachers = {}
+        for day in self.days:
+            for row in day_data.get(day, ([], {}, 0))[0]:
+                self.teachers.setdefault(row["teacher_id"], row)
+        self.teacher_ids = list(self.teachers)
+        self.teacher_index = {tid: i for i, tid in enumerate(self.teacher_ids)}
+
+        self.periods = max([data[2] for data in day_data.values()] or [0])
+        self.vocabulary = ["FREE"]
+        self.codes = {"FREE": FREE}
+        self._sections = None
+        self.grid = np.full(
+            (len(self.teacher_ids), len(self.days), self.periods), NO_PERIOD, dtype=np.int32
+        )
+        for d, day in enumerate(self.days):
+            if day not in day_data:
+                continue
+            _, cells, n_periods = day_data[day]
+            for tid, row in cells.items():
+                t = self.teacher_index[tid]
+                self.grid[t, d, :n_periods] = [self.intern(cell) for cell in row]
+
+    def intern(self, cell):
+        label = normalize_cell(cell)
+        code = self.codes.get(label)
+        if code is None:
+            code = len(self.vocabulary)
+            self.codes[label] = code
+            self.vocabulary.append(label)
+        return code
+
+    def _d(self, day):
+        return self.day_index[day_name(day)]
+
+    @staticmethod
+    def _p(period):
+        # Periods are 1-based everywhere in the app
+        return int(period) - 1
+
+    def free_mask(self, day, period):
+        """Boolean mask over teacher_ids of who is FREE in a period"""
+        return self.grid[:, self._d(day), self._p(period)] == FREE
+
+    def free_teachers(self, day, period):
+        """teacher_ids that are FREE on `day` in `period`"""
+        mask = self.free_mask(day, period)
+        return [self.teacher_ids[i] for i in np.flatnonzero(mask)]
+
+    def teaching(self, teacher_id, day):
+        """{period: cell} for everything a teacher teaches on a day"""
+        row = self.grid[self.teacher_index[teacher_id], self._d(day)]
+        return {p + 1: self.vocabulary[code] for p, code in enumerate(row) if code > FREE}
+
+    @property
+    def sections(self):
+        """SectionIndex over this timetable, built on first use"""
+        if self._sections is None:
+            self._sections = SectionIndex(self)
+        return self._sections
+
+    def teachers_with(self, label, day, period):
+        """teacher_ids taking a section (e.g. 'X-B', 'X B') in a period"""
+        return self.sections.teachers_for(label, day, period)
+
+    def substitution_candidates(self, teacher_id, day, exclude=()):
+        """{period: [free teacher_ids]} for each period `teacher_id` teaches
+
+        One vectorized pass over the day instead of a scan per period.
+        """
+        d = self._d(day)
+        busy = np.flatnonzero(self.grid[self.teacher_index[teacher_id], d] > FREE)
+        free = self.grid[:, d, busy] == FREE
+        skip = [self.teacher_index[t] for t in (teacher_id, *exclude) if t in self.teacher_index]
+        free[skip, :] = False
+        return {
+            int(p) + 1: [self.teacher_ids[i] for i in np.flatnonzero(free[:, j])]
+            for j, p in enumerate(busy)
+        }
+
+    def workload(self, day=None):
+        """Number of teaching periods per teacher_id (for one day or the week)"""
+        grid = self.grid if day is None else self.grid[:, [self._d(day)], :]
+        counts = (grid > FREE).sum(axis=(1, 2))
+        return dict(zip(self.teacher_ids, counts.tolist()))
+
+
+class TimetableCache:
+    """Keeps a compiled Timetable up to date with the schedule files"""
+
+    def __init__(self, pattern=SCHEDULE_FILE, days=DAYS):
+        self.pattern = pattern
+        self.days = list(days)
+        self._lock = threading.Lock()
+        self._signatures = {}
+        self._day_data = {}
+        self._timetable = None
+
+    def get(self):
+        """Return the current Timetable, recompiling only changed day files"""
+        signatures = {day: cached_file_signature(self.pattern.format(day=day)) for day in self.days}
+        if self._timetable is not None and signatures == self._signatures:
+            return self._timetable
+        with self._lock:
+            if self._timetable is None or signatures != self._signatures:
+                for day, signature in signatures.items():
+                    if signature == self._signatures.get(day) and day in self._day_data:
+                        continue
+                    if signature is None:
+                        self._day_data.pop(day, None)
+                    else:
+                        self._day_data[day] = _compile_day(self.pattern.format(day=day))
+                self._timetable = Timetable(self._day_data, self.days)
+                self._signatures = signatures
+        return self._timetable
+
+    def invalidate(self, day=None):
+        """Drop compiled data for one day (or all) so the next get() rebuilds"""
+        with self._lock:
+            for d in [day_name(day)] if day is not None else list(self._signatures):
+                self._signatures.pop(d, None)
+            self._timetable = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_timetable_cache():
+    """Return the shared TimetableCache for this process (or the active school's)"""
+    global _cache
+    cache = tenant_resource("timetable", lambda root: TimetableCache(os.path.join(root, SCHEDULE_FILE)))
+    if cache is not None:
+        return cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TimetableCache()
+    return _cache
+
+
+def get_timetable():
+    """Return the current compiled Timetable for this process"""
+    return get_timetable_cache().get()
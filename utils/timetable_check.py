@@ -0,0 +1,221 @@
+"""Clash detection for the schedule_<day>.csv files
+
+Finds the timetable mistakes that otherwise only show up later as wrong
+substitute assignments:
+
+* section_clash: one section ("X-B") taken by two teachers in a period
+  (only a warning when every label spans several sections, as elective
+  blocks like "(XII B/C/D) PHE" next to "(XII B/C/D) COMPUTER SCIENCE" do);
+* teacher_clash: a teacher listed on two rows of a day file with classes
+  in the same period (the compiled Timetable silently keeps only one);
+* unknown_teacher / missing_teacher_id: rows whose teacher_id is not in
+  users.csv.
+
+All day files are stacked into one (row x period) array of factorized cell
+codes; cells are parsed once per distinct label, and clashes are found
+with np.unique over (day, period, section) and (day, period, teacher)
+keys, so a full check of a large school takes milliseconds. The schedule
+manager re-checks just the day and period it edited with
+ScheduleChecker.recheck() and shows the result inline.
+
+    python -m utils.timetable_check
+"""
+
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from utils.csv_store import cached_file_signature
+from utils.sections import parse_cell, section_keys
+from utils.tenants import tenant_resource
+from utils.timetable import DAYS, SCHEDULE_FILE, day_name
+from utils.user_directory import get_user_directory
+
+Conflict = namedtuple("Conflict", ["kind", "severity", "day", "period", "section", "teacher_ids", "message"])
+
+_PERIOD_COLUMN = re.compile(r"^period(\d+)$")
+
+
+def _period_columns(frame):
+    return sorted((int(m.group(1)), col) for col in frame.columns if (m := _PERIOD_COLUMN.match(col)))
+
+
+def _stack(frames, periods=None):
+    """(day code per row, teacher_ids, cells[rows, periods], period numbers)"""
+    numbers = sorted({p for frame in frames.values() for p, _ in _period_columns(frame)})
+    if periods is not None:
+        numbers = [p for p in numbers if p in set(periods)]
+    columns = [f"period{p}" for p in numbers]
+    days, teacher_ids, cells = [], [], []
+    for day, frame in frames.items():
+        days.append(np.full(len(frame), DAYS.index(day)))
+        teacher_ids.append(frame["teacher_id"].astype(str).str.strip().to_numpy())
+        cells.append(frame.reindex(columns=columns, fill_value="FREE").astype(str).to_numpy())
+    if not days:
+        return np.empty(0, int), np.empty(0, object), np.empty((0, len(numbers)), object), numbers
+    return np.concatenate(days), np.concatenate(teacher_ids), np.concatenate(cells), numbers
+
+
+def _shared_keys(keys, teachers, n_teachers):
+    """Keys that occur with two or more distinct teachers"""
+    pairs = np.unique(keys * n_teachers + teachers)
+    slots, counts = np.unique(pairs // n_teachers, return_counts=True)
+    return slots[counts > 1]
+
+
+def known_teacher_ids(directory=None):
+    """teacher_ids registered in users.csv"""
+    directory = directory or get_user_directory()
+    return {user.get("teacher_id") for user in directory.all_users()} - {None, ""}
+
+
+def find_conflicts(frames, periods=None, known=None):
+    """Conflicts in {day: schedule DataFrame}, optionally only in `periods`
+
+    `known` is the set of valid teacher_ids (defaults to the active
+    users.csv).
+    """
+    if known is None:
+        known = known_teacher_ids()
+    day_codes, teacher_ids, cells, numbers = _stack(frames, periods)
+    n_periods = len(numbers)
+    conflicts = []
+
+    for row in np.flatnonzero(teacher_ids == ""):
+        conflicts.append(Conflict("missing_teacher_id", "error", DAYS[day_codes[row]], None, None, (),
+                                  f"A row on {DAYS[day_codes[row]]} has no teacher_id"))
+    unknown = (teacher_ids != "") & ~pd.Series(teacher_ids).isin(known).to_numpy()
+    for day_code, teacher_id in sorted(set(zip(day_codes[unknown].tolist(), teacher_ids[unknown].tolist()))):
+        conflicts.append(Conflict("unknown_teacher", "error", DAYS[day_code], None, None, (teacher_id,),
+                                  f"{teacher_id} in schedule_{DAYS[day_code]}.csv is not in users.csv"))
+    if not n_periods or not len(cells):
+        return conflicts
+
+    # Parse each distinct cell once
+    label_codes, labels = pd.factorize(cells.ravel())
+    label_codes = label_codes.reshape(cells.shape)
+    slots = [parse_cell(label) for label in labels]
+    busy_label = np.array([slot is not None for slot in slots])
+    label_keys = [section_keys(slot) for slot in slots]
+    teacher_codes, teachers = pd.factorize(teacher_ids)
+
+    rows, cols = np.nonzero(busy_label[label_codes])
+    cell_labels = label_codes[rows, cols]
+    slot_of = day_codes[rows] * n_periods + cols  # (day, period) of every busy cell
+
+    # A teacher with classes on two rows in the same period
+    teacher_keys = slot_of * len(teachers) + teacher_codes[rows]
+    _, first, counts = np.unique(teacher_keys, return_index=True, return_counts=True)
+    for index in first[counts > 1]:
+        day, period = DAYS[day_codes[rows[index]]], numbers[cols[index]]
+        teacher_id = teacher_ids[rows[index]]
+        classes = sorted({labels[cell_labels[i]] for i in np.flatnonzero(teacher_keys == teacher_keys[index])})
+        conflicts.append(Conflict("teacher_clash", "error", day, period, None, (teacher_id,),
+                                  f"{teacher_id} is listed twice in period {period} on {day}: {', '.join(classes)}"))
+
+    # One section with two teachers: expand every busy cell into its sections
+    sections, key_codes = np.unique([key for keys_ in label_keys for key in keys_] or [""], return_inverse=True)
+    key_counts = np.array([len(keys_) for keys_ in label_keys])
+    offsets = np.concatenate([[0], np.cumsum(key_counts)[:-1]])
+    repeats = key_counts[cell_labels]
+    cell_index = np.repeat(np.arange(len(rows)), repeats)
+    within = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    section_of = key_codes[np.repeat(offsets[cell_labels], repeats) + within]
+    section_slot = slot_of[cell_index] * len(sections) + section_of
+    for key in _shared_keys(section_slot, teacher_codes[rows[cell_index]], len(teachers)):
+        entries = cell_index[section_slot == key]
+        day, period = DAYS[day_codes[rows[entries[0]]]], numbers[cols[entries[0]]]
+        section = sections[key % len(sections)]
+        holders = sorted({(teacher_ids[rows[i]], labels[cell_labels[i]]) for i in entries})
+        elective = all(key_counts[cell_labels[i]] > 1 for i in entries)
+        conflicts.append(Conflict(
+            "section_clash", "warning" if elective else "error", day, period, section, tuple(dict.fromkeys(t for t, _ in holders)),
+            f"{section} has {len(holders)} teachers in period {period} on {day}: "
+            + ", ".join(f"{t} ({label})" for t, label in holders),
+        ))
+    return conflicts
+
+
+class ScheduleChecker:
+    """Conflicts of the current schedule files, re-checked per day or slot
+
+    A full check runs only for day files whose signature changed; after an
+    edit, recheck() replaces just that (day, period)'s conflicts.
+    """
+
+    def __init__(self, pattern=SCHEDULE_FILE, days=DAYS):
+        self.pattern = pattern
+        self.days = list(days)
+        self._lock = threading.Lock()
+        self._signatures = {}
+        self._conflicts = {}  # day -> [Conflict]
+
+    def _read(self, day):
+        return pd.read_csv(self.pattern.format(day=day), dtype=str, keep_default_na=False)
+
+    def conflicts(self, day=None):
+        """Current conflicts (for one day or the week), checking changed files"""
+        days = [day_name(day)] if day is not None else self.days
+        with self._lock:
+            signatures = {d: cached_file_signature(self.pattern.format(day=d)) for d in days}
+            stale = [d for d in days if d not in self._conflicts or signatures[d] != self._signatures.get(d)]
+            if stale:
+                frames = {d: self._read(d) for d in stale if signatures[d] is not None}
+                found = find_conflicts(frames)
+                for d in stale:
+                    self._conflicts[d] = [c for c in found if c.day == d]
+                    self._signatures[d] = signatures[d]
+            return [c for d in days for c in self._conflicts[d]]
+
+    def recheck(self, day, period, frame=None):
+        """Re-check one period of one day after an edit; returns its conflicts
+
+        `frame` is the edited day DataFrame (read from disk if omitted).
+        Missing/unknown teacher_ids are re-checked for the whole day, which
+        only needs the teacher_id column.
+        """
+        day = day_name(day)
+        self.conflicts(day)
+        if frame is None:
+            frame = self._read(day)
+        period = int(period)
+        found = find_conflicts({day: frame}, periods=[period])
+        with self._lock:
+            self._conflicts[day] = [c for c in self._conflicts[day] if c.period not in (None, period)] + found
+        return found
+
+    def invalidate(self, day=None):
+        with self._lock:
+            for d in [day_name(day)] if day is not None else list(self._conflicts):
+                self._conflicts.pop(d, None)
+
+
+_checker = None
+_checker_lock = threading.Lock()
+
+
+def get_schedule_checker():
+    """Return the shared ScheduleChecker for this process (or the active school's)"""
+    global _checker
+    checker = tenant_resource("schedule_checker", lambda root: ScheduleChecker(os.path.join(root, SCHEDULE_FILE)))
+    if checker is not None:
+        return checker
+    if _checker is None:
+        with _checker_lock:
+            if _checker is None:
+                _checker = ScheduleChecker()
+    return _checker
+
+
+if __name__ == "__main__":
+    found = get_schedule_checker().conflicts()
+    for conflict in found:
+        print(f"{conflict.severity.upper():<8} {conflict.kind:<19} {conflict.message}")
+    errors = sum(conflict.severity == "error" for conflict in found)
+    print(f"{errors} errors, {len(found) - errors} warnings")
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,294 @@
+"""Streaming import of a master timetable workbook
+
+Compiles an .xlsx timetable straight into the schedule_<day>.csv files.
+The workbook is opened read-only and read one sheet and one row at a
+time, so large timetables never sit in memory as a whole; only the
+compiled per-day rows are kept. Two layouts are understood:
+
+* teacher-wise: a teacher_id column plus period columns whose cells are
+  class labels ("XI-B Maths", "(X B) MATHS"), exactly like the CSVs;
+* section-wise: a class/section column plus period columns whose cells
+  hold the subject and the teacher_id ("MATHS T035", "T035 / Maths").
+  Sections the same teacher takes together are merged ("(XI B/C/D) PHE").
+
+The day comes from the sheet name ("Monday", "MON") or a day column.
+Class labels are rewritten in the canonical "(GRADE S/S) SUBJECT" form and
+teacher_ids are checked against users.csv. Every problem is reported with
+sheet and row; by default nothing is written if there are errors. Day
+files are replaced atomically.
+
+    python -m utils.timetable_import WORKBOOK.xlsx [--dry-run] [--force]
+"""
+
+import re
+import sys
+from collections import Counter, defaultdict, namedtuple
+
+import pandas as pd
+
+from utils.csv_store import write_csv_atomic
+from utils.sections import parse_cell
+from utils.timetable import DAYS, get_timetable_cache
+from utils.user_directory import get_user_directory
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # only needed for imports, not to run the app
+    load_workbook = None
+
+Issue = namedtuple("Issue", ["sheet", "row", "severity", "message"])
+ImportReport = namedtuple("ImportReport", ["days", "issues", "written"])
+
+TEACHER_HEADERS = {"teacher_id", "teacher id", "teacherid", "teacher code", "emp id", "employee id"}
+SECTION_HEADERS = {"class", "section", "class/section", "class section", "class-section"}
+DAY_HEADERS = {"day", "weekday"}
+META_HEADERS = {"name": "name", "teacher name": "name", "category": "category", "subject": "subject"}
+HEADER_SCAN_ROWS = 10
+
+_PERIOD_HEADER = re.compile(r"^(?:period|prd|p)?\s*[-_.]?\s*(\d{1,2})$")
+_TEACHER_ID = re.compile(r"\b(T[0-9O]\d{1,4})\b")
+
+
+def day_for(label):
+    """'monday' for 'Monday', 'MON', 'mon.' ...; None if not a weekday"""
+    text = str(label or "").strip().lower().rstrip(".")
+    if len(text) >= 3:
+        for day in DAYS:
+            if day.startswith(text) or text.startswith(day):
+                return day
+    return None
+
+
+def canonical_label(text):
+    """'(GRADE S/S) SUBJECT' for a class label; None for free/empty cells"""
+    slot = parse_cell(text)
+    if slot is None:
+        return None
+    if slot.grade is None:
+        return slot.subject
+    sections = f" {'/'.join(slot.sections)}" if slot.sections else ""
+    return f"({slot.grade}{sections}) {slot.subject}".strip()
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _read_header(rows):
+    """(header row number, {role: column index}, {period: column index})"""
+    for number, values in rows:
+        labels = [_text(v).lower() for v in values]
+        columns = {}
+        periods = {}
+        for i, label in enumerate(labels):
+            if label in TEACHER_HEADERS:
+                columns["teacher_id"] = i
+            elif label in SECTION_HEADERS:
+                columns["section"] = i
+            elif label in DAY_HEADERS:
+                columns["day"] = i
+            elif label in META_HEADERS:
+                columns[META_HEADERS[label]] = i
+            elif (match := _PERIOD_HEADER.match(label)):
+                periods[int(match.group(1))] = i
+        if periods and ("teacher_id" in columns or "section" in columns):
+            return number, columns, periods
+        if number >= HEADER_SCAN_ROWS:
+            break
+    return None, {}, {}
+
+
+class TimetableCompiler:
+    """Accumulates compiled per-day teacher rows and the issues found"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_user_directory()
+        self.cells = defaultdict(dict)  # day -> teacher_id -> {period: label}
+        self.meta = {}  # teacher_id -> {name, category, subject}
+        self.periods = 0
+        self.issues = []
+        self._known = {}  # teacher_id -> in users.csv (checked once per import)
+
+    def issue(self, sheet, row, message, severity="error"):
+        self.issues.append(Issue(sheet, row, severity, message))
+
+    def _teacher(self, sheet, row, teacher_id):
+        if not teacher_id:
+            self.issue(sheet, row, "missing teacher_id")
+            return None
+        if teacher_id not in self._known:
+            self._known[teacher_id] = self.directory.teacher_id_exists(teacher_id)
+        if not self._known[teacher_id]:
+            self.issue(sheet, row, f"unknown teacher_id {teacher_id} (not in users.csv)")
+            return None
+        return teacher_id
+
+    def _assign(self, sheet, row, day, teacher_id, period, label):
+        taken = self.cells[day].setdefault(teacher_id, {})
+        current = taken.get(period)
+        if current is None:
+            taken[period] = label
+            return
+        merged = _merge_labels(current, label)
+        if merged is None:
+            self.issue(sheet, row, f"{teacher_id} already has {current} in period {period} on {day}, got {label}")
+        else:
+            taken[period] = merged
+
+    def add_teacher_row(self, sheet, row, day, values, columns, periods):
+        teacher_id = self._teacher(sheet, row, _text(values[columns["teacher_id"]]).upper())
+        if teacher_id is None:
+            return
+        if teacher_id in self.cells[day]:
+            self.issue(sheet, row, f"{teacher_id} appears twice on {day}; row skipped")
+            return
+        self.cells[day][teacher_id] = {}
+        meta = self.meta.setdefault(teacher_id, {})
+        for key in ("name", "category", "subject"):
+            if key in columns and _text(values[columns[key]]):
+                meta.setdefault(key, _text(values[columns[key]]))
+        for period, index in periods.items():
+            raw = _text(values[index]) if index < len(values) else ""
+            label = canonical_label(raw)
+            if label is None:
+                continue
+            if parse_cell(raw).grade is None:
+                self.issue(sheet, row, f"period {period}: no class in '{raw}'", "warning")
+            self._assign(sheet, row, day, teacher_id, period, label)
+
+    def add_section_row(self, sheet, row, day, values, columns, periods):
+        section = _text(values[columns["section"]])
+        slot = parse_cell(section)
+        if slot is None or slot.grade is None:
+            self.issue(sheet, row, f"unrecognized class/section '{section}'")
+            return
+        for period, index in periods.items():
+            raw = _text(values[index]) if index < len(values) else ""
+            if parse_cell(raw) is None:
+                continue
+            teacher_ids = _TEACHER_ID.findall(raw.upper())
+            subject = " ".join(_TEACHER_ID.sub(" ", raw.upper()).replace("/", " ").replace("-", " ").split())
+            if not teacher_ids:
+                self.issue(sheet, row, f"period {period}: no teacher_id in '{raw}'")
+                continue
+            label = canonical_label(f"{section} {subject}")
+            for teacher_id in teacher_ids:
+                if self._teacher(sheet, row, teacher_id) is not None:
+                    self._assign(sheet, row, day, teacher_id, period, label)
+                    self.meta.setdefault(teacher_id, {}).setdefault("subjects", Counter())[subject] += 1
+
+    def add_sheet(self, sheet_name, rows):
+        """Compile one sheet from an iterator of (row number, values)"""
+        rows = iter(rows)
+        header_row, columns, periods = _read_header(rows)
+        if header_row is None:
+            self.issue(sheet_name, 0, "no header with a teacher_id or class column and period columns", "warning")
+            return
+        sheet_day = day_for(sheet_name)
+        if sheet_day is None and "day" not in columns:
+            self.issue(sheet_name, header_row, "sheet name is not a weekday and there is no day column")
+            return
+        self.periods = max(self.periods, max(periods))
+        layout = self.add_teacher_row if "teacher_id" in columns else self.add_section_row
+        for number, values in rows:
+            if not any(_text(v) for v in values):
+                continue
+            day = sheet_day
+            if "day" in columns:
+                day = day_for(values[columns["day"]]) or sheet_day
+                if day is None:
+                    self.issue(sheet_name, number, f"unknown day '{_text(values[columns['day']])}'")
+                    continue
+            layout(sheet_name, number, day, values, columns, periods)
+
+    def frames(self):
+        """{day: DataFrame in the schedule_<day>.csv layout}
+
+        Every teacher in the workbook gets a row on every imported day
+        (all FREE on days they don't teach), as in the hand-made files.
+        """
+        period_columns = [f"period{p}" for p in range(1, self.periods + 1)]
+        teacher_ids = list(dict.fromkeys(tid for teachers in self.cells.values() for tid in teachers))
+        frames = {}
+        for day, teachers in self.cells.items():
+            rows = []
+            for teacher_id in teacher_ids:
+                cells = teachers.get(teacher_id, {})
+                user = self.directory.get_by_teacher_id(teacher_id) or {}
+                meta = self.meta.get(teacher_id, {})
+                subjects = meta.get("subjects")
+                rows.append({
+                    "teacher_id": teacher_id,
+                    "name": meta.get("name") or user.get("name", ""),
+                    "category": meta.get("category") or user.get("category", ""),
+                    "subject": meta.get("subject") or (subjects.most_common(1)[0][0] if subjects else ""),
+                    **{f"period{p}": cells.get(p, "FREE") for p in range(1, self.periods + 1)},
+                })
+            frames[day] = pd.DataFrame(rows, columns=["teacher_id", "name", "category", "subject"] + period_columns)
+        return frames
+
+
+def _merge_labels(current, new):
+    """Combine two sections of the same grade and subject; None if they clash"""
+    a, b = parse_cell(current), parse_cell(new)
+    if a == b:
+        return current
+    if a.grade is None or a.grade != b.grade or a.subject != b.subject:
+        return None
+    sections = sorted(set(a.sections) | set(b.sections))
+    return canonical_label(f"{a.grade} {'/'.join(sections)} {a.subject}")
+
+
+def _stream_rows(worksheet):
+    for number, values in enumerate(worksheet.iter_rows(values_only=True), start=1):
+        yield number, values
+
+
+def import_timetable(workbook_path, dry_run=False, force=False, pattern=None):
+    """Compile a workbook into schedule_<day>.csv files
+
+    Writes nothing when there are errors unless `force` is set (then the
+    valid rows are written). Returns an ImportReport(days, issues, written)
+    where days maps day -> teacher rows compiled.
+    """
+    if load_workbook is None:
+        raise ImportError("openpyxl is required to import timetable workbooks")
+    pattern = pattern or get_timetable_cache().pattern
+    compiler = TimetableCompiler()
+    workbook = load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            compiler.add_sheet(worksheet.title, _stream_rows(worksheet))
+    finally:
+        workbook.close()
+
+    frames = compiler.frames()
+    days = {day: len(frame) for day, frame in frames.items()}
+    errors = [issue for issue in compiler.issues if issue.severity == "error"]
+    written = []
+    if not dry_run and (force or not errors):
+        for day, frame in frames.items():
+            path = pattern.format(day=day)
+            write_csv_atomic(frame, path)
+            written.append(path)
+    return ImportReport(days, compiler.issues, written)
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) != 1:
+        print("Usage: python -m utils.timetable_import WORKBOOK.xlsx [--dry-run] [--force]")
+        sys.exit(2)
+    report = import_timetable(args[0], dry_run="--dry-run" in sys.argv, force="--force" in sys.argv)
+    for issue in report.issues:
+        print(f"{issue.severity.upper()} {issue.sheet}!{issue.row}: {issue.message}")
+    print(", ".join(f"{day}: {n} teachers" for day, n in report.days.items()) or "No rows compiled")
+    if report.written:
+        print(f"Wrote {len(report.written)} schedule files")
+    elif any(issue.severity == "error" for issue in report.issues):
+        print("Nothing written (fix the errors or use --force)")
+        sys.exit(1)
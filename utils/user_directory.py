@@ -0,0 +1,149 @@
+import os
+import threading
+
+import pandas as pd
+
+from utils.csv_store import append_row, cached_file_signature, file_lock, file_signature, update_csv
+from utils.tenants import tenant_resource
+
+USERS_FILE = "attached_assets/users.csv"
+USER_COLUMNS = ["username", "password", "name", "phone", "teacher_id", "category", "role"]
+
+
+class UserDirectory:
+    """Process-wide, indexed view of users.csv
+
+    The file is parsed once and kept as plain dict records with hash indexes
+    on username, phone and teacher_id. Every lookup compares the file's
+    (mtime, size) signature and reloads only when it changed, so edits made
+    outside the app are still picked up.
+    """
+
+    def __init__(self, path=USERS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._signature = None
+        self._by_username = {}
+        self._by_phone = {}
+        self._by_teacher_id = {}
+
+    def _load(self, signature):
+        by_username, by_phone, by_teacher_id = {}, {}, {}
+        if signature is not None and signature[1] > 0:
+            users_df = pd.read_csv(self.path, dtype=str, keep_default_na=False)
+            for record in users_df.to_dict("records"):
+                self._index(record, by_username, by_phone, by_teacher_id)
+        self._by_username = by_username
+        self._by_phone = by_phone
+        self._by_teacher_id = by_teacher_id
+        self._signature = signature
+
+    @staticmethod
+    def _index(record, by_username, by_phone, by_teacher_id):
+        # First row wins, matching the old `iloc[0]` lookups
+        by_username.setdefault(record.get("username", ""), record)
+        if record.get("phone"):
+            by_phone.setdefault(record["phone"], record)
+        if record.get("teacher_id"):
+            by_teacher_id.setdefault(record["teacher_id"], record)
+
+    def _refresh(self):
+        signature = cached_file_signature(self.path)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature != self._signature:
+                try:
+                    self._load(signature)
+                except Exception as e:
+                    print(f"Error loading users: {str(e)}")
+
+    def invalidate(self):
+        """Force the next lookup to re-read users.csv"""
+        with self._lock:
+            self._signature = None
+
+    def add(self, record):
+        """Append a user to users.csv and index it without re-parsing
+
+        Returns False if the username is already taken. The check runs
+        under the file lock against the file as it is on disk, so two
+        processes can't register the same username.
+        """
+        with self._lock, file_lock(self.path):
+            signature = file_signature(self.path)
+            if signature != self._signature:
+                self._load(signature)
+            if record["username"] in self._by_username:
+                return False
+            cached = self._signature
+            before, after = append_row(self.path, record, columns=USER_COLUMNS)
+            if before is not None and before == cached:
+                record = {col: "" if record.get(col) is None else str(record[col]) for col in USER_COLUMNS}
+                self._index(record, self._by_username, self._by_phone, self._by_teacher_id)
+                self._signature = after
+            else:
+                # Someone else touched the file; reload on the next lookup
+                self._signature = None
+            return True
+
+    def update_password(self, phone, password_hash):
+        """Rewrite the password hash for the user with `phone`"""
+
+        def _apply(users_df):
+            users_df.loc[users_df["phone"] == str(phone), "password"] = password_hash
+            return users_df
+
+        with self._lock:
+            update_csv(self.path, _apply, dtype=str, keep_default_na=False)
+            self._signature = None
+
+    def get(self, username):
+        """Return the user record for a username, or None"""
+        self._refresh()
+        return self._by_username.get(username)
+
+    def get_by_phone(self, phone):
+        """Return the user record registered with a phone number, or None"""
+        self._refresh()
+        return self._by_phone.get(str(phone))
+
+    def get_by_teacher_id(self, teacher_id):
+        """Return the user record for a teacher_id, or None"""
+        self._refresh()
+        return self._by_teacher_id.get(teacher_id)
+
+    def username_exists(self, username):
+        return self.get(username) is not None
+
+    def phone_exists(self, phone):
+        return self.get_by_phone(phone) is not None
+
+    def teacher_id_exists(self, teacher_id):
+        return self.get_by_teacher_id(teacher_id) is not None
+
+    def all_users(self):
+        """Return a list of all user records"""
+        self._refresh()
+        return list(self._by_username.values())
+
+    def __len__(self):
+        self._refresh()
+        return len(self._by_username)
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_user_directory():
+    """Return the shared UserDirectory for this process (or the active school's)"""
+    global _directory
+    directory = tenant_resource("users", lambda root: UserDirectory(os.path.join(root, USERS_FILE)))
+    if directory is not None:
+        return directory
+    if _directory is None:
+        with _directory_lock:
+            if _directory is None:
+                _directory = UserDirectory()
+    return _directory
@@ -0,0 +1,154 @@
+"""Working-day calendar
+
+A date is a working day when its weekday has a schedule_<day>.csv file
+(Monday-Saturday; never Sunday) and it isn't listed in
+configs/suspended_dates.csv. For each academic term (see
+utils.workload.TERM_START_MONTHS) the calendar precomputes a bitmap of
+working days plus its prefix sums, so "is this a working day", "how many
+working days between two dates" and "the next N working days" are array
+lookups instead of a walk over the dates. Term bitmaps are built on first
+use and all dropped when suspended_dates.csv or the set of schedule files
+changes.
+"""
+
+import datetime
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from utils.csv_store import cached_file_signature
+from utils.tenants import tenant_resource
+from utils.timetable import DAYS, SCHEDULE_FILE
+from utils.workload import bucket, bucket_bounds
+
+SUSPENDED_DATES_FILE = "configs/suspended_dates.csv"
+
+# first date, working-day bitmap, prefix sums (prefix[i] = working days before day i), working day offsets
+_Term = namedtuple("_Term", ["first", "bitmap", "prefix", "offsets"])
+
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def load_suspended_dates(path=SUSPENDED_DATES_FILE):
+    try:
+        dates = pd.read_csv(path, dtype=str)["date"].dropna()
+        return set(pd.to_datetime(dates).dt.date)
+    except Exception:
+        return set()
+
+
+class WorkingCalendar:
+    """Per-term working-day bitmaps over the schedule weekdays and suspended dates"""
+
+    def __init__(self, suspended_path=SUSPENDED_DATES_FILE, schedule_pattern=SCHEDULE_FILE):
+        self.suspended_path = suspended_path
+        self.schedule_pattern = schedule_pattern
+        self._lock = threading.Lock()
+        self._signature = object()
+        self._weekdays = []
+        self._suspended = set()
+        self._terms = {}
+
+    def _refresh(self):
+        signature = (
+            cached_file_signature(self.suspended_path),
+            tuple(cached_file_signature(self.schedule_pattern.format(day=day)) is not None for day in DAYS),
+        )
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            scheduled = [i for i, exists in enumerate(signature[1]) if exists]
+            # Without any schedule files fall back to Monday-Saturday
+            self._weekdays = scheduled or list(range(len(DAYS)))
+            self._suspended = load_suspended_dates(self.suspended_path) if signature[0] is not None else set()
+            self._terms = {}
+            self._signature = signature
+
+    def _term(self, date):
+        key = bucket("term", date)
+        term = self._terms.get(key)
+        if term is None:
+            first, last = bucket_bounds("term", date)
+            length = (last - first).days + 1
+            weekdays = (first.weekday() + np.arange(length)) % 7
+            bitmap = np.isin(weekdays, self._weekdays)
+            suspended = [(day - first).days for day in self._suspended if first <= day <= last]
+            bitmap[suspended] = False
+            prefix = np.concatenate([[0], np.cumsum(bitmap)])
+            term = self._terms[key] = _Term(first, bitmap, prefix, np.flatnonzero(bitmap))
+        return term
+
+    def is_working_day(self, date):
+        self._refresh()
+        date = _as_date(date)
+        term = self._term(date)
+        return bool(term.bitmap[(date - term.first).days])
+
+    def count(self, start, end):
+        """Number of working days from `start` to `end`, both included"""
+        self._refresh()
+        start, end = _as_date(start), _as_date(end)
+        total = 0
+        while start <= end:
+            term = self._term(start)
+            last = term.first + datetime.timedelta(days=len(term.bitmap) - 1)
+            stop = min(end, last)
+            total += int(term.prefix[(stop - term.first).days + 1] - term.prefix[(start - term.first).days])
+            start = last + datetime.timedelta(days=1)
+        return total
+
+    def working_days(self, start, end):
+        """Working dates from `start` to `end`, both included"""
+        self._refresh()
+        start, end = _as_date(start), _as_date(end)
+        dates = []
+        while start <= end:
+            term = self._term(start)
+            last = term.first + datetime.timedelta(days=len(term.bitmap) - 1)
+            lo = term.prefix[(start - term.first).days]
+            hi = term.prefix[(min(end, last) - term.first).days + 1]
+            dates.extend(term.first + datetime.timedelta(days=int(offset)) for offset in term.offsets[lo:hi])
+            start = last + datetime.timedelta(days=1)
+        return dates
+
+    def next_working_days(self, date, n=1, include=False):
+        """The next `n` working dates after `date` (from `date` if `include`)"""
+        self._refresh()
+        start = _as_date(date) + datetime.timedelta(days=0 if include else 1)
+        dates = []
+        while len(dates) < n:
+            term = self._term(start)
+            lo = term.prefix[(start - term.first).days]
+            dates.extend(term.first + datetime.timedelta(days=int(offset))
+                         for offset in term.offsets[lo:lo + n - len(dates)])
+            start = term.first + datetime.timedelta(days=len(term.bitmap))
+        return dates
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def get_working_calendar():
+    """Return the shared WorkingCalendar for this process (or the active school's)"""
+    global _calendar
+    calendar = tenant_resource("calendar", lambda root: WorkingCalendar(
+        os.path.join(root, SUSPENDED_DATES_FILE), os.path.join(root, SCHEDULE_FILE)))
+    if calendar is not None:
+        return calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                _calendar = WorkingCalendar()
+    return _calendar
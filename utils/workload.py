@@ -0,0 +1,238 @@
+"""Incrementally maintained substitution workload
+
+workload_counter.csv is an append-only ledger of (date, teacher_id, delta)
+rows. Every time an arrangement is written or changes status through
+utils.arrangement_log, the change in "counted" substitutions is appended,
+and in-memory counters per day/week/month/term bucket are bumped, so "how
+many has T049 done this week" is a dict lookup. Trailing windows ("the
+last 7 days") sum the per-day counters, one lookup per day.
+
+arrangements.csv is also written directly by DataManager, which does not
+report its changes. So whenever arrangements.csv is newer than the ledger,
+the next query rebuilds the ledger from it first. Rebuild by hand with:
+
+    python -m utils.workload rebuild
+"""
+
+import datetime
+import os
+import sys
+import threading
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from utils.csv_store import append_rows, cached_file_signature, write_csv_atomic
+from utils.tenants import tenant_resource
+
+WORKLOAD_FILE = "attached_assets/workload_counter.csv"
+ARRANGEMENTS_FILE = "attached_assets/arrangements.csv"
+LEDGER_COLUMNS = ["date", "teacher_id", "delta"]
+
+# Only confirmed substitutions count towards workload; PENDING does not
+COUNTED_STATUSES = {"ASSIGNED", "MANUALLY_ASSIGNED"}
+WINDOWS = ("day", "week", "month", "term")
+# Academic terms start in April and October
+TERM_START_MONTHS = (4, 10)
+
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def bucket(window, date):
+    """Key of the calendar bucket `date` falls in for a window"""
+    date = _as_date(date)
+    if window == "day":
+        return date
+    if window == "week":
+        return tuple(date.isocalendar())[:2]
+    if window == "month":
+        return (date.year, date.month)
+    if window == "term":
+        first, second = TERM_START_MONTHS
+        if date.month >= second:
+            return (date.year, 2)
+        if date.month >= first:
+            return (date.year, 1)
+        return (date.year - 1, 2)
+    raise ValueError(f"Unknown workload window: {window}")
+
+
+def bucket_bounds(window, date):
+    """(first, last) dates of the calendar bucket `date` falls in"""
+    date = _as_date(date)
+    if window == "day":
+        return date, date
+    if window == "week":
+        first = date - datetime.timedelta(days=date.weekday())
+        return first, first + datetime.timedelta(days=6)
+    if window == "month":
+        first = date.replace(day=1)
+        return first, (first + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    if window == "term":
+        year, term = bucket("term", date)
+        first = datetime.date(year, TERM_START_MONTHS[term - 1], 1)
+        following = datetime.date(year, TERM_START_MONTHS[1], 1) if term == 1 else \
+            datetime.date(year + 1, TERM_START_MONTHS[0], 1)
+        return first, following - datetime.timedelta(days=1)
+    raise ValueError(f"Unknown workload window: {window}")
+
+
+def is_counted(row):
+    """True if an arrangement row counts as a substitution for its replacement"""
+    if not row or not row.get("replacement_teacher"):
+        return False
+    return str(row.get("status", "")).strip().upper() in COUNTED_STATUSES
+
+
+class WorkloadLedger:
+    """Per-teacher substitution counters over day/week/month/term buckets"""
+
+    def __init__(self, path=WORKLOAD_FILE, arrangements_path=ARRANGEMENTS_FILE):
+        self.path = path
+        self.arrangements_path = arrangements_path
+        self._lock = threading.RLock()
+        self._signature = None
+        self._counters = defaultdict(Counter)
+
+    def _stale(self, signature):
+        """True if arrangements.csv was written after the ledger"""
+        source = cached_file_signature(self.arrangements_path)
+        return source is not None and (signature is None or source[0] > signature[0])
+
+    def _refresh(self):
+        signature = cached_file_signature(self.path)
+        if signature == self._signature and not self._stale(signature):
+            return
+        with self._lock:
+            if self._stale(signature):
+                self.rebuild()
+                signature = cached_file_signature(self.path)
+            if signature == self._signature:
+                return
+            counters = defaultdict(Counter)
+            if signature is not None and signature[1] > 0:
+                ledger = pd.read_csv(self.path, dtype={"teacher_id": str})
+                daily = ledger.groupby(["date", "teacher_id"])["delta"].sum()
+                for (date, teacher_id), delta in daily.items():
+                    self._bump(counters, date, teacher_id, int(delta))
+            self._counters = counters
+            self._signature = signature
+
+    @staticmethod
+    def _bump(counters, date, teacher_id, delta):
+        for window in WINDOWS:
+            counters[(window, bucket(window, date))][teacher_id] += delta
+
+    def _deltas(self, old_row, new_row):
+        deltas = Counter()
+        if is_counted(old_row):
+            deltas[(str(old_row["date"]), old_row["replacement_teacher"])] -= 1
+        if is_counted(new_row):
+            deltas[(str(new_row["date"]), new_row["replacement_teacher"])] += 1
+        return {key: delta for key, delta in deltas.items() if delta}
+
+    def apply_changes(self, changes):
+        """Record a batch of (old_row, new_row) arrangement changes
+
+        Use (None, row) for a newly written arrangement and (row, None) for
+        a deleted one. Status changes and reassignments pass both rows.
+        """
+        deltas = Counter()
+        for old_row, new_row in changes:
+            deltas.update(self._deltas(old_row, new_row))
+        rows = [
+            {"date": date, "teacher_id": teacher_id, "delta": delta}
+            for (date, teacher_id), delta in deltas.items()
+            if delta
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._refresh()
+            cached = self._signature
+            before, after = append_rows(self.path, rows, columns=LEDGER_COLUMNS)
+            if before == cached:
+                for row in rows:
+                    self._bump(self._counters, row["date"], row["teacher_id"], row["delta"])
+                self._signature = after
+            else:
+                self._signature = None
+
+    def apply_change(self, old_row, new_row):
+        """Record one arrangement change (see apply_changes)"""
+        self.apply_changes([(old_row, new_row)])
+
+    def count(self, teacher_id, window="week", on=None):
+        """Substitutions `teacher_id` has done in the window containing `on`"""
+        self._refresh()
+        counter = self._counters.get((window, bucket(window, on or datetime.date.today())))
+        return counter.get(teacher_id, 0) if counter else 0
+
+    def counts(self, window="week", on=None):
+        """{teacher_id: substitutions} for the window containing `on`"""
+        self._refresh()
+        counter = self._counters.get((window, bucket(window, on or datetime.date.today())))
+        return {tid: n for tid, n in counter.items() if n} if counter else {}
+
+    def trailing(self, teacher_id, days=7, on=None):
+        """Substitutions `teacher_id` has done in the `days` days ending on `on`"""
+        return self.trailing_counts(days, on).get(teacher_id, 0)
+
+    def trailing_counts(self, days=7, on=None):
+        """{teacher_id: substitutions} over the `days` days ending on `on`"""
+        self._refresh()
+        last = _as_date(on or datetime.date.today())
+        total = Counter()
+        for offset in range(days):
+            counter = self._counters.get(("day", last - datetime.timedelta(days=offset)))
+            if counter:
+                total.update(counter)
+        return {tid: n for tid, n in total.items() if n}
+
+    def rebuild(self, arrangements_path=None):
+        """Recompute the ledger from arrangements.csv (one row per teacher/day)"""
+        arrangements = pd.read_csv(arrangements_path or self.arrangements_path, dtype=str, keep_default_na=False)
+        counted = arrangements[
+            arrangements["status"].str.strip().str.upper().isin(COUNTED_STATUSES)
+            & (arrangements["replacement_teacher"] != "")
+        ]
+        ledger = counted.groupby(["date", "replacement_teacher"]).size().reset_index(name="delta")
+        ledger.columns = LEDGER_COLUMNS
+        with self._lock:
+            write_csv_atomic(ledger, self.path)
+            self._signature = None
+        return len(ledger)
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_workload_ledger():
+    """Return the shared WorkloadLedger for this process (or the active school's)"""
+    global _ledger
+    ledger = tenant_resource(
+        "workload",
+        lambda root: WorkloadLedger(os.path.join(root, WORKLOAD_FILE), os.path.join(root, ARRANGEMENTS_FILE)),
+    )
+    if ledger is not None:
+        return ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = WorkloadLedger()
+    return _ledger
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild"]:
+        rows = get_workload_ledger().rebuild()
+        print(f"Rebuilt {WORKLOAD_FILE} ({rows} teacher-days)")
+    else:
+        print("Usage: python -m utils.workload rebuild")